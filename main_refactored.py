@@ -4,6 +4,7 @@
 """
 import sys
 import os
+import time
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -11,6 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import structlog
 from src.core.logging import setup_logging, get_logger
 from src.core.config import config_manager
+from src.core.task_engine import task_engine, STATE_SUCCEEDED, STATE_FAILED
 from src.ui.interface import ui
 from src.modules.launcher import launcher
 from src.modules.config_manager import config_mgr
@@ -29,6 +31,8 @@ class MaiMaiLauncher:
         self.running = True
         setup_console()
         logger.info("麦麦启动器已启动")
+        # 接管上次运行时启动、仍在运行的进程
+        launcher.adopt_running_processes()
     
     def handle_launch_mai(self):
         """处理启动麦麦"""
@@ -48,15 +52,18 @@ class MaiMaiLauncher:
                 ui.pause()
                 return
             
-            # 显示启动选择菜单
-            success = launcher.show_launch_menu(config)
-            if success:
-                ui.print_success("启动操作完成！")
-                logger.info("用户启动操作成功")
-            else:
+            # 显示启动选择菜单，启动过程作为后台任务执行
+            components_to_start = launcher.select_launch_components(config)
+            if not components_to_start:
                 ui.print_info("用户取消启动操作")
                 logger.info("用户取消启动操作")
-            
+                ui.pause()
+                return
+
+            nickname = config.get("nickname_path", config.get("serial_number", "实例"))
+            task = task_engine.submit(f"启动 {nickname}", launcher.launch, components_to_start, config, kind="launch")
+            ui.print_success(f"启动任务 #{task.id} 已在后台运行，可在主菜单 [T] 中查看进度")
+            logger.info("已提交启动任务", task_id=task.id)
             ui.pause()
             
         except Exception as e:
@@ -218,16 +225,17 @@ class MaiMaiLauncher:
             if not config:
                 continue
             
-            if choice == "A":
-                knowledge_builder.pipeline(config)
-            elif choice == "B":
-                knowledge_builder.text_split(config)
-            elif choice == "C":
-                knowledge_builder.entity_extract(config)
-            elif choice == "D":
-                knowledge_builder.knowledge_import(config)
-            elif choice == "E":
-                knowledge_builder.legacy_knowledge_build(config)
+            operations = {
+                "A": ("LPMM一条龙构建", knowledge_builder.pipeline),
+                "B": ("LPMM文本分割", knowledge_builder.text_split),
+                "C": ("LPMM实体提取", knowledge_builder.entity_extract),
+                "D": ("LPMM知识图谱导入", knowledge_builder.knowledge_import),
+                "E": ("旧版知识库构建", knowledge_builder.legacy_knowledge_build),
+            }
+            if choice in operations:
+                name, operation = operations[choice]
+                task = task_engine.submit(name, operation, config, kind="lpmm")
+                ui.print_success(f"任务 #{task.id} 已在后台运行，可在主菜单 [T] 中查看进度")
             else:
                 ui.print_error("无效选项")
                 ui.countdown(1)
@@ -254,27 +262,52 @@ class MaiMaiLauncher:
             ui.console.print(" [A] 实例部署", style=ui.colors["success"])
             ui.console.print(" [B] 实例更新", style=ui.colors["warning"])
             ui.console.print(" [C] 实例删除", style=ui.colors["error"])
+            ui.console.print(" [D] 下载缓存管理（查看/清理）", style=ui.colors["info"])
+            ui.console.print(" [E] 实例快照（查看/恢复）", style=ui.colors["info"])
+            ui.console.print(" [F] 回滚到更新前的版本", style=ui.colors["warning"])
             ui.console.print(" [Q] 返回主菜单", style="#7E1DE4")
             
-            choice = ui.get_choice("请选择操作", ["A", "B", "C", "Q"])
+            choice = ui.get_choice("请选择操作", ["A", "B", "C", "D", "E", "F", "Q"])
             
             if choice == "Q":
                 break
             elif choice == "A":
-                # 部署新实例
+                # 部署新实例：交互部分在前台完成，下载安装在后台执行
                 from src.modules.deployment import deployment_manager
-                deployment_manager.deploy_instance()
+                deploy_config = deployment_manager.prepare_deployment()
+                if deploy_config:
+                    task = task_engine.submit(f"部署 {deploy_config['nickname']}", deployment_manager.run_deployment,
+                                              deploy_config, kind="deploy")
+                    ui.print_success(f"部署任务 #{task.id} 已在后台运行，可在主菜单 [T] 中查看进度")
                 ui.pause()
             elif choice == "B":
-                # 更新实例
+                # 更新实例：选择实例和版本在前台完成，下载切换在后台执行
                 from src.modules.deployment import deployment_manager
-                deployment_manager.update_instance()
+                update_config = deployment_manager.prepare_update()
+                if update_config:
+                    nickname = update_config["config"].get("nickname_path", update_config["config"].get("serial_number", "实例"))
+                    task = task_engine.submit(f"更新 {nickname}", deployment_manager.run_update,
+                                              update_config, kind="deploy")
+                    ui.print_success(f"更新任务 #{task.id} 已在后台运行，可在主菜单 [T] 中查看进度")
                 ui.pause()
             elif choice == "C":
                 # 删除实例
                 from src.modules.deployment import deployment_manager
                 deployment_manager.delete_instance()
                 ui.pause()
+            elif choice == "D":
+                # 下载缓存管理
+                from src.modules.deployment import deployment_manager
+                deployment_manager.manage_artifact_cache()
+            elif choice == "E":
+                # 实例快照管理
+                from src.modules.deployment import deployment_manager
+                deployment_manager.manage_snapshots()
+            elif choice == "F":
+                # 回滚实例
+                from src.modules.deployment import deployment_manager
+                deployment_manager.rollback_instance()
+                ui.pause()
             else:
                 ui.print_error("无效选项")
                 ui.countdown(1)
@@ -326,6 +359,7 @@ class MaiMaiLauncher:
             ui.console.print("\n[操作选项]")
             ui.console.print(" [A] 🔄 刷新状态", style=ui.colors["success"])
             ui.console.print(" [B] 🛑 停止所有进程", style=ui.colors["error"])
+            ui.console.print(" [C] 📜 查看/搜索组件日志", style=ui.colors["info"])
             ui.console.print(" [Q] 返回主菜单", style="#7E1DE4")
             
             while True:
@@ -342,6 +376,7 @@ class MaiMaiLauncher:
                     ui.console.print("\n[操作选项]")
                     ui.console.print(" [A] 🔄 刷新状态", style=ui.colors["success"])
                     ui.console.print(" [B] 🛑 停止所有进程", style=ui.colors["error"])
+                    ui.console.print(" [C] 📜 查看/搜索组件日志", style=ui.colors["info"])
                     ui.console.print(" [Q] 返回主菜单", style="#7E1DE4")
                 elif choice == "B":
                     # 停止所有进程
@@ -350,6 +385,8 @@ class MaiMaiLauncher:
                         ui.print_success("所有进程已停止")
                         ui.pause("按回车键继续...")
                         break
+                elif choice == "C":
+                    launcher.browse_logs()
                 else:
                     ui.print_error("无效选项")
             
@@ -358,18 +395,106 @@ class MaiMaiLauncher:
             logger.error("进程状态查看失败", error=str(e))
             ui.pause()
 
+    def answer_task_prompts(self):
+        """代后台任务向用户提问，并把回答交还给任务。"""
+        for task in task_engine.pending_prompts():
+            prompt = task.prompt
+            if prompt is None:
+                continue
+            ui.console.print(f"\n[任务 #{task.id} {task.name}] 需要您的输入：", style=ui.colors["warning"])
+            for event in list(task.messages)[-5:]:
+                if event.level != "prompt":
+                    ui.console.print(f"  {event.message}", style=ui.colors["white"], markup=False)
+            if prompt.kind == "confirm":
+                prompt.resolve(ui.confirm(prompt.text))
+            elif prompt.kind == "pause":
+                ui.pause(prompt.text)
+                prompt.resolve(None)
+            else:
+                prompt.resolve(ui.get_input(prompt.text, prompt.default))
+
+    def show_task_notifications(self):
+        """在主菜单下方显示任务结束通知和运行中的任务摘要。"""
+        tasks = {task.id: task for task in task_engine.tasks()}
+        finished = {event.task_id for event in task_engine.drain_events() if event.level == "state"}
+        for task_id in sorted(finished):
+            task = tasks.get(task_id)
+            if task is None or task.is_active:
+                continue
+            if task.state == STATE_SUCCEEDED:
+                ui.print_success(f"后台任务 #{task.id} {task.name} 已完成")
+            elif task.state == STATE_FAILED:
+                ui.print_error(f"后台任务 #{task.id} {task.name} 失败，可在 [T] 中查看日志")
+
+        active = task_engine.active_tasks()
+        if active:
+            ui.console.print(f"\n{ui.symbols['task']} 正在运行 {len(active)} 个后台任务：", style=ui.colors["info"])
+            for task in active:
+                percent = f" {task.percent:.0f}%" if task.percent is not None else ""
+                ui.console.print(f"  #{task.id} {task.name}{percent} - {task.last_message}",
+                                 style=ui.colors["white"], markup=False)
+
+    def handle_background_tasks(self):
+        """处理后台任务菜单"""
+        while True:
+            ui.clear_screen()
+            ui.components.show_title("后台任务", symbol="task")
+            self.answer_task_prompts()
+
+            tasks = task_engine.tasks()
+            if not tasks:
+                ui.print_info("当前没有后台任务")
+                ui.pause()
+                return
+            ui.show_task_list(tasks)
+
+            ui.console.print("\n [编号] 查看任务日志  [R] 刷新  [C] 清除已结束任务  [Q] 返回主菜单",
+                             style=ui.colors["info"])
+            choice = ui.get_input("请选择操作").upper()
+            if choice == "Q":
+                return
+            elif choice == "R":
+                continue
+            elif choice == "C":
+                task_engine.clear_finished()
+            elif choice.isdigit():
+                task = next((t for t in tasks if t.id == int(choice)), None)
+                if task is None:
+                    ui.print_error("无效的任务编号")
+                    ui.countdown(1)
+                    continue
+                ui.clear_screen()
+                ui.components.show_title(f"任务 #{task.id} {task.name}", symbol="task")
+                for event in task.messages:
+                    ui.console.print(f"{time.strftime('%H:%M:%S', time.localtime(event.timestamp))} {event.message}",
+                                     style=ui.colors.get(event.level, ui.colors["white"]), markup=False)
+                ui.pause()
+            else:
+                ui.print_error("无效选项")
+                ui.countdown(1)
+
     def run(self):
         """运行主程序"""
         try:
             logger.info("启动器主循环开始")
             
             while self.running:
+                self.answer_task_prompts()
                 ui.show_main_menu()
+                self.show_task_notifications()
                 choice = ui.get_input("请输入选项").upper()
                 
                 logger.debug("用户选择", choice=choice)
                 
                 if choice == "Q":
+                    active = task_engine.active_tasks()
+                    if active and not ui.confirm(f"还有 {len(active)} 个后台任务未完成，退出将中断它们，确定退出吗？"):
+                        continue
+                    running = launcher.running_process_count()
+                    if running:
+                        keep_hint = "下次打开启动器时会重新接管" if launcher.can_adopt_processes() else "需要手动关闭"
+                        if ui.confirm(f"有 {running} 个组件进程正在运行，退出前是否停止它们？（选否则保持运行，{keep_hint}）"):
+                            launcher.stop_all_processes()
                     self.running = False
                     ui.print_info("感谢使用麦麦启动器！")
                     logger.info("用户退出程序")
@@ -390,6 +515,8 @@ class MaiMaiLauncher:
                     self.handle_process_status()
                 elif choice == "H":
                     self.handle_about_menu()
+                elif choice == "T":
+                    self.handle_background_tasks()
                 else:
                     ui.print_error("无效选项")
                     ui.countdown(1)
@@ -401,8 +528,8 @@ class MaiMaiLauncher:
             ui.print_error(f"程序运行出错：{str(e)}")
             logger.error("程序运行异常", error=str(e))
         finally:
-            # 停止所有进程
-            launcher.stop_all_processes()
+            # 组件进程只在用户明确要求时停止，其余保持运行
+            launcher.detach_processes()
             logger.info("启动器程序结束")
 
 
@@ -0,0 +1,101 @@
+"""
+分段下载基准测试
+在本地启动一个对每个连接限速的HTTP服务器（模拟单连接带宽受限的GitHub/镜像下载），
+分别用单连接和分段并行下载同一文件并比较耗时，同时验证中断后的续传。
+
+用法：python scripts/bench_download.py [--size-mb 32] [--rate-kb 2048] [--segments 1 2 4 8]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.modules.downloader import DownloadError, SegmentedDownloader  # noqa: E402
+
+
+def make_handler(payload: bytes, rate: int, fail_after: list):
+    class ThrottledHandler(BaseHTTPRequestHandler):
+        """支持Range、每个连接限速的处理器；fail_after非空时发送该字节数后断开连接。"""
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            start, end = 0, len(payload) - 1
+            match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if match:
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else end
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("ETag", '"bench"')
+            self.end_headers()
+
+            sent, chunk = 0, 16 * 1024
+            began = time.monotonic()
+            for offset in range(start, end + 1, chunk):
+                if fail_after and sent >= fail_after[0]:
+                    return
+                data = payload[offset:min(offset + chunk, end + 1)]
+                self.wfile.write(data)
+                sent += len(data)
+                # 按限速补足时间
+                delay = sent / rate - (time.monotonic() - began)
+                if delay > 0:
+                    time.sleep(delay)
+
+    return ThrottledHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分段下载基准测试")
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--rate-kb", type=int, default=2048, help="每个连接的限速（KiB/s）")
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    fail_after: list = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(payload, args.rate_kb * 1024, fail_after))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/asset.zip"
+    print(f"文件 {args.size_mb} MiB，每连接限速 {args.rate_kb} KiB/s")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in args.segments:
+            dest = os.path.join(temp_dir, f"asset_{count}.zip")
+            began = time.monotonic()
+            SegmentedDownloader(segments=count).download(url, dest)
+            elapsed = time.monotonic() - began
+            with open(dest, "rb") as f:
+                assert f.read() == payload, "内容不一致"
+            print(f"  {count} 段: {elapsed:6.2f}s  {args.size_mb / elapsed:6.2f} MiB/s")
+
+        # 续传：每个连接只发送一部分后断开，且不允许重试，然后恢复服务器再下载一次
+        dest = os.path.join(temp_dir, "asset_resume.zip")
+        fail_after.append(len(payload) // 8)
+        try:
+            SegmentedDownloader(segments=4, max_retries=1).download(url, dest)
+        except DownloadError:
+            pass
+        fail_after.clear()
+        began = time.monotonic()
+        SegmentedDownloader(segments=4).download(url, dest)
+        with open(dest, "rb") as f:
+            assert f.read() == payload, "续传后内容不一致"
+        print(f"  中断后续传（已完成约一半）: {time.monotonic() - began:6.2f}s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Git镜像更新演示
+用本地的裸仓库代替GitHub：先以标签安装一个版本，再在分支上提交少量改动并更新，
+比较首次同步与增量同步的耗时和下载的对象数，并验证已有标签无需再次fetch。
+
+用法：python scripts/bench_git_update.py [--files 3000] [--changed 20]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.modules.git_mirror import GitMirror  # noqa: E402
+
+
+def git(*args, cwd=None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True,
+                   env={**os.environ, "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+                        "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@example.com"})
+
+
+def object_count(git_dir: Path) -> int:
+    output = subprocess.run(["git", "--git-dir", str(git_dir), "count-objects", "-v"],
+                            capture_output=True, text=True, check=True).stdout
+    fields = dict(line.split(": ") for line in output.splitlines())
+    return int(fields["count"]) + int(fields["in-pack"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Git镜像更新演示")
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--changed", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp = Path(temp_dir)
+        work, upstream = temp / "work", temp / "upstream.git"
+        work.mkdir()
+        git("init", "--quiet", "-b", "main", cwd=work)
+        for i in range(args.files):
+            path = work / f"pkg{i % 40}" / f"module_{i}.py"
+            path.parent.mkdir(exist_ok=True)
+            path.write_text("\n".join(f"value_{j} = {rng.random()!r}" for j in range(60)))
+        (work / "bot.py").write_text("print('v1')\n")
+        git("add", "-A", cwd=work)
+        git("commit", "--quiet", "-m", "v1", cwd=work)
+        git("tag", "v1", cwd=work)
+        git("clone", "--quiet", "--bare", str(work), str(upstream))
+        print(f"上游仓库：{args.files} 个文件")
+
+        mirror = GitMirror(root=temp / "mirrors")
+        repo_url = str(upstream)
+
+        began = time.perf_counter()
+        mirror.checkout_ref(repo_url, "v1", str(temp / "install_v1"))
+        mirror_dir = mirror.mirror_path(repo_url)
+        first_objects = object_count(mirror_dir)
+        print(f"  首次安装（标签 v1）: {time.perf_counter() - began:6.2f}s  镜像对象 {first_objects}")
+
+        began = time.perf_counter()
+        mirror.fetch(repo_url, "v1")
+        print(f"  再次获取已有标签:     {(time.perf_counter() - began) * 1000:6.1f}ms（不访问上游）")
+
+        # 在分支上提交少量改动
+        for i in rng.sample(range(args.files), args.changed):
+            path = work / f"pkg{i % 40}" / f"module_{i}.py"
+            path.write_text(path.read_text() + f"\nchanged = {i}\n")
+        git("commit", "--quiet", "-am", "small change", cwd=work)
+        git("push", "--quiet", str(upstream), "main", cwd=work)
+
+        began = time.perf_counter()
+        commit = mirror.fetch(repo_url, "refs/heads/main")
+        fetch_seconds = time.perf_counter() - began
+        print(f"  增量同步 main（{args.changed} 个文件变化）: {fetch_seconds:6.2f}s  "
+              f"新增对象 {object_count(mirror_dir) - first_objects}")
+
+        began = time.perf_counter()
+        count = mirror.export(repo_url, commit, str(temp / "install_main"))
+        print(f"  导出 main:            {time.perf_counter() - began:6.2f}s  {count} 个文件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+共享HTTP客户端演示
+本地启动一个支持keep-alive的HTTP服务器，分别用逐次 requests.get 和共享客户端发送同样的请求，
+比较服务器收到的新连接数和总耗时；再演示5xx响应的自动重试和按主机汇总的请求统计。
+
+用法：python scripts/bench_http_client.py [--requests 50]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.modules.http_client import http_client  # noqa: E402
+
+BODY = b"{}" * 512
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体一起发送，避免keep-alive连接上的延迟确认等待
+    wbufsize = -1
+    connections = 0
+    flaky = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/flaky" and type(self).flaky > 0:
+            type(self).flaky -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+def run(label, get, url, count):
+    _Handler.connections = 0
+    began = time.perf_counter()
+    for _ in range(count):
+        get(url).content
+    print(f"  {label:<16} {count} 个请求  新连接 {_Handler.connections:3d}  耗时 {time.perf_counter() - began:6.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享HTTP客户端演示")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        run("逐次requests.get", lambda u: requests.get(u, timeout=5), f"{url}/api", args.requests)
+        run("共享客户端", http_client.get, f"{url}/api", args.requests)
+
+        _Handler.flaky = 2
+        response = http_client.get(f"{url}/flaky")
+        print(f"  连续两次503后：状态码 {response.status_code}（已自动重试）")
+
+        for host, stats in http_client.summary().items():
+            print(f"  {host}: {stats['requests']} 个请求，失败 {stats['errors']}，"
+                  f"总耗时 {stats['seconds']:.3f}s，最慢 {stats['slowest'] * 1000:.1f}ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
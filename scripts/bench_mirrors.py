@@ -0,0 +1,101 @@
+"""
+PyPI镜像测速演示
+在本地启动几个模拟的 simple 索引服务器（快速、首字节慢、带宽低、返回错误）以及一个无人监听的地址，
+用 MirrorSelector 并发测速并输出排序，同时比较并发测速与逐个测速的耗时、验证缓存命中。
+
+用法：python scripts/bench_mirrors.py [--timeout 2]
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.modules.mirror_selector import MirrorSelector  # noqa: E402
+
+PAGE = b"<html><body>" + b"".join(
+    b'<a href="../../packages/pip-%d.tar.gz">pip-%d.tar.gz</a><br/>\n' % (i, i) for i in range(1500)
+) + b"</body></html>"
+
+
+def make_handler(delay: float, rate: int, status: int):
+    class IndexHandler(BaseHTTPRequestHandler):
+        """模拟索引：先等待 delay 秒再响应，按 rate 字节/秒限速发送页面。"""
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            began = time.monotonic()
+            try:
+                for offset in range(0, len(PAGE), 8192):
+                    self.wfile.write(PAGE[offset:offset + 8192])
+                    pause = (offset + 8192) / rate - (time.monotonic() - began)
+                    if pause > 0:
+                        time.sleep(pause)
+            except ConnectionError:
+                # 客户端收到错误状态或超时后会提前断开
+                pass
+
+    return IndexHandler
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyPI镜像测速演示")
+    parser.add_argument("--timeout", type=float, default=2.0)
+    args = parser.parse_args()
+
+    servers = {
+        "慢首字节": (0.8, 50 * 1024 * 1024, 200),
+        "低带宽": (0.0, 100 * 1024, 200),
+        "快速": (0.02, 50 * 1024 * 1024, 200),
+        "返回错误": (0.0, 50 * 1024 * 1024, 503),
+    }
+    urls = {}
+    for name, (delay, rate, status) in servers.items():
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(delay, rate, status))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        urls[f"http://127.0.0.1:{server.server_port}/simple"] = name
+    urls[f"http://127.0.0.1:{unused_port()}/simple"] = "无法连接"
+    print(f"索引页面 {len(PAGE) / 1024:.0f} KiB，测速超时 {args.timeout}s")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        selector = MirrorSelector(cache_file=Path(temp_dir) / "ranking.json")
+
+        began = time.perf_counter()
+        for url in urls:
+            selector.probe(url, args.timeout)
+        print(f"逐个测速: {time.perf_counter() - began:.2f}s")
+
+        began = time.perf_counter()
+        ranking = selector.probe_all(list(urls), args.timeout)
+        print(f"并发测速: {time.perf_counter() - began:.2f}s")
+        selector._save_cache(list(urls), ranking)
+        for item in ranking:
+            detail = (f"TTFB {item.ttfb * 1000:6.0f}ms  {item.throughput / 1024 / 1024:7.2f} MiB/s"
+                      if item.healthy else f"不可用：{item.error[:60]}")
+            print(f"  {urls[item.url]:<6} {detail}")
+
+        began = time.perf_counter()
+        ordered = selector.ordered_indexes(list(urls))
+        print(f"缓存命中: {(time.perf_counter() - began) * 1000:.1f}ms  使用顺序: {[urls[url] for url in ordered]}")
+
+
+if __name__ == "__main__":
+    main()
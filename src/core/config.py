@@ -16,6 +16,54 @@ class Config:
     CONFIG_FILE = "config/config.toml"
     CONFIG_TEMPLATE = {
         "current_config": "default",
+        "process_backend": "auto",  # 进程后端："auto"、"console"（新CMD窗口）或 "pipe"（捕获输出）
+        "supervise_processes": True,  # 组件异常退出后自动重启（仅pipe后端有效）
+        "shutdown_grace_periods": {  # 停止组件时等待其自行退出的秒数，超时后强制结束
+            "default": 10.0,
+            "mai": 20.0,  # 留出时间写回数据库
+            "mongodb": 20.0,
+        },
+        "restart_policy": {  # 自动重启策略
+            "base_delay": 1.0,  # 首次重启前等待秒数，之后按指数退避（带随机抖动）
+            "max_delay": 60.0,  # 最长等待秒数
+            "max_restarts": 5,  # budget_window 秒内最多重启次数，超出后标记为降级
+            "budget_window": 600.0,
+            "min_uptime": 10.0,  # 运行不足该秒数即退出视为启动即崩溃
+            "crash_loop_limit": 3,  # 连续启动即崩溃的次数达到该值时标记为降级
+        },
+        "artifact_cache": {  # 下载缓存（发布包、源码压缩包等），重复部署和回滚时无需重新下载
+            "enabled": True,
+            "max_size_mb": 4096,  # 超出后按最久未使用的顺序淘汰
+        },
+        "snapshots": {  # 更新前的实例快照（未变化的文件以硬链接共享），超出以下保留策略的旧快照自动删除
+            "keep_last": 3,  # 保留最近的快照个数
+            "keep_daily": 7,  # 最近若干天每天保留一个
+            "keep_weekly": 4,  # 最近若干周每周保留一个
+        },
+        "git_updates": {  # 通过 ~/.maibot/git 中的共享git镜像获取源码，只下载新提交；未安装git时自动改用源码包
+            "enabled": True,
+        },
+        "pypi_mirrors": {  # 安装Python依赖时使用的PyPI索引，安装前并发测速，按速度排序使用
+            "indexes": [
+                "https://pypi.tuna.tsinghua.edu.cn/simple",
+                "https://pypi.org/simple",
+                "https://mirrors.aliyun.com/pypi/simple",
+                "https://pypi.douban.com/simple",
+            ],
+            "probe_timeout": 3.0,  # 单个索引测速的超时秒数
+            "cache_minutes": 30,  # 测速结果的有效期
+        },
+        "http": {  # 所有安装器共用的HTTP客户端：按主机复用连接，连接错误和5xx自动重试
+            "connect_timeout": 10,
+            "read_timeout": 60,
+            "retries": 3,
+            "backoff": 0.5,  # 重试间隔的退避系数（秒），依次为 0.5、1、2...
+            "verify_ssl": True,  # 是否校验HTTPS证书；代理替换证书导致校验失败时可设为 false
+            "proxy": "",  # 例如 http://127.0.0.1:7890，为空时使用 HTTP(S)_PROXY 环境变量
+        },
+        "github_metadata": {  # GitHub版本/分支列表缓存在 ~/.maibot/cache/github，过期后先显示缓存再在后台用条件请求刷新
+            "max_age_minutes": 10,
+        },
         "configurations": {
             "default": {
                 "serial_number": "1",
@@ -0,0 +1,346 @@
+"""
+后台任务引擎
+在独立线程中运行一个asyncio事件循环，将启动、下载、依赖安装、LPMM脚本等耗时操作作为任务执行，
+主菜单因此不会被阻塞：
+- 任务中的界面输出被转为任务消息，通过进度队列上报，而不是直接打印到控制台
+- 任务中需要用户输入时挂起等待，由主菜单统一代为提问
+"""
+import asyncio
+import collections
+import contextlib
+import contextvars
+import functools
+import itertools
+import queue
+import threading
+import time
+import structlog
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+from tqdm import tqdm
+
+logger = structlog.get_logger(__name__)
+
+# 执行阻塞操作的线程数，即可同时运行的任务数上限
+MAX_WORKERS = 8
+# 每个任务保留的消息条数
+MESSAGE_HISTORY = 500
+# 进度条上报的最小间隔（秒）
+PROGRESS_REPORT_INTERVAL = 0.5
+
+# 任务状态
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_WAITING_INPUT = "waiting_input"
+STATE_SUCCEEDED = "succeeded"
+STATE_FAILED = "failed"
+
+
+class TaskEvent(NamedTuple):
+    """进度队列中的一条事件。"""
+    task_id: int
+    timestamp: float
+    level: str  # info/success/warning/error/progress/prompt/state
+    message: str
+    percent: Optional[float] = None
+
+
+class PendingPrompt:
+    """任务发出的、等待主菜单代为回答的输入请求。"""
+
+    def __init__(self, kind: str, text: str, default: str = ""):
+        self.kind = kind  # input/confirm/pause
+        self.text = text
+        self.default = default
+        self.answer: Any = None
+        self._answered = threading.Event()
+
+    def resolve(self, answer: Any):
+        self.answer = answer
+        self._answered.set()
+
+    def wait(self) -> Any:
+        self._answered.wait()
+        return self.answer
+
+
+class Task:
+    """一个后台任务。"""
+
+    def __init__(self, task_id: int, name: str, kind: str, engine: "TaskEngine"):
+        self.id = task_id
+        self.name = name
+        self.kind = kind
+        self.state = STATE_PENDING
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.percent: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.messages: Deque[TaskEvent] = collections.deque(maxlen=MESSAGE_HISTORY)
+        self.prompt: Optional[PendingPrompt] = None
+        self._engine = engine
+
+    @property
+    def is_active(self) -> bool:
+        return self.state in (STATE_PENDING, STATE_RUNNING, STATE_WAITING_INPUT)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def last_message(self) -> str:
+        for event in reversed(self.messages):
+            if event.message:
+                return event.message
+        return ""
+
+    def emit(self, level: str, message: str, percent: Optional[float] = None):
+        """记录一条任务消息并放入进度队列。"""
+        if percent is not None:
+            self.percent = max(0.0, min(100.0, percent))
+        event = TaskEvent(self.id, time.time(), level, message, self.percent if percent is not None else None)
+        self.messages.append(event)
+        self._engine.events.put(event)
+
+    def ask(self, kind: str, text: str, default: str = "") -> Any:
+        """在任务线程中请求用户输入，阻塞直到主菜单给出回答。"""
+        prompt = PendingPrompt(kind, text, default)
+        self.prompt = prompt
+        self.state = STATE_WAITING_INPUT
+        self.emit("prompt", text)
+        try:
+            return prompt.wait()
+        finally:
+            self.prompt = None
+            self.state = STATE_RUNNING
+
+
+# 当前线程正在执行的任务（在任务外为None）
+current_task: contextvars.ContextVar[Optional[Task]] = contextvars.ContextVar("current_task", default=None)
+
+
+def report_progress(message: str = "", percent: Optional[float] = None):
+    """在任务中上报进度，不在任务中时仅记录日志。"""
+    task = current_task.get()
+    if task is not None:
+        task.emit("progress", message, percent)
+    elif message:
+        logger.debug("进度", message=message, percent=percent)
+
+
+def submit_in_context(executor, func: Callable, *args, **kwargs):
+    """向线程池提交函数，并让其继承当前任务上下文（界面输出仍归属于当前任务）。"""
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+class _TaskProgressBar:
+    """任务中使用的进度条，以进度事件代替终端输出。"""
+
+    def __init__(self, task: Task, total: Optional[float] = None, desc: str = "", initial: float = 0, **_):
+        self.task = task
+        self.total = total or 0
+        self.desc = desc
+        self.n = initial
+        self._last_report = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, n: float = 1):
+        self.n += n
+        now = time.monotonic()
+        if now - self._last_report >= PROGRESS_REPORT_INTERVAL:
+            self._last_report = now
+            self._report()
+
+    def _report(self):
+        if self.total:
+            self.task.emit("progress", f"{self.desc} {self.n / self.total:.0%}", self.n / self.total * 100)
+        else:
+            self.task.emit("progress", f"{self.desc} {self.n / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        self._report()
+
+
+class _ChildProgressBar:
+    """汇总进度条中的一项，进度累加到共用的总进度条上。"""
+
+    def __init__(self, group: "_ProgressGroup"):
+        self.group = group
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, n: float = 1):
+        self.group.update(n)
+
+    def close(self):
+        pass
+
+
+class _ProgressGroup:
+    """多个并行操作共用的一个总进度条。"""
+
+    def __init__(self, bar):
+        self.bar = bar
+        self._lock = threading.Lock()
+
+    def child(self, total: Optional[float] = None, initial: float = 0, **_) -> _ChildProgressBar:
+        with self._lock:
+            self.bar.total = (self.bar.total or 0) + (total or 0)
+            if initial:
+                self.bar.update(initial)
+            elif hasattr(self.bar, "refresh"):
+                self.bar.refresh()
+        return _ChildProgressBar(self)
+
+    def update(self, n: float):
+        with self._lock:
+            self.bar.update(n)
+
+
+# 当前生效的汇总进度条（在 aggregate_progress 范围内创建的进度条都计入其中）
+_progress_group: contextvars.ContextVar[Optional[_ProgressGroup]] = contextvars.ContextVar("progress_group",
+                                                                                         default=None)
+
+
+@contextlib.contextmanager
+def aggregate_progress(desc: str, **kwargs):
+    """
+    在此范围内（包括通过 submit_in_context 提交的线程）创建的进度条都汇总到一个总进度条显示
+
+    Args:
+        desc: 总进度条描述
+        **kwargs: tqdm参数
+    """
+    kwargs.setdefault("total", 0)
+    with create_progress_bar(desc=desc, **kwargs) as bar:
+        token = _progress_group.set(_ProgressGroup(bar))
+        try:
+            yield
+        finally:
+            _progress_group.reset(token)
+
+
+def create_progress_bar(**kwargs):
+    """
+    创建进度条：在任务外返回tqdm，在任务中返回以进度事件上报的进度条，
+    在 aggregate_progress 范围内返回计入总进度条的子进度条
+
+    Args:
+        **kwargs: tqdm参数（任务中仅使用total和desc）
+    """
+    group = _progress_group.get()
+    if group is not None:
+        return group.child(**kwargs)
+    task = current_task.get()
+    if task is None:
+        return tqdm(**kwargs)
+    return _TaskProgressBar(task, **kwargs)
+
+
+class TaskEngine:
+    """
+    后台任务引擎。
+    事件循环运行在守护线程中，阻塞操作交给线程池执行；任务事件通过 events 队列上报。
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.events: "queue.Queue[TaskEvent]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tasks: Dict[int, Task] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="task-engine", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def submit(self, name: str, func: Callable, *args, kind: str = "general", **kwargs) -> Task:
+        """
+        提交一个阻塞函数作为后台任务
+
+        Args:
+            name: 任务名称（显示在任务列表中）
+            func: 要执行的函数，其中的界面输出和输入都会被转交给任务
+            kind: 任务类别，例如 launch/deploy/install/lpmm
+
+        Returns:
+            任务对象
+        """
+        loop = self._ensure_loop()
+        task = Task(next(self._ids), name, kind, self)
+        with self._lock:
+            self._tasks[task.id] = task
+        asyncio.run_coroutine_threadsafe(self._run(task, functools.partial(func, *args, **kwargs)), loop)
+        logger.info("提交后台任务", task_id=task.id, name=name, kind=kind)
+        return task
+
+    async def _run(self, task: Task, func: Callable):
+        context = contextvars.copy_context()
+        context.run(current_task.set, task)
+        task.state = STATE_RUNNING
+        task.started_at = time.time()
+        task.emit("state", "任务开始")
+        try:
+            task.result = await asyncio.get_running_loop().run_in_executor(self._executor, context.run, func)
+            # 约定返回False表示失败
+            task.state = STATE_FAILED if task.result is False else STATE_SUCCEEDED
+        except Exception as e:
+            task.error = str(e)
+            task.state = STATE_FAILED
+            logger.error("后台任务异常", task_id=task.id, name=task.name, error=str(e))
+        task.finished_at = time.time()
+        if task.state == STATE_SUCCEEDED:
+            task.emit("state", "任务完成", 100.0)
+        else:
+            task.emit("state", f"任务失败{'：' + task.error if task.error else ''}")
+
+    def tasks(self) -> List[Task]:
+        """按提交顺序返回所有任务。"""
+        with self._lock:
+            return list(self._tasks.values())
+
+    def active_tasks(self) -> List[Task]:
+        return [task for task in self.tasks() if task.is_active]
+
+    def pending_prompts(self) -> List[Task]:
+        """正在等待用户输入的任务。"""
+        return [task for task in self.tasks() if task.prompt is not None]
+
+    def clear_finished(self):
+        """移除已结束的任务。"""
+        with self._lock:
+            self._tasks = {tid: task for tid, task in self._tasks.items() if task.is_active}
+
+    def drain_events(self) -> List[TaskEvent]:
+        """取出进度队列中积压的所有事件。"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+
+# 全局任务引擎实例
+task_engine = TaskEngine()
@@ -0,0 +1,232 @@
+"""
+压缩包解压模块
+GitHub源码包的顶层是一个 "<仓库>-<版本>/" 目录，安装时需要去掉这一层：
+- tar.gz 源码包边下载边解压，直接写入目标目录，不落地压缩包、不经过临时目录
+- zip 压缩包只打开一次，成员按大小均衡分批交给线程池并行解压（zlib解压时释放GIL），
+  支持按通配符筛选成员，并统计吞吐量
+"""
+import fnmatch
+import hashlib
+import os
+import re
+import shutil
+import tarfile
+import time
+import zipfile
+import structlog
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, List, NamedTuple, Optional, Sequence
+
+logger = structlog.get_logger(__name__)
+
+# 解压时跳过的顶层目录（macOS打包残留）
+SKIPPED_TOP_LEVEL = {"__MACOSX"}
+# 并行解压的默认线程数
+DEFAULT_EXTRACT_WORKERS = min(8, (os.cpu_count() or 2))
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def github_tarball_url(url: str) -> Optional[str]:
+    """
+    将GitHub源码zip地址转换为对应的tar.gz地址
+
+    支持 https://github.com/<repo>/archive/<ref>.zip、https://codeload.github.com/<repo>/zip/<ref>
+    和 https://api.github.com/repos/<repo>/zipball/<ref>
+    无法转换时返回None
+    """
+    match = re.match(r"^(https://github\.com/[^/]+/[^/]+/archive/.+)\.zip$", url)
+    if match:
+        return f"{match.group(1)}.tar.gz"
+    match = re.match(r"^(https://codeload\.github\.com/[^/]+/[^/]+)/zip/(.+)$", url)
+    if match:
+        return f"{match.group(1)}/tar.gz/{match.group(2)}"
+    match = re.match(r"^(https://api\.github\.com/repos/[^/]+/[^/]+)/zipball(/.*)?$", url)
+    if match:
+        return f"{match.group(1)}/tarball{match.group(2) or ''}"
+    return None
+
+
+def member_path(name: str, strip_top: bool = True) -> Optional[str]:
+    """
+    计算成员相对目标目录的路径并检查安全性
+
+    Args:
+        name: 压缩包内的成员路径
+        strip_top: 是否去掉顶层目录
+
+    Returns:
+        相对路径（以"/"分隔）；顶层目录本身、需跳过的目录或不安全的路径（绝对路径、包含..）返回None
+    """
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or parts[0] in SKIPPED_TOP_LEVEL:
+        return None
+    if strip_top:
+        parts = parts[1:]
+        if not parts:
+            return None
+    if ".." in parts or name.startswith("/") or re.match(r"^[A-Za-z]:", parts[0]):
+        logger.warning("跳过不安全的压缩包成员", name=name)
+        return None
+    return "/".join(parts)
+
+
+def strip_top_level(name: str) -> Optional[str]:
+    """去掉成员路径的顶层目录，返回相对目标目录的本地路径，不需要或不安全的成员返回None。"""
+    relative = member_path(name, strip_top=True)
+    return os.path.join(*relative.split("/")) if relative else None
+
+
+class HashingReader:
+    """
+    包装一个只读流：读取的同时计算SHA-256，并可把原始字节写入 sink（例如写入下载缓存）、更新进度条。
+    """
+
+    def __init__(self, stream: BinaryIO, sink: Optional[BinaryIO] = None, progress=None):
+        self.stream = stream
+        self.sink = sink
+        self.progress = progress
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        if data:
+            self.digest.update(data)
+            self.bytes_read += len(data)
+            if self.sink is not None:
+                self.sink.write(data)
+            if self.progress is not None:
+                self.progress.update(len(data))
+        return data
+
+
+def extract_tar_stream(fileobj, target_dir: str, mode: str = "r|gz") -> int:
+    """
+    顺序读取 tar 流并去掉顶层目录写入 target_dir
+
+    Args:
+        fileobj: 可读的字节流（例如HTTP响应体）
+        target_dir: 目标目录
+        mode: tarfile打开模式，流式读取时为 "r|gz"
+
+    Returns:
+        写入的文件数
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    count = 0
+    with tarfile.open(fileobj=fileobj, mode=mode) as tar:
+        for member in tar:
+            relative = strip_top_level(member.name)
+            if relative is None:
+                continue
+            target = os.path.join(target_dir, relative)
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+            elif member.isfile():
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                source = tar.extractfile(member)
+                with open(target, "wb") as f:
+                    shutil.copyfileobj(source, f, 1024 * 1024)
+                if member.mode & 0o100:
+                    os.chmod(target, 0o755)
+                count += 1
+            elif member.issym() and not os.path.isabs(member.linkname) and ".." not in member.linkname.split("/"):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.lexists(target):
+                    os.remove(target)
+                try:
+                    os.symlink(member.linkname, target)
+                except OSError:
+                    logger.debug("无法创建符号链接，已跳过", name=member.name)
+            # 硬链接、设备文件等在源码包中不会出现，直接忽略
+    return count
+
+
+class ExtractStats(NamedTuple):
+    """一次解压的统计信息。"""
+    files: int
+    bytes: int
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """解压吞吐量（MB/s，按解压后的大小计算）。"""
+        return self.bytes / 1024 / 1024 / self.seconds if self.seconds > 0 else 0.0
+
+
+def _matches(path: str, patterns: Optional[Sequence[str]]) -> bool:
+    return any(fnmatch.fnmatch(path, pattern) for pattern in patterns or ())
+
+
+def _balanced_batches(members: List[zipfile.ZipInfo], count: int) -> List[List[zipfile.ZipInfo]]:
+    """按解压后大小从大到小依次放入当前总量最小的批次，使各线程的工作量接近。"""
+    batches: List[List[zipfile.ZipInfo]] = [[] for _ in range(count)]
+    totals = [0] * count
+    for info in sorted(members, key=lambda m: m.file_size, reverse=True):
+        index = totals.index(min(totals))
+        batches[index].append(info)
+        totals[index] += info.file_size
+    return [batch for batch in batches if batch]
+
+
+def extract_zip(archive_path: str, target_dir: str, include: Optional[Sequence[str]] = None,
+                exclude: Optional[Sequence[str]] = None, strip_top: bool = False,
+                workers: int = DEFAULT_EXTRACT_WORKERS) -> ExtractStats:
+    """
+    并行解压 zip 到 target_dir
+
+    Args:
+        archive_path: zip文件路径
+        target_dir: 目标目录
+        include: 只解压匹配这些通配符的成员（匹配去掉顶层目录后的路径，以"/"分隔），为空时全部解压
+        exclude: 跳过匹配这些通配符的成员
+        strip_top: 是否去掉顶层目录
+        workers: 解压线程数
+
+    Returns:
+        解压统计
+    """
+    started = time.perf_counter()
+    with zipfile.ZipFile(archive_path, "r") as zip_ref:
+        members = []
+        directories = {target_dir}
+        for info in zip_ref.infolist():
+            relative = member_path(info.filename, strip_top)
+            if relative is None:
+                continue
+            if info.is_dir():
+                if not include and not _matches(relative + "/", exclude):
+                    directories.add(os.path.join(target_dir, relative))
+                continue
+            if include and not _matches(relative, include):
+                continue
+            if _matches(relative, exclude):
+                continue
+            members.append((info, os.path.join(target_dir, relative)))
+            directories.add(os.path.dirname(os.path.join(target_dir, relative)))
+
+        # 先在主线程建好整个目录树，解压线程只负责写文件
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
+
+        targets = {id(info): target for info, target in members}
+
+        def extract_batch(batch: List[zipfile.ZipInfo]):
+            # 同一个ZipFile的读取由其内部锁保护，解压在锁外进行
+            for info in batch:
+                with zip_ref.open(info) as source, open(targets[id(info)], "wb") as f:
+                    shutil.copyfileobj(source, f, COPY_BUFFER_SIZE)
+
+        batches = _balanced_batches([info for info, _ in members], max(1, workers))
+        if len(batches) <= 1:
+            for batch in batches:
+                extract_batch(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=len(batches), thread_name_prefix="extract") as executor:
+                for future in [executor.submit(extract_batch, batch) for batch in batches]:
+                    future.result()
+
+    stats = ExtractStats(len(members), sum(info.file_size for info, _ in members), time.perf_counter() - started)
+    logger.info("解压完成", archive=archive_path, files=stats.files, size=stats.bytes,
+                seconds=round(stats.seconds, 2), throughput=f"{stats.throughput:.1f}MB/s")
+    return stats
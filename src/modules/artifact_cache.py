@@ -0,0 +1,366 @@
+"""
+下载缓存模块
+所有安装程序下载的发布包、源码压缩包都经过这里：
+- 以 URL 为键记录下载时服务器返回的 ETag 和内容的 SHA-256
+- 内容按 SHA-256 存放（相同内容只存一份），总大小超出上限时按最久未使用淘汰
+- 再次下载同一 URL 时只发一个 HEAD 请求比对 ETag，未变化或无网络时直接使用缓存
+- 下载先写入 tmp 中按 URL 固定的暂存路径，中断后再次运行可找到 .part 文件继续下载；
+  长期未更新的暂存文件在清理时删除，其余的计入缓存大小
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import requests
+import structlog
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from ..core.config import config_manager
+from .http_client import http_client
+
+logger = structlog.get_logger(__name__)
+
+CACHE_DIR = Path.home() / ".maibot" / "cache" / "artifacts"
+DEFAULT_MAX_SIZE_MB = 4096
+# 校验ETag的HEAD请求超时（秒）
+PROBE_TIMEOUT = 10
+HASH_CHUNK_SIZE = 1024 * 1024
+# 暂存文件超过这么久未修改视为已放弃的下载（秒）
+STAGING_MAX_AGE = 7 * 24 * 3600
+
+# 下载函数：(url, 目标文件路径) -> 是否成功
+Downloader = Callable[[str, str], bool]
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    内容寻址的下载缓存。
+    索引保存在 index.json 中：urls 记录 URL -> (sha256, etag)，blobs 记录 sha256 -> (大小, 最近使用时间)。
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(config_manager.get("artifact_cache", {}).get("enabled", True))
+
+    @property
+    def max_size(self) -> int:
+        size_mb = config_manager.get("artifact_cache", {}).get("max_size_mb", DEFAULT_MAX_SIZE_MB)
+        return int(size_mb * 1024 * 1024)
+
+    # --- 索引 ---
+
+    def _index_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.directory / "blobs" / sha256[:2] / sha256
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return {"urls": data.get("urls", {}), "blobs": data.get("blobs", {})}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("读取下载缓存索引失败", error=str(e))
+        return {"urls": {}, "blobs": {}}
+
+    def _save(self, index: Dict[str, Dict[str, Any]]):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_path = self._index_path().with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self._index_path())
+        except OSError as e:
+            logger.warning("写入下载缓存索引失败", error=str(e))
+
+    def _lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """查找URL对应的缓存记录，内容文件丢失时视为未缓存。"""
+        with self._lock:
+            entry = self._load()["urls"].get(url)
+        if entry and self._blob_path(entry["sha256"]).is_file():
+            return entry
+        return None
+
+    # --- 下载 ---
+
+    @staticmethod
+    def probe_etag(url: str) -> Optional[str]:
+        """
+        通过HEAD请求获取URL当前的ETag
+
+        Raises:
+            requests.RequestException: 网络不可用
+        """
+        response = http_client.head(url, timeout=PROBE_TIMEOUT)
+        response.raise_for_status()
+        return response.headers.get("ETag")
+
+    def lookup(self, url: str, offline: bool = False) -> Optional[str]:
+        """
+        获取URL对应的有效缓存文件路径
+
+        Args:
+            url: 下载地址
+            offline: 离线模式，不校验ETag
+
+        Returns:
+            缓存文件路径（只读），未缓存或远端内容已变化时返回None
+        """
+        if not self.enabled:
+            return None
+        entry = self._lookup(url)
+        if entry is None:
+            return None
+        if not offline:
+            try:
+                etag = self.probe_etag(url)
+            except requests.RequestException as e:
+                logger.info("无法校验缓存，使用已缓存的版本", url=url, error=str(e))
+                etag = None
+            # 服务器未提供ETag时，同一URL的缓存视为有效
+            if etag is not None and etag != entry.get("etag"):
+                logger.info("远端内容已变化，重新下载", url=url, cached_etag=entry.get("etag"), etag=etag)
+                return None
+        logger.info("下载缓存命中", url=url, sha256=entry["sha256"][:12])
+        self._touch(entry["sha256"])
+        return str(self._blob_path(entry["sha256"]))
+
+    def fetch(self, url: str, dest: str, download: Downloader, offline: bool = False) -> bool:
+        """
+        获取URL对应的文件到 dest，优先使用缓存
+
+        Args:
+            url: 下载地址
+            dest: 目标文件路径
+            download: 缓存未命中时使用的下载函数
+            offline: 离线模式，只使用缓存
+
+        Returns:
+            是否成功
+        """
+        if not self.enabled:
+            return download(url, dest)
+
+        cached = self.lookup(url, offline)
+        if cached is not None:
+            return self._materialize(cached, dest)
+
+        etag = None
+        if not offline:
+            try:
+                etag = self.probe_etag(url)
+            except requests.RequestException:
+                pass
+        # 下载到固定的暂存路径，中断后再次运行可以续传
+        staging = self.staging_path(url)
+        if not download(url, staging):
+            return False
+        try:
+            self.add(url, etag, staging, move=True)
+        except OSError as e:
+            logger.warning("写入下载缓存失败", url=url, error=str(e))
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+                shutil.move(staging, dest)
+                return True
+            except OSError as e:
+                logger.warning("移动下载文件失败", path=staging, error=str(e))
+                return False
+        cached = self._lookup(url)
+        return cached is not None and self._materialize(str(self._blob_path(cached["sha256"])), dest)
+
+    def staging_path(self, url: str) -> str:
+        """
+        获取URL固定的下载暂存路径（下载器在其后加 .part 写入），同一URL每次运行得到相同的路径，
+        下载完成后以 move=True 加入缓存
+        """
+        temp_dir = self.directory / "tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        return str(temp_dir / hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def new_temp_file(self) -> str:
+        """在缓存目录中创建临时文件（用于无法续传的流式下载边下载边写入缓存，之后以 move=True 加入缓存）。"""
+        temp_dir = self.directory / "tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=temp_dir, suffix=".part")
+        os.close(fd)
+        return path
+
+    def _materialize(self, blob_path: str, dest: str) -> bool:
+        """将缓存内容复制到目标路径。"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+            shutil.copyfile(blob_path, dest)
+        except OSError as e:
+            logger.warning("读取下载缓存失败", path=blob_path, error=str(e))
+            return False
+        return True
+
+    def _touch(self, sha256: str):
+        """更新最近使用时间。"""
+        with self._lock:
+            index = self._load()
+            if sha256 in index["blobs"]:
+                index["blobs"][sha256]["last_access"] = time.time()
+                self._save(index)
+
+    def add(self, url: str, etag: Optional[str], path: str, move: bool = False, sha256: Optional[str] = None):
+        """
+        将刚下载的文件加入缓存
+
+        Args:
+            url: 下载地址
+            etag: 下载时服务器返回的ETag
+            path: 文件路径
+            move: 直接移入缓存而不是复制（文件须与缓存位于同一文件系统，例如 new_temp_file() 创建的文件）
+            sha256: 边下载边计算好的SHA-256，为空时读取文件计算
+        """
+        if not self.enabled:
+            if move:
+                os.remove(path)
+            return
+        sha256 = sha256 or _file_sha256(path)
+        blob_path = self._blob_path(sha256)
+        if blob_path.is_file():
+            if move:
+                os.remove(path)
+        elif move:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, blob_path)
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            # 先复制到同目录的临时文件再改名，避免留下不完整的内容文件
+            fd, temp_path = tempfile.mkstemp(dir=blob_path.parent, suffix=".tmp")
+            os.close(fd)
+            try:
+                shutil.copyfile(path, temp_path)
+                os.replace(temp_path, blob_path)
+            except OSError:
+                os.unlink(temp_path)
+                raise
+        with self._lock:
+            index = self._load()
+            index["urls"][url] = {"sha256": sha256, "etag": etag, "fetched_at": time.time()}
+            index["blobs"][sha256] = {
+                "size": blob_path.stat().st_size,
+                "name": os.path.basename(urlparse(url).path) or os.path.basename(path),
+                "last_access": time.time(),
+            }
+            self._evict(index, self.max_size, keep=sha256)
+            self._save(index)
+        logger.info("已缓存下载文件", url=url, sha256=sha256[:12])
+
+    # --- 管理 ---
+
+    def _staging_files(self) -> List[os.DirEntry]:
+        try:
+            with os.scandir(self.directory / "tmp") as it:
+                return [entry for entry in it if entry.is_file(follow_symlinks=False)]
+        except OSError:
+            return []
+
+    def _clean_staging(self, max_age: float) -> int:
+        """删除超过 max_age 秒未修改的暂存文件（未完成的下载），返回释放的字节数。"""
+        freed = 0
+        now = time.time()
+        for entry in self._staging_files():
+            try:
+                stat = entry.stat(follow_symlinks=False)
+                if now - stat.st_mtime < max_age:
+                    continue
+                os.remove(entry.path)
+            except OSError:
+                continue
+            freed += stat.st_size
+        if freed:
+            logger.info("已清理未完成的下载", freed=freed)
+        return freed
+
+    def _staging_size(self) -> int:
+        size = 0
+        for entry in self._staging_files():
+            try:
+                size += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                pass
+        return size
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], max_size: int, keep: Optional[str] = None,
+               staging_max_age: float = STAGING_MAX_AGE) -> int:
+        """
+        先删除过期的暂存文件，再按最久未使用淘汰，直到总大小（含暂存文件）不超过 max_size，返回释放的字节数。
+        """
+        freed = self._clean_staging(staging_max_age)
+        blobs = index["blobs"]
+        total = sum(blob["size"] for blob in blobs.values()) + self._staging_size()
+        for sha256 in sorted(blobs, key=lambda s: blobs[s]["last_access"]):
+            if total <= max_size:
+                break
+            if sha256 == keep:
+                continue
+            size = blobs.pop(sha256)["size"]
+            try:
+                os.remove(self._blob_path(sha256))
+            except OSError:
+                pass
+            total -= size
+            freed += size
+        index["urls"] = {url: entry for url, entry in index["urls"].items() if entry["sha256"] in blobs}
+        return freed
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """列出缓存内容，最近使用的在前。"""
+        with self._lock:
+            index = self._load()
+        urls_by_blob: Dict[str, List[str]] = {}
+        for url, entry in index["urls"].items():
+            urls_by_blob.setdefault(entry["sha256"], []).append(url)
+        result = [
+            {"sha256": sha256, "urls": urls_by_blob.get(sha256, []), **blob}
+            for sha256, blob in index["blobs"].items()
+        ]
+        return sorted(result, key=lambda item: item["last_access"], reverse=True)
+
+    def total_size(self) -> int:
+        """缓存内容和未完成下载的总大小。"""
+        return sum(entry["size"] for entry in self.entries()) + self._staging_size()
+
+    def prune(self, max_size: Optional[int] = None) -> int:
+        """
+        淘汰缓存直到总大小不超过 max_size（默认为配置的上限，0 表示清空，包括未完成的下载）
+
+        Returns:
+            释放的字节数
+        """
+        with self._lock:
+            index = self._load()
+            freed = self._evict(index, self.max_size if max_size is None else max_size,
+                                staging_max_age=0 if max_size == 0 else STAGING_MAX_AGE)
+            self._save(index)
+        logger.info("已清理下载缓存", freed=freed)
+        return freed
+
+
+# 全局下载缓存实例
+artifact_cache = ArtifactCache()
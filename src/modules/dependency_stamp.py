@@ -0,0 +1,186 @@
+"""
+依赖安装记录模块
+每次依赖安装成功后在虚拟环境中写入一个记录（.maibot-deps.json），包含：
+- 每个 requirements 文件规范化后的内容及其哈希
+- 解释器版本
+- 安装完成后虚拟环境中已安装包集合的哈希
+再次安装时，若记录仍然匹配则整体跳过；只有 requirements 变化时仅安装新增或改动的条目，
+解释器变化、已安装包被改动或安装选项变化时才执行完整安装。
+"""
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+import tempfile
+import time
+import structlog
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+logger = structlog.get_logger(__name__)
+
+STAMP_FILE = ".maibot-deps.json"
+STAMP_VERSION = 1
+
+# 在虚拟环境解释器中列出解释器版本和已安装的包
+_INSPECT_SCRIPT = (
+    "import json, sys, importlib.metadata as m\n"
+    "dists = sorted({(d.metadata['Name'] or '').lower() + '==' + d.version for d in m.distributions()})\n"
+    "print(json.dumps({'python': sys.implementation.name + ' ' + sys.version.split()[0], 'dists': dists}))\n"
+)
+
+
+def _canonical_name(name: str) -> str:
+    """PEP 503 规范化包名。"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def normalize_requirements(path: str, _seen: Optional[Set[str]] = None) -> List[str]:
+    """
+    读取 requirements 文件并规范化：去掉注释和空行、合并续行、规范化包名，
+    展开 -r/--requirement 引用的文件，结果去重排序（与书写顺序、格式无关）
+    """
+    seen = _seen if _seen is not None else set()
+    path = os.path.abspath(path)
+    if path in seen:
+        return []
+    seen.add(path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().replace("\\\n", "")
+    lines: Set[str] = set()
+    for raw in text.splitlines():
+        line = re.sub(r"(^|\s)#.*$", "", raw).strip()
+        if not line:
+            continue
+        line = re.sub(r"\s+", " ", line)
+        include = re.match(r"^(-r|--requirement)[ =]?(.+)$", line)
+        if include:
+            lines.update(normalize_requirements(os.path.join(os.path.dirname(path), include.group(2).strip()), seen))
+            continue
+        if not line.startswith("-"):
+            match = re.match(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$", line)
+            if match:
+                line = _canonical_name(match.group(1)) + match.group(2).replace(" ", "")
+        lines.add(line)
+    return sorted(lines)
+
+
+def _hash_lines(lines: List[str]) -> str:
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+class InstallPlan(NamedTuple):
+    """一次依赖安装需要做的事。"""
+    full: bool                 # 需要完整安装整个 requirements 文件
+    lines: List[str]           # 非完整安装时需要安装的条目（为空表示已是最新）
+    reason: str                # 说明，用于日志和提示
+    requirements: List[str]    # 规范化后的当前 requirements
+
+    @property
+    def up_to_date(self) -> bool:
+        return not self.full and not self.lines
+
+
+class DependencyStamp:
+    """读写虚拟环境中的依赖安装记录，并据此给出安装计划。"""
+
+    @staticmethod
+    def python_executable(venv_path: str) -> str:
+        if platform.system() == "Windows":
+            return os.path.join(venv_path, "Scripts", "python.exe")
+        return os.path.join(venv_path, "bin", "python")
+
+    def _stamp_path(self, venv_path: str) -> str:
+        return os.path.join(venv_path, STAMP_FILE)
+
+    def _load(self, venv_path: str) -> Dict[str, Any]:
+        try:
+            with open(self._stamp_path(venv_path), "r", encoding="utf-8") as f:
+                stamp = json.load(f)
+            if isinstance(stamp, dict) and stamp.get("version") == STAMP_VERSION:
+                return stamp
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("读取依赖安装记录失败", venv_path=venv_path, error=str(e))
+        return {"version": STAMP_VERSION, "requirements": {}}
+
+    def inspect(self, venv_path: str) -> Optional[Dict[str, str]]:
+        """
+        获取虚拟环境的解释器版本和已安装包集合的哈希
+
+        Returns:
+            {"python": ..., "installed": ...}，无法获取时返回None
+        """
+        try:
+            result = subprocess.run([self.python_executable(venv_path), "-c", _INSPECT_SCRIPT],
+                                    capture_output=True, text=True, timeout=60, check=True)
+            data = json.loads(result.stdout)
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            logger.warning("无法读取虚拟环境的已安装包", venv_path=venv_path, error=str(e))
+            return None
+        return {"python": data["python"], "installed": _hash_lines(data["dists"])}
+
+    def plan(self, venv_path: str, requirements_path: str) -> InstallPlan:
+        """根据记录比较当前 requirements 与虚拟环境状态，给出安装计划。"""
+        requirements = normalize_requirements(requirements_path)
+        stamp = self._load(venv_path)
+        entry = stamp["requirements"].get(os.path.abspath(requirements_path))
+        if entry is None:
+            return InstallPlan(True, [], "首次安装", requirements)
+
+        state = self.inspect(venv_path)
+        if state is None:
+            return InstallPlan(True, [], "无法检查虚拟环境", requirements)
+        if state["python"] != stamp.get("python"):
+            return InstallPlan(True, [], f"解释器已变化（{stamp.get('python')} -> {state['python']}）", requirements)
+        if state["installed"] != stamp.get("installed"):
+            return InstallPlan(True, [], "虚拟环境中的包在记录后被改动", requirements)
+        if entry["hash"] == _hash_lines(requirements):
+            return InstallPlan(False, [], "requirements 未变化", requirements)
+
+        previous = set(entry["lines"])
+        added = [line for line in requirements if line not in previous]
+        options_changed = any(line.startswith("-") for line in set(requirements) ^ previous)
+        if options_changed:
+            return InstallPlan(True, [], "安装选项已变化", requirements)
+        # 删除的条目不做卸载，与 pip install -r 的行为一致
+        return InstallPlan(False, added, f"{len(added)} 个条目有变化", requirements)
+
+    def write_delta(self, requirements_path: str, plan: InstallPlan) -> str:
+        """
+        把需要增量安装的条目写入与 requirements 同目录的临时文件（保持相对路径的含义），
+        同时保留原文件中的安装选项（如 --index-url），调用方负责删除
+        """
+        options = [line for line in plan.requirements if line.startswith("-")]
+        fd, path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(requirements_path)),
+                                    prefix=".maibot-delta-", suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(options + plan.lines) + "\n")
+        return path
+
+    def record(self, venv_path: str, requirements_path: str, plan: InstallPlan):
+        """安装成功后写入记录。"""
+        state = self.inspect(venv_path)
+        if state is None:
+            return
+        stamp = self._load(venv_path)
+        stamp.update(state)
+        stamp["requirements"][os.path.abspath(requirements_path)] = {
+            "hash": _hash_lines(plan.requirements),
+            "lines": plan.requirements,
+            "installed_at": time.time(),
+        }
+        try:
+            temp_path = self._stamp_path(venv_path) + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(stamp, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self._stamp_path(venv_path))
+        except OSError as e:
+            logger.warning("写入依赖安装记录失败", venv_path=venv_path, error=str(e))
+
+
+# 全局依赖安装记录实例
+dependency_stamp = DependencyStamp()
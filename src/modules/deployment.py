@@ -4,17 +4,18 @@
 支持从官方GitHub获取版本列表和更新日志
 """
 import fnmatch
-import glob
 import json
 import os
 import platform
 import re
 import shutil
 import subprocess
+import tarfile
 import tempfile
 import time
 import venv
 import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
@@ -24,11 +25,26 @@ import structlog
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.table import Table
-from tqdm import tqdm
 
 from ..core.config import config_manager
+from ..core.task_engine import (
+    aggregate_progress, create_progress_bar, current_task, report_progress, submit_in_context,
+)
 from ..ui.interface import ui
 from ..utils.common import validate_path
+from .archive_stream import HashingReader, extract_tar_stream, extract_zip, github_tarball_url
+from .artifact_cache import artifact_cache
+from .dependency_stamp import dependency_stamp
+from .mirror_selector import mirror_selector
+from .network_probe import network_probe
+from .protected_files import PROTECTED_PATTERNS
+from .release_sync import sync_release
+from .snapshot_store import snapshot_store
+from .staged_update import StagedUpdate, has_previous, smoke_check, swap_previous
+from .downloader import DownloadError, SegmentedDownloader
+from .git_mirror import GitMirrorError, git_mirror, parse_source_url
+from .github_metadata import github_metadata
+from .http_client import http_client
 from .mongodb_installer import mongodb_installer
 from .webui_installer import webui_installer
 
@@ -44,12 +60,6 @@ class DeploymentManager:
         self.github_api_base = "https://api.github.com"
         self.napcat_repo = "NapNeko/NapCatQQ"
         
-        # 缓存
-        self._versions_cache = None
-        self._napcat_versions_cache = None
-        self._cache_timestamp = None
-        self._cache_duration = 300  # 5分钟缓存
-        
         # 支持的分支
         self.supported_branches = ["main", "dev"]
         
@@ -105,6 +115,8 @@ class DeploymentManager:
     def install_dependencies_in_venv(self, venv_path: str, requirements_path: str) -> bool:
         """
         在虚拟环境中安装依赖
+        根据虚拟环境中的安装记录，requirements 和已安装的包都未变化时跳过安装，
+        仅 requirements 有条目变化时只安装变化的条目
         
         Args:
             venv_path: 虚拟环境路径
@@ -113,12 +125,41 @@ class DeploymentManager:
         Returns:
             是否安装成功
         """
-        pypi_mirrors = [
-            "https://pypi.tuna.tsinghua.edu.cn/simple",
-            "https://pypi.org/simple",
-            "https://mirrors.aliyun.com/pypi/simple",
-            "https://pypi.douban.com/simple"
-        ]
+        if not os.path.exists(requirements_path):
+            ui.print_warning("未找到requirements.txt文件，跳过依赖安装")
+            return True
+
+        try:
+            plan = dependency_stamp.plan(venv_path, requirements_path)
+        except OSError as e:
+            logger.warning("读取requirements失败，执行完整安装", error=str(e))
+            return self._install_requirements(venv_path, requirements_path)
+
+        logger.info("依赖安装计划", requirements=requirements_path, full=plan.full,
+                    changed=len(plan.lines), reason=plan.reason)
+        if plan.up_to_date:
+            ui.print_success(f"依赖未变化，跳过安装（{os.path.basename(os.path.dirname(os.path.abspath(requirements_path)))}）")
+            return True
+        if plan.full:
+            ui.print_info(f"执行完整依赖安装：{plan.reason}")
+            success = self._install_requirements(venv_path, requirements_path)
+        else:
+            ui.print_info(f"requirements 中有 {len(plan.lines)} 个条目变化，仅安装变化的部分")
+            delta_path = dependency_stamp.write_delta(requirements_path, plan)
+            try:
+                success = self._install_requirements(venv_path, delta_path)
+            finally:
+                os.remove(delta_path)
+
+        if success:
+            dependency_stamp.record(venv_path, requirements_path, plan)
+        return success
+
+    def _install_requirements(self, venv_path: str, requirements_path: str) -> bool:
+        """使用uv（不可用时回退到pip）安装 requirements 文件，按测速结果依次尝试PyPI索引"""
+        pypi_mirrors = mirror_selector.ordered_indexes()
+        ui.print_info(f"PyPI索引（按速度排序）：{pypi_mirrors[0]}" +
+                      (f"，备用 {len(pypi_mirrors) - 1} 个" if len(pypi_mirrors) > 1 else ""))
         
         def is_uv_available() -> bool:
             """检查uv是否可用"""
@@ -144,10 +185,18 @@ class DeploymentManager:
                     universal_newlines=True
                 )
                 
-                # 实时读取输出
+                # 实时读取输出：后台任务中作为进度上报，不直接写终端以免打乱菜单
+                in_task = current_task.get() is not None
                 if process.stdout:
                     for line in process.stdout:
-                        print(line, end='')  # 直接打印到终端
+                        line = line.rstrip()
+                        if not line:
+                            continue
+                        logger.debug(f"{description}输出", line=line)
+                        if in_task:
+                            report_progress(line)
+                        else:
+                            ui.console.print(line, style="dim", markup=False, highlight=False)
                 
                 # 等待进程完成
                 process.wait()
@@ -166,10 +215,6 @@ class DeploymentManager:
                 return False
         
         try:
-            if not os.path.exists(requirements_path):
-                ui.print_warning("未找到requirements.txt文件，跳过依赖安装")
-                return True
-
             # 检查uv是否可用
             if not is_uv_available():
                 ui.print_warning("未找到uv工具，建议安装uv以获得更快的依赖安装速度")
@@ -194,52 +239,47 @@ class DeploymentManager:
             logger.info("开始在虚拟环境中安装依赖", venv_path=venv_path, requirements=requirements_path, use_uv=use_uv)
 
             if use_uv:
-                # 使用uv安装依赖
-                # uv会自动处理镜像源和pip升级
-                install_cmd = [
-                    uv_exe, "pip", "install", "-r", requirements_path,
-                    "-i", pypi_mirrors[0]  # 使用第一个镜像源
-                ]
-                
-                # 添加虚拟环境路径
-                if platform.system() == "Windows":
-                    python_exe = os.path.join(venv_path, "Scripts", "python.exe")
-                else:
-                    python_exe = os.path.join(venv_path, "bin", "python")
-                install_cmd.extend(["--python", python_exe])
-                
-                return run_command_with_output(install_cmd, "使用uv安装依赖")
+                # 使用uv安装依赖，uv会自动处理pip升级；当前索引失败时换下一个
+                python_exe = dependency_stamp.python_executable(venv_path)
+                for index, mirror in enumerate(pypi_mirrors):
+                    install_cmd = [
+                        uv_exe, "pip", "install", "-r", requirements_path,
+                        "-i", mirror, "--python", python_exe
+                    ]
+                    if run_command_with_output(install_cmd, "使用uv安装依赖"):
+                        if index > 0:
+                            # 测速结果已不可靠，下次重新测速
+                            mirror_selector.invalidate()
+                        return True
+                    if index < len(pypi_mirrors) - 1:
+                        ui.print_warning(f"使用 {mirror} 安装失败，尝试下一个源：{pypi_mirrors[index + 1]}")
+                return False
             else:
                 # 使用原有的pip逻辑作为后备
-                # 先升级pip，自动切换源
-                pip_upgraded = False
-                for mirror in pypi_mirrors:
-                    upgrade_cmd = [pip_exe, "install", "--upgrade", "pip", "-i", mirror]
-                    try:
-                        subprocess.run(upgrade_cmd, check=True, capture_output=True, text=True)
-                        pip_upgraded = True
-                        ui.print_info(f"pip升级成功，使用源：{mirror}")
-                        break
-                    except subprocess.CalledProcessError as e:
-                        ui.print_warning(f"pip升级失败，尝试下一个源：{mirror}")
-                if not pip_upgraded:
-                    ui.print_error("所有pip源升级均失败")
-                    return False
+                # pip自身升级只尝试最快的源一次，失败不影响依赖安装
+                upgrade_cmd = [pip_exe, "install", "--upgrade", "pip", "-i", pypi_mirrors[0]]
+                try:
+                    subprocess.run(upgrade_cmd, check=True, capture_output=True, text=True, timeout=120)
+                    ui.print_info(f"pip升级成功，使用源：{pypi_mirrors[0]}")
+                except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+                    ui.print_warning("pip升级失败，继续使用当前版本安装依赖")
+                    logger.warning("pip升级失败", mirror=pypi_mirrors[0], error=str(e))
 
-                # 安装依赖，自动切换源
+                # 安装依赖，当前索引失败时换下一个
                 deps_installed = False
-                for mirror in pypi_mirrors:
+                for index, mirror in enumerate(pypi_mirrors):
                     install_cmd = [
                         pip_exe, "install", "-r", requirements_path,
                         "-i", mirror
                     ]
-                    try:
-                        subprocess.run(install_cmd, check=True, capture_output=True, text=True)
+                    if run_command_with_output(install_cmd, "使用pip安装依赖"):
                         deps_installed = True
-                        ui.print_info(f"依赖安装成功，使用源：{mirror}")
+                        if index > 0:
+                            # 测速结果已不可靠，下次重新测速
+                            mirror_selector.invalidate()
                         break
-                    except subprocess.CalledProcessError as e:
-                        ui.print_warning(f"依赖安装失败，尝试下一个源：{mirror}")
+                    if index < len(pypi_mirrors) - 1:
+                        ui.print_warning(f"使用 {mirror} 安装失败，尝试下一个源：{pypi_mirrors[index + 1]}")
                 if not deps_installed:
                     ui.print_error("所有pip源依赖安装均失败")
                     return False
@@ -277,60 +317,23 @@ class DeploymentManager:
         
         return python_exe if os.path.exists(python_exe) else None
 
-    def check_network_connection(self) -> Tuple[bool, str]:
+    def check_network_connection(self, force: bool = False) -> Tuple[bool, str]:
         """
-        检查网络连接
+        检查网络连接（并发探测GitHub和PyPI索引，任一可用即返回，结论短时间内缓存）
         返回：(是否连接成功, 错误消息)
         """
-        endpoints = [
-            ("https://api.github.com", "GitHub API"),
-            ("https://github.com", "GitHub"),
-            ("https://pypi.tuna.tsinghua.edu.cn", "清华PyPI镜像")
-        ]
-        
-        for url, name in endpoints:
-            try:
-                response = requests.get(url, timeout=5, verify=False)
-                if response.status_code < 400:  # 2xx 或 3xx 响应码表示连接成功
-                    logger.info(f"网络连接检查成功", endpoint=name)
-                    return True, ""
-            except requests.RequestException as e:
-                logger.warning(f"网络连接失败", endpoint=name, error=str(e))
-                continue
-        
-        # 尝试ping一下常见DNS
-        try:
-            if platform.system() == "Windows":
-                ping_cmd = ["ping", "-n", "1", "-w", "1000", "8.8.8.8"]
-            else:
-                ping_cmd = ["ping", "-c", "1", "-W", "1", "8.8.8.8"]
-            
-            result = subprocess.run(ping_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if result.returncode == 0:
-                return False, "DNS可达但GitHub不可访问，可能需要代理"
-        except Exception:
-            pass
-            
-        return False, "网络连接不可用，请检查网络设置或代理配置"
+        return network_probe.check(mirror_selector.indexes, force=force)
         
-    def _is_cache_valid(self) -> bool:
-        """检查缓存是否有效"""
-        if self._cache_timestamp is None:
-            return False
-        import time
-        return (time.time() - self._cache_timestamp) < self._cache_duration
-    
-    def get_github_releases(self, repo: str, include_prerelease: bool = True) -> List[Dict]:
-        """从GitHub API获取releases信息"""
+    def get_github_releases(self, repo: str, include_prerelease: bool = True,
+                            force_refresh: bool = False) -> List[Dict]:
+        """从GitHub API获取releases信息（经过本地元数据缓存）"""
         try:
             url = f"{self.github_api_base}/repos/{repo}/releases"
             headers = {"Accept": "application/vnd.github.v3+json"}
             
-            ui.print_info(f"正在获取 {repo} 的版本信息...")
-            response = requests.get(url, headers=headers, timeout=30,verify=False)
-            response.raise_for_status()
-            
-            releases = response.json()
+            if force_refresh or not github_metadata.has_cached(url):
+                ui.print_info(f"正在获取 {repo} 的版本信息...")
+            releases = github_metadata.get_json(url, headers=headers, force_refresh=force_refresh)
             
             if include_prerelease:
                 return releases
@@ -346,16 +349,13 @@ class DeploymentManager:
             logger.error("版本信息解析失败", error=str(e))
             return []
     
-    def get_github_branches(self, repo: str) -> List[Dict]:
-        """获取GitHub分支信息"""
+    def get_github_branches(self, repo: str, force_refresh: bool = False) -> List[Dict]:
+        """获取GitHub分支信息（经过本地元数据缓存）"""
         try:
             url = f"{self.github_api_base}/repos/{repo}/branches"
             headers = {"Accept": "application/vnd.github.v3+json"}
 
-            response = requests.get(url, headers=headers, timeout=30, verify=False)
-            response.raise_for_status()
-            
-            branches = response.json()
+            branches = github_metadata.get_json(url, headers=headers, force_refresh=force_refresh)
             # 返回所有分支
             return branches
             
@@ -366,9 +366,6 @@ class DeploymentManager:
     
     def get_maimai_versions(self, force_refresh: bool = False) -> List[Dict]:
         """获取MaiMai版本列表"""
-        if not force_refresh and self._is_cache_valid() and self._versions_cache:
-            return self._versions_cache
-        
         versions = []
         
         # 离线模式下返回默认分支
@@ -387,17 +384,12 @@ class DeploymentManager:
                     "changelog": f"离线模式无法获取详细更新日志"
                 })
             
-            # 更新缓存
-            self._versions_cache = versions
-            import time
-            self._cache_timestamp = time.time()
-            
             return versions
         
         # 在线模式正常获取版本信息
         try:
             # 获取releases
-            releases = self.get_github_releases(self.official_repo)
+            releases = self.get_github_releases(self.official_repo, force_refresh=force_refresh)
             for release in releases:
                 versions.append({
                     "type": "release",
@@ -411,7 +403,7 @@ class DeploymentManager:
                 })
             
             # 获取分支
-            branches = self.get_github_branches(self.official_repo)
+            branches = self.get_github_branches(self.official_repo, force_refresh=force_refresh)
             for branch in branches:
                 versions.append({
                     "type": "branch",
@@ -449,99 +441,76 @@ class DeploymentManager:
                     "changelog": f"离线模式无法获取详细更新日志"
                 })
         
-        # 更新缓存
-        self._versions_cache = versions
-        import time
-        self._cache_timestamp = time.time()
-        
         return versions
     
-    def get_mofox_versions(self) -> List[Dict]:
+    def get_mofox_versions(self, force_refresh: bool = False) -> List[Dict]:
         """获取MoFox_bot版本列表"""
-        if not self._is_cache_valid() or not self._versions_cache:
-            # 获取MoFox_bot的版本信息
-            try:
-                url = f"{self.github_api_base}/repos/MoFox-Studio/MoFox_Bot/releases"
-                headers = {"Accept": "application/vnd.github.v3+json"}
-                
+        # 获取MoFox_bot的版本信息（经过本地元数据缓存）
+        try:
+            url = f"{self.github_api_base}/repos/MoFox-Studio/MoFox_Bot/releases"
+            headers = {"Accept": "application/vnd.github.v3+json"}
+            
+            if force_refresh or not github_metadata.has_cached(url):
                 ui.print_info("正在获取 MoFox_bot 的版本信息...")
-                response = requests.get(url, headers=headers, timeout=30, verify=False)
-                response.raise_for_status()
-                
-                releases = response.json()
-                
-                versions = []
-                for release in releases:
-                    versions.append({
-                        "type": "release",
-                        "name": release["tag_name"],
-                        "display_name": release["name"] or release["tag_name"],
-                        "description": release["body"][:100] + "..." if len(release["body"]) > 100 else release["body"],
-                        "published_at": release["published_at"],
-                        "prerelease": release.get("prerelease", False),
-                        "download_url": release["zipball_url"],
-                        "changelog": release["body"]
-                    })
-                
-                # 获取分支
-                branches_url = f"{self.github_api_base}/repos/MoFox-Studio/MoFox_Bot/branches"
-                branches_response = requests.get(branches_url, headers=headers, timeout=30, verify=False)
-                branches_response.raise_for_status()
-                
-                branches = branches_response.json()
-                
-                for branch in branches:
-                    versions.append({
-                        "type": "branch",
-                        "name": branch["name"],
-                        "display_name": f"{branch['name']} (分支)",
-                        "description": f"{branch['name']} 分支 - 开发版本",
-                        "published_at": None,
-                        "prerelease": True,
-                        "download_url": f"https://github.com/MoFox-Studio/MoFox_Bot/archive/refs/heads/{branch['name']}.zip",
-                        "changelog": f"来自 {branch['name']} 分支的最新代码"
-                    })
-                
-                # 按发布时间排序，分支版本置顶
-                versions.sort(key=lambda x: (
-                    x["type"] != "branch",  # 分支优先
-                    x["published_at"] is None,  # 有发布时间的优先
-                    x["published_at"] if x["published_at"] else ""
-                ), reverse=True)
-                
-                self._versions_cache = versions
-                import time
-                self._cache_timestamp = time.time()
-                
-                return versions
-                
-            except requests.RequestException as e:
-                ui.print_error(f"获取MoFox_bot releases失败: {str(e)}")
-                logger.error("GitHub API请求失败", error=str(e), repo="MoFox-Studio/MoFox_Bot")
-                return []
-            except Exception as e:
-                ui.print_error(f"解析MoFox_bot版本信息失败: {str(e)}")
-                logger.error("版本信息解析失败", error=str(e))
-                return []
-        
-        return self._versions_cache
+            releases = github_metadata.get_json(url, headers=headers, force_refresh=force_refresh)
+            
+            versions = []
+            for release in releases:
+                versions.append({
+                    "type": "release",
+                    "name": release["tag_name"],
+                    "display_name": release["name"] or release["tag_name"],
+                    "description": release["body"][:100] + "..." if len(release["body"]) > 100 else release["body"],
+                    "published_at": release["published_at"],
+                    "prerelease": release.get("prerelease", False),
+                    "download_url": release["zipball_url"],
+                    "changelog": release["body"]
+                })
+            
+            # 获取分支
+            branches_url = f"{self.github_api_base}/repos/MoFox-Studio/MoFox_Bot/branches"
+            branches = github_metadata.get_json(branches_url, headers=headers, force_refresh=force_refresh)
+            
+            for branch in branches:
+                versions.append({
+                    "type": "branch",
+                    "name": branch["name"],
+                    "display_name": f"{branch['name']} (分支)",
+                    "description": f"{branch['name']} 分支 - 开发版本",
+                    "published_at": None,
+                    "prerelease": True,
+                    "download_url": f"https://github.com/MoFox-Studio/MoFox_Bot/archive/refs/heads/{branch['name']}.zip",
+                    "changelog": f"来自 {branch['name']} 分支的最新代码"
+                })
+            
+            # 按发布时间排序，分支版本置顶
+            versions.sort(key=lambda x: (
+                x["type"] != "branch",  # 分支优先
+                x["published_at"] is None,  # 有发布时间的优先
+                x["published_at"] if x["published_at"] else ""
+            ), reverse=True)
+            
+            return versions
+            
+        except requests.RequestException as e:
+            ui.print_error(f"获取MoFox_bot releases失败: {str(e)}")
+            logger.error("GitHub API请求失败", error=str(e), repo="MoFox-Studio/MoFox_Bot")
+            return []
+        except Exception as e:
+            ui.print_error(f"解析MoFox_bot版本信息失败: {str(e)}")
+            logger.error("版本信息解析失败", error=str(e))
+            return []
     
     def get_napcat_versions(self, force_refresh: bool = False) -> List[Dict]:
         """获取NapCat版本列表 - 从GitHub API获取最新5个版本"""
-        # 检查缓存
-        if not force_refresh and self._is_cache_valid() and self._napcat_versions_cache:
-            return self._napcat_versions_cache
-        
         try:
             # 从GitHub API获取NapCatQQ的最新releases
             url = f"{self.github_api_base}/repos/{self.napcat_repo}/releases"
             headers = {"Accept": "application/vnd.github.v3+json"}
             
-            ui.print_info("正在获取 NapCatQQ 的最新版本信息...")
-            response = requests.get(url, headers=headers, timeout=30, verify=False)
-            response.raise_for_status()
-            
-            releases = response.json()
+            if force_refresh or not github_metadata.has_cached(url):
+                ui.print_info("正在获取 NapCatQQ 的最新版本信息...")
+            releases = github_metadata.get_json(url, headers=headers, force_refresh=force_refresh)
             
             # 获取最新的5个版本
             latest_releases = releases[:5] if isinstance(releases, list) else []
@@ -549,6 +518,12 @@ class DeploymentManager:
             napcat_versions = []
             for release in latest_releases:
                 version_name = release.get("tag_name", "unknown")
+                # GitHub为发布附件提供 "sha256:<hex>" 格式的摘要，下载后用于校验
+                digests = {}
+                for asset in release.get("assets", []):
+                    digest = asset.get("digest") or ""
+                    if digest.startswith("sha256:") and len(digest) > len("sha256:"):
+                        digests[asset.get("name")] = digest[len("sha256:"):]
                 
                 # 为每个版本创建基础版和一键包版本
                 # 基础版下载链接
@@ -570,6 +545,7 @@ class DeploymentManager:
                     "size": 0,  # 大小需要额外获取
                     "changelog": release.get("body", "暂无更新日志"),
                     "asset_name": "NapCat.Shell.zip",
+                    "sha256": digests.get("NapCat.Shell.zip"),
                     "version": version_name
                 })
                 
@@ -583,6 +559,7 @@ class DeploymentManager:
                     "size": 0,  # 大小需要额外获取
                     "changelog": release.get("body", "暂无更新日志"),
                     "asset_name": "NapCat.Framework.Windows.OneKey.zip",
+                    "sha256": digests.get("NapCat.Framework.Windows.OneKey.zip"),
                     "version": version_name
                 })
                 
@@ -596,14 +573,10 @@ class DeploymentManager:
                     "size": 0,  # 大小需要额外获取
                     "changelog": release.get("body", "暂无更新日志"),
                     "asset_name": "NapCat.Shell.Windows.OneKey.zip",
+                    "sha256": digests.get("NapCat.Shell.Windows.OneKey.zip"),
                     "version": version_name
                 })
             
-            # 更新缓存
-            self._napcat_versions_cache = napcat_versions
-            import time
-            self._cache_timestamp = time.time()
-            
             return napcat_versions
             
         except requests.RequestException as e:
@@ -903,7 +876,7 @@ class DeploymentManager:
                 filename = napcat_version.get("asset_name", os.path.basename(download_url))
                 temp_file = os.path.join(temp_dir, filename)
                 
-                if not self.download_file(download_url, temp_file):
+                if not self.download_file(download_url, temp_file, sha256=napcat_version.get("sha256")):
                     return None
                 
                 # 解压到NapCat目录
@@ -913,8 +886,7 @@ class DeploymentManager:
                 ui.print_info("正在解压NapCat...")
                 
                 if filename.endswith('.zip'):
-                    with zipfile.ZipFile(temp_file, 'r') as zip_ref:
-                        zip_ref.extractall(napcat_dir)
+                    extract_zip(temp_file, napcat_dir)
                 else:
                     # 如果是其他格式，直接复制
                     shutil.copy2(temp_file, napcat_dir)
@@ -1088,76 +1060,48 @@ pause
             logger.error("启动NapCat安装程序失败", error=str(e))
             return False
 
-    def download_file(self, url: str, filename: str, max_retries: int = 3) -> bool:
-        """下载文件并显示进度，支持重试"""
+    def download_file(self, url: str, filename: str, max_retries: int = 3, sha256: Optional[str] = None) -> bool:
+        """下载文件，同一URL的内容未变化时直接使用下载缓存"""
+        return artifact_cache.fetch(
+            url, filename,
+            lambda download_url, path: self._download_file(download_url, path, max_retries, sha256),
+            offline=getattr(self, '_offline_mode', False),
+        )
+
+    def _download_file(self, url: str, filename: str, max_retries: int = 3, sha256: Optional[str] = None,
+                       display_name: Optional[str] = None) -> bool:
+        """分段并行下载文件并显示进度，中断后可续传，完成后校验长度和可选的SHA-256"""
+        display_name = display_name or os.path.basename(filename)
         if hasattr(self, '_offline_mode') and self._offline_mode:
             ui.print_error("当前处于离线模式，无法下载文件")
             return False
             
-        # 检查是否有代理设置
-        proxies = {}
-        # 从环境变量获取代理设置
-        http_proxy = os.environ.get('HTTP_PROXY') or os.environ.get('http_proxy')
-        https_proxy = os.environ.get('HTTPS_PROXY') or os.environ.get('https_proxy')
-        if http_proxy:
-            proxies['http'] = http_proxy
-        if https_proxy:
-            proxies['https'] = https_proxy
-            
+        # 代理由共享HTTP客户端统一处理（配置中的 http.proxy 或环境变量）
+        proxies = http_client.proxies
         if proxies:
             ui.print_info(f"使用代理设置: {proxies}")
         
-        # 重试逻辑
+        downloader = SegmentedDownloader(max_retries=max_retries)
+        # 重试逻辑：分段内部已按断点重试，这里的重试会复用 .part 文件继续下载
         for retry in range(max_retries):
             try:
-                ui.print_info(f"正在下载 {os.path.basename(filename)}... (尝试 {retry + 1}/{max_retries})")
+                ui.print_info(f"正在下载 {display_name}... (尝试 {retry + 1}/{max_retries})")
                 logger.info("开始下载文件", url=url, filename=filename, retry=retry+1)
                 
-                response = requests.get(url, stream=True, proxies=proxies, timeout=30, verify=False)
-                response.raise_for_status()
+                downloader.download(url, filename, sha256=sha256, desc=display_name)
                 
-                total_size = int(response.headers.get('content-length', 0))
-                
-                with open(filename, 'wb') as file, tqdm(
-                    desc=os.path.basename(filename),
-                    total=total_size,
-                    unit='iB',
-                    unit_scale=True,
-                    unit_divisor=1024,
-                ) as progress_bar:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            file.write(chunk)
-                            progress_bar.update(len(chunk))
-                
-                # 验证文件大小
-                if total_size > 0:
-                    actual_size = os.path.getsize(filename)
-                    if actual_size < total_size * 0.98:  # 允许2%的误差
-                        ui.print_warning(f"文件下载不完整: 预期 {total_size} 字节, 实际 {actual_size} 字节")
-                        if retry < max_retries - 1:
-                            ui.print_info("将重试下载...")
-                            continue
-                        else:
-                            ui.print_error("达到最大重试次数，文件可能不完整")
-                            return False
-                
-                ui.print_success(f"{os.path.basename(filename)} 下载完成")
+                ui.print_success(f"{display_name} 下载完成")
                 logger.info("文件下载完成", filename=filename)
                 return True
                 
-            except requests.RequestException as e:
+            except (requests.RequestException, DownloadError, OSError) as e:
                 ui.print_warning(f"下载失败 (尝试 {retry + 1}/{max_retries}): {str(e)}")
                 logger.warning("文件下载失败", error=str(e), url=url, retry=retry+1)
                 
                 if retry < max_retries - 1:
                     ui.print_info("3秒后重试...")
-                    import time
                     time.sleep(3)
                     continue
-                else:
-                    ui.print_error("达到最大重试次数，下载失败")
-                    return False
                     
         ui.print_error(f"下载失败：达到最大重试次数 {max_retries}")
         logger.error("文件下载失败", url=url)
@@ -1169,11 +1113,9 @@ pause
             ui.print_info("正在解压文件...")
             logger.info("开始解压文件", archive=archive_path, target=extract_to)
             
-            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_to)
+            stats = extract_zip(archive_path, extract_to)
             
-            ui.print_success("解压完成")
-            logger.info("文件解压完成")
+            ui.print_success(f"解压完成：{stats.files} 个文件，{stats.throughput:.1f} MB/s")
             return True
             
         except Exception as e:
@@ -1181,22 +1123,128 @@ pause
             logger.error("文件解压失败", error=str(e))
             return False
     
+    def install_source_archive(self, download_url: str, target_dir: str) -> bool:
+        """
+        下载源码包并去掉顶层目录直接解压到 target_dir
+        GitHub源码优先从本地git镜像导出（只下载新提交），其次以tar.gz边下载边解压（同时写入下载缓存），
+        其他地址或以上方式失败时下载zip逐个成员解压
+        """
+        # 失败时不清理 target_dir：其中可能有并行阶段正在创建的内容（如虚拟环境），
+        # 而后续的备选方式导出的是同一份源码，会覆盖不完整的文件
+        offline = getattr(self, '_offline_mode', False)
+        if git_mirror.handles(download_url):
+            try:
+                ui.print_info(f"正在通过git镜像获取 {os.path.basename(target_dir)}...")
+                commit = git_mirror.checkout(download_url, target_dir)
+                ui.print_success(f"已从git镜像获取源码（提交 {commit[:12]}）")
+                return True
+            except (GitMirrorError, tarfile.TarError, OSError, subprocess.SubprocessError) as e:
+                ui.print_warning(f"git镜像获取失败，改为下载源码包：{str(e)}")
+                logger.warning("git镜像获取失败", url=download_url, error=str(e))
+
+        tarball_url = github_tarball_url(download_url)
+        if tarball_url:
+            try:
+                cached = artifact_cache.lookup(tarball_url, offline)
+                if cached is not None:
+                    with open(cached, "rb") as f:
+                        count = extract_tar_stream(f, target_dir)
+                    logger.info("已从下载缓存安装源码", url=tarball_url, files=count, target=target_dir)
+                    return True
+                # 网络探测已确认该主机不可达时不再尝试，直接改用zip（可能来自下载缓存）
+                if not offline and network_probe.is_reachable(tarball_url) is False:
+                    logger.info("源码包地址不可达，跳过流式安装", url=tarball_url)
+                elif not offline:
+                    count = self._stream_tarball(tarball_url, target_dir)
+                    logger.info("源码流式安装完成", url=tarball_url, files=count, target=target_dir)
+                    return True
+            except (requests.RequestException, tarfile.TarError, OSError) as e:
+                ui.print_warning(f"流式安装失败，改为下载zip安装：{str(e)}")
+                logger.warning("源码流式安装失败", url=tarball_url, error=str(e))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive_path = os.path.join(temp_dir, "source.zip")
+            if not self.download_file(download_url, archive_path):
+                return False
+            try:
+                count = extract_zip(archive_path, target_dir, strip_top=True).files
+            except (zipfile.BadZipFile, OSError) as e:
+                ui.print_error(f"解压失败：{str(e)}")
+                logger.error("文件解压失败", error=str(e))
+                return False
+        logger.info("源码安装完成", url=download_url, files=count, target=target_dir)
+        return True
+
+    def _stream_tarball(self, url: str, target_dir: str) -> int:
+        """边下载边解压tar.gz，原始字节同时写入下载缓存，返回写入的文件数。"""
+        ui.print_info(f"正在下载并安装 {os.path.basename(target_dir)}...")
+        with http_client.get(url, stream=True) as response:
+            response.raise_for_status()
+            # 只去掉传输层编码，保留tar.gz本身
+            response.raw.decode_content = True
+            cache_path = artifact_cache.new_temp_file() if artifact_cache.enabled else None
+            try:
+                with open(cache_path or os.devnull, "wb") as sink, create_progress_bar(
+                    desc=os.path.basename(target_dir),
+                    total=int(response.headers.get("content-length", 0)),
+                    unit='iB',
+                    unit_scale=True,
+                    unit_divisor=1024,
+                ) as progress_bar:
+                    reader = HashingReader(response.raw, sink, progress_bar)
+                    count = extract_tar_stream(reader, target_dir)
+                    # 读完tar结尾的填充，使缓存内容与完整的响应体一致
+                    while reader.read(1024 * 1024):
+                        pass
+            except BaseException:
+                if cache_path:
+                    os.remove(cache_path)
+                raise
+            if cache_path:
+                try:
+                    artifact_cache.add(url, response.headers.get("ETag"), cache_path, move=True,
+                                       sha256=reader.digest.hexdigest())
+                except OSError as e:
+                    logger.warning("写入下载缓存失败", url=url, error=str(e))
+        return count
+
     def deploy_instance(self) -> bool:
         """部署新实例 - 重构版本"""
+        deploy_config = self.prepare_deployment()
+        if not deploy_config:
+            return False
+        return self.run_deployment(deploy_config)
+
+    def prepare_deployment(self) -> Optional[Dict]:
+        """
+        部署的交互阶段：检查网络、收集部署配置并确认
+
+        Returns:
+            用户确认后的部署配置，取消或失败时返回None
+        """
         try:
             ui.clear_screen()
             ui.components.show_title("实例部署助手", symbol="🚀")
 
             if not self._check_network_for_deployment():
-                return False
+                return None
 
             deploy_config = self._get_deployment_config()
             if not deploy_config:
-                return False
+                return None
 
             if not self._confirm_deployment(deploy_config):
-                return False
+                return None
+            return deploy_config
 
+        except Exception as e:
+            ui.print_error(f"部署失败：{str(e)}")
+            logger.error("实例部署失败", error=str(e))
+            return None
+
+    def run_deployment(self, deploy_config: Dict) -> bool:
+        """部署的执行阶段：下载安装各组件并保存实例配置，可作为后台任务运行。"""
+        try:
             ui.print_info("🚀 开始部署流程...")
             logger.info("开始部署实例", config=deploy_config)
 
@@ -1204,6 +1252,7 @@ pause
             paths = self._run_deployment_steps(deploy_config)
 
             # 完成部署
+            report_progress("完成部署配置", 95)
             if not self._finalize_deployment(deploy_config, **paths):
                 return False
 
@@ -1211,6 +1260,7 @@ pause
             self._show_post_deployment_info()
 
             logger.info("实例部署完成", serial=deploy_config['serial_number'])
+            http_client.log_summary()
             return True
 
         except Exception as e:
@@ -1334,8 +1384,14 @@ pause
         else:  # MoFox_bot
             ui.print_info("MoFox_bot无需MongoDB，已自动跳过")
 
-        # 询问是否需要安装WebUI
+        # 询问是否需要安装WebUI，分支在此处选定，以便部署时与其他组件并行下载
         install_webui = ui.confirm("是否需要安装WebUI？（Web聊天室界面）(目前处于预览版, 可能不稳定)")
+        webui_branch = None
+        if install_webui:
+            webui_branch = webui_installer.show_webui_branch_menu()
+            if webui_branch is None:
+                ui.print_info("已跳过WebUI安装")
+                install_webui = False
 
         # 获取基本信息
         existing_configs = config_manager.get_all_configurations()
@@ -1396,7 +1452,8 @@ pause
             "install_napcat": install_napcat,
             "install_mongodb": install_mongodb,
             "mongodb_path": mongodb_path,  # 直接保存MongoDB路径
-            "install_webui": install_webui
+            "install_webui": install_webui,
+            "webui_branch": webui_branch
         }
     
     def _confirm_deployment(self, deploy_config: Dict) -> bool:
@@ -1460,40 +1517,22 @@ pause
         selected_version = deploy_config["selected_version"]
         install_dir = deploy_config["install_dir"]
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 下载源码
-            ui.print_info(f"正在下载{bot_type}源码...")
-            download_url = selected_version["download_url"]
-            archive_path = os.path.join(temp_dir, f"{selected_version['name']}.zip")
-            
-            if not self.download_file(download_url, archive_path):
-                ui.print_error(f"{bot_type}下载失败")
-                return None
-            
-            # 解压到临时目录
-            ui.print_info(f"正在解压{bot_type}...")
-            if not self.extract_archive(archive_path, temp_dir):
-                ui.print_error(f"{bot_type}解压失败")
-                return None
-            
-            # 查找解压后的目录
-            extracted_dirs = [d for d in os.listdir(temp_dir) if os.path.isdir(os.path.join(temp_dir, d)) and d != "__MACOSX"]
-            if not extracted_dirs:
-                ui.print_error("解压后未找到项目目录")
-                return None
-            
-            source_dir = os.path.join(temp_dir, extracted_dirs[0])
-            
-            # 创建目标目录并复制文件
-            os.makedirs(install_dir, exist_ok=True)
-            target_dir = os.path.join(install_dir, bot_type)
-            
-            ui.print_info(f"正在安装{bot_type}文件...")
-            shutil.copytree(source_dir, target_dir)
-            
-            ui.print_success(f"✅ {bot_type}安装完成")
-            logger.info(f"{bot_type}安装成功", path=target_dir)
-            return target_dir
+        os.makedirs(install_dir, exist_ok=True)
+        target_dir = os.path.join(install_dir, bot_type)
+        # 虚拟环境可能已在下载阶段并行创建
+        if os.path.exists(target_dir) and set(os.listdir(target_dir)) - {"venv"}:
+            ui.print_error(f"目标目录已存在且不为空：{target_dir}")
+            return None
+        
+        # 下载源码并直接解压到安装目录
+        ui.print_info(f"正在下载{bot_type}源码...")
+        if not self.install_source_archive(selected_version["download_url"], target_dir):
+            ui.print_error(f"{bot_type}下载失败")
+            return None
+        
+        ui.print_success(f"✅ {bot_type}安装完成")
+        logger.info(f"{bot_type}安装成功", path=target_dir)
+        return target_dir
     
     def _install_adapter_if_needed(self, deploy_config: Dict, bot_path: str) -> str:
         """第二步：检测版本并安装适配器"""
@@ -1576,64 +1615,34 @@ pause
             logger.error("适配器处理异常", error=str(e))
             return "适配器处理失败"
     
+    @staticmethod
+    def _adapter_download_url(adapter_version: str) -> str:
+        """适配器源码包下载地址。"""
+        ref = f"heads/{adapter_version}" if adapter_version in ("main", "dev") else f"tags/{adapter_version}"
+        return f"https://codeload.github.com/MaiM-with-u/MaiBot-Napcat-Adapter/zip/refs/{ref}"
+
     def _download_specific_adapter_version(self, adapter_version: str, maibot_path: str) -> str:
         """下载特定版本的适配器"""
         
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            if adapter_version == "main" or adapter_version == "dev":
-                ui.print_info(f"正在下载{adapter_version}的适配器...")
-                adapter_url = f"https://codeload.github.com/MaiM-with-u/MaiBot-Napcat-Adapter/zip/refs/heads/{adapter_version}"
-            else:
-                ui.print_info(f"正在下载v{adapter_version}版本的适配器...")
-                adapter_url = f"https://codeload.github.com/MaiM-with-u/MaiBot-Napcat-Adapter/zip/refs/tags/{adapter_version}"
-            adapter_zip = os.path.join(temp_dir, f"adapter_{adapter_version}.zip")
-            
-            if not self.download_file(adapter_url, adapter_zip):
-                ui.print_warning(f"v{adapter_version}适配器下载失败")
-                return f"v{adapter_version}适配器下载失败"
-            
-            # 解压到临时目录
-            temp_extract = os.path.join(temp_dir, f"adapter_extract_v{adapter_version}")
-            if not self.extract_archive(adapter_zip, temp_extract):
-                ui.print_warning("适配器解压失败")
-                return "适配器解压失败"
-            
-            # 查找解压后的目录并复制到正确位置
-            extracted_dirs = [d for d in os.listdir(temp_extract) if os.path.isdir(os.path.join(temp_extract, d))]
-            adapter_extract_path = os.path.join(maibot_path, "adapter")
-            
-            if extracted_dirs:
-                # 找到解压后的根目录（通常是 MaiBot-Napcat-Adapter-版本号）
-                source_adapter_dir = os.path.join(temp_extract, extracted_dirs[0])
-                
-                # 确保目标目录不存在，然后复制
-                if os.path.exists(adapter_extract_path):
-                    shutil.rmtree(adapter_extract_path)
-                shutil.copytree(source_adapter_dir, adapter_extract_path)
-                
-                ui.print_success(f"v{adapter_version}适配器安装完成")
-                logger.info("适配器安装成功", version=adapter_version, path=adapter_extract_path)
-                return adapter_extract_path
-            else:
-                # 如果没有找到子目录，可能是直接解压的文件
-                # 尝试直接移动整个解压目录的内容
-                if os.path.exists(adapter_extract_path):
-                    shutil.rmtree(adapter_extract_path)
-                os.makedirs(adapter_extract_path)
-                
-                # 移动所有内容到目标目录
-                for item in os.listdir(temp_extract):
-                    src = os.path.join(temp_extract, item)
-                    dst = os.path.join(adapter_extract_path, item)
-                    if os.path.isdir(src):
-                        shutil.copytree(src, dst)
-                    else:
-                        shutil.copy2(src, dst)
-                
-                ui.print_success(f"{adapter_version}适配器安装完成")
-                logger.info("适配器安装成功", version=adapter_version, path=adapter_extract_path)
-                return adapter_extract_path
+        if adapter_version == "main" or adapter_version == "dev":
+            ui.print_info(f"正在下载{adapter_version}的适配器...")
+        else:
+            ui.print_info(f"正在下载v{adapter_version}版本的适配器...")
+        adapter_url = self._adapter_download_url(adapter_version)
+        
+        # 确保目标目录不存在，然后直接解压到该目录
+        adapter_extract_path = os.path.join(maibot_path, "adapter")
+        if os.path.exists(adapter_extract_path):
+            shutil.rmtree(adapter_extract_path)
+        
+        if not self.install_source_archive(adapter_url, adapter_extract_path):
+            ui.print_warning(f"v{adapter_version}适配器下载失败")
+            return f"v{adapter_version}适配器下载失败"
+        
+        ui.print_success(f"v{adapter_version}适配器安装完成")
+        logger.info("适配器安装成功", version=adapter_version, path=adapter_extract_path)
+        return adapter_extract_path
     
     def _install_napcat(self, deploy_config: Dict, bot_path: str) -> str:
         """第三步：安装NapCat"""
@@ -1696,12 +1705,15 @@ pause
         logger.error("NapCat路径检测失败", install_dir=install_dir, max_attempts=max_attempts)
         return None
 
-    def _setup_python_environment(self, bot_path: str, adapter_path: str) -> str:
-        """第四步：设置Python环境"""
+    def _setup_python_environment(self, bot_path: str, adapter_path: str,
+                                  venv_result: Optional[Tuple[bool, str]] = None) -> str:
+        """第四步：设置Python环境（venv_result 为已创建好的虚拟环境结果，为空时在此创建）"""
         ui.console.print("\n[🐍 第四步：设置Python环境]", style=ui.colors["primary"])
         
-        ui.print_info("正在创建Python虚拟环境...")
-        venv_success, venv_path = self.create_virtual_environment(bot_path)
+        if venv_result is None:
+            ui.print_info("正在创建Python虚拟环境...")
+            venv_result = self.create_virtual_environment(bot_path)
+        venv_success, venv_path = venv_result
         
         if venv_success:
             requirements_path = os.path.join(bot_path, "requirements.txt")
@@ -1873,8 +1885,92 @@ pause
             logger.error("配置文件设置失败", error=str(e))
             return False
 
+    def _collect_artifacts(self, deploy_config: Dict) -> Dict[str, Tuple[str, Optional[str]]]:
+        """列出部署需要下载的所有文件：名称 -> (下载地址, SHA-256)。"""
+        bot_type = deploy_config.get("bot_type", "MaiBot")
+        selected_version = deploy_config["selected_version"]
+        download_url = selected_version["download_url"]
+        # 源码安装优先使用tar.gz（见 install_source_archive），预取同一地址
+        artifacts = {bot_type: (github_tarball_url(download_url) or download_url, None)}
+
+        if deploy_config.get("install_adapter"):
+            from ..utils.version_detector import get_version_requirements
+            version_reqs = get_version_requirements(selected_version.get("display_name") or selected_version.get("name", ""))
+            if version_reqs["needs_adapter"]:
+                adapter_url = self._adapter_download_url(version_reqs["adapter_version"])
+                artifacts["适配器"] = (github_tarball_url(adapter_url) or adapter_url, None)
+
+        napcat_version = deploy_config.get("napcat_version")
+        if deploy_config.get("install_napcat") and napcat_version:
+            artifacts["NapCat"] = (napcat_version["download_url"], napcat_version.get("sha256"))
+
+        webui_branch = deploy_config.get("webui_branch")
+        if deploy_config.get("install_webui") and webui_branch:
+            artifacts["WebUI"] = (webui_branch["download_url"], None)
+        return artifacts
+
+    def _prefetch_artifact(self, name: str, url: str, sha256: Optional[str] = None) -> bool:
+        """将文件下载到下载缓存（已缓存且未变化时跳过），安装阶段直接从缓存读取；git镜像可获取的源码则同步到镜像。"""
+        if git_mirror.handles(url):
+            try:
+                git_mirror.fetch(*parse_source_url(url))
+                return True
+            except (GitMirrorError, OSError, subprocess.SubprocessError) as e:
+                logger.warning("git镜像同步失败，改为下载源码包", url=url, error=str(e))
+        if artifact_cache.lookup(url, getattr(self, '_offline_mode', False)) is not None:
+            return True
+        try:
+            etag = artifact_cache.probe_etag(url)
+        except requests.RequestException:
+            etag = None
+        # 固定的暂存路径：失败时保留 .part 文件，下次运行继续下载
+        staging_path = artifact_cache.staging_path(url)
+        if not self._download_file(url, staging_path, sha256=sha256, display_name=name):
+            return False
+        try:
+            artifact_cache.add(url, etag, staging_path, move=True)
+        except OSError as e:
+            logger.warning("写入下载缓存失败", url=url, error=str(e))
+            return False
+        return True
+
+    def _fetch_artifacts(self, deploy_config: Dict, venv_target: str) -> Future:
+        """
+        部署的获取阶段：并行下载并校验所有文件（汇总显示进度），同时开始创建虚拟环境
+
+        Returns:
+            创建虚拟环境的Future，结果为 create_virtual_environment 的返回值
+        """
+        artifacts = self._collect_artifacts(deploy_config)
+        executor = ThreadPoolExecutor(max_workers=len(artifacts) + 1, thread_name_prefix="deploy")
+        venv_future = submit_in_context(executor, self.create_virtual_environment, venv_target)
+        if not artifact_cache.enabled:
+            # 没有下载缓存时无处存放预取的文件，由安装阶段逐个下载
+            ui.print_info("下载缓存已关闭，组件将在安装时依次下载")
+            executor.shutdown(wait=False)
+            return venv_future
+
+        ui.console.print("\n[⬇️ 并行下载所需文件]", style=ui.colors["primary"])
+        ui.print_info(f"共 {len(artifacts)} 个文件：{', '.join(artifacts)}")
+        with aggregate_progress("下载总进度", unit='iB', unit_scale=True, unit_divisor=1024):
+            futures = {
+                submit_in_context(executor, self._prefetch_artifact, name, url, sha256): name
+                for name, (url, sha256) in artifacts.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    logger.warning("预下载失败", name=name, error=str(e))
+                    ok = False
+                if not ok:
+                    ui.print_warning(f"{name} 预下载失败，将在安装时重试")
+        executor.shutdown(wait=False)
+        return venv_future
+
     def _run_deployment_steps(self, deploy_config: Dict) -> Dict[str, str]:
-        """执行所有部署步骤"""
+        """执行所有部署步骤：先并行获取所有文件，再依次安装"""
         bot_type = deploy_config.get("bot_type", "MaiBot")
         bot_path_key = "maibot_path" if bot_type == "MaiBot" else "mofox_path"
         
@@ -1887,33 +1983,48 @@ pause
             "mongodb_path": deploy_config.get("mongodb_path", ""),
         }
 
+        # 获取阶段：并行下载，同时创建虚拟环境
+        target_dir = os.path.join(deploy_config["install_dir"], bot_type)
+        if os.path.exists(target_dir) and os.listdir(target_dir):
+            raise Exception(f"目标目录已存在且不为空：{target_dir}")
+        report_progress("下载所需文件", 0)
+        venv_future = self._fetch_artifacts(deploy_config, target_dir)
+
+        # 安装阶段（文件已在下载缓存中，无需再联网）
         # 步骤1：安装Bot
+        report_progress(f"安装{bot_type}", 30)
         paths[bot_path_key] = self._install_maibot(deploy_config)
         if not paths[bot_path_key]:
             raise Exception(f"{bot_type}安装失败")
 
         # 步骤2：安装适配器
+        report_progress("安装适配器", 40)
         if deploy_config.get("install_adapter"):
             paths["adapter_path"] = self._install_adapter_if_needed(deploy_config, paths[bot_path_key])
 
         # 步骤3：安装NapCat
+        report_progress("安装NapCat", 50)
         if deploy_config.get("install_napcat") and deploy_config.get("napcat_version"):
             paths["napcat_path"] = self._install_napcat(deploy_config, paths[bot_path_key])
 
         # 步骤4：安装WebUI
+        report_progress("安装WebUI", 60)
         if deploy_config.get("install_webui"):
             success, paths["webui_path"] = self._check_and_install_webui(deploy_config, paths[bot_path_key])
             if not success:
                 ui.print_warning("WebUI安装检查失败，但部署将继续...")
 
-        # 步骤5：设置Python环境
-        paths["venv_path"] = self._setup_python_environment(paths[bot_path_key], paths["adapter_path"])
+        # 步骤5：设置Python环境（虚拟环境已在获取阶段开始创建）
+        report_progress("设置Python环境", 70)
+        paths["venv_path"] = self._setup_python_environment(paths[bot_path_key], paths["adapter_path"],
+                                                            venv_future.result())
         
         if paths["webui_path"] and paths["venv_path"]:
             ui.console.print("\n[🔄 在虚拟环境中安装WebUI后端依赖]", style=ui.colors["primary"])
             webui_installer.install_webui_backend_dependencies(paths["webui_path"], paths["venv_path"])
 
         # 步骤6：配置文件设置
+        report_progress("设置配置文件", 90)
         if not self._setup_config_files(deploy_config, **paths):
             ui.print_warning("配置文件设置失败，但部署将继续...")
 
@@ -1999,6 +2110,18 @@ pause
     
     def update_instance(self) -> bool:
         """更新实例"""
+        update_config = self.prepare_update()
+        if not update_config:
+            return False
+        return self.run_update(update_config)
+
+    def prepare_update(self) -> Optional[Dict]:
+        """
+        更新的交互阶段：检查网络、选择实例和版本并确认
+
+        Returns:
+            用户确认后的更新配置，取消或失败时返回None
+        """
         try:
             ui.clear_screen()
             ui.console.print("[🔄 实例更新]", style=ui.colors["warning"])
@@ -2015,7 +2138,7 @@ pause
                 ui.console.print("  • 确认是否需要设置代理")
                 ui.console.print("  • 尝试使用VPN连接")
                 ui.pause()
-                return False
+                return None
             else:
                 ui.print_success("网络连接正常")
                 self._offline_mode = False
@@ -2024,12 +2147,12 @@ pause
             from ..modules.config_manager import config_mgr
             config = config_mgr.select_configuration()
             if not config:
-                return False
+                return None
             
             mai_path = config.get("mai_path", "")
             if not mai_path or not os.path.exists(mai_path):
                 ui.print_error("实例路径无效")
-                return False
+                return None
             
             # 获取当前版本
             current_version = config.get("version_path", "unknown")
@@ -2038,14 +2161,14 @@ pause
             # 选择新版本
             new_version_data = self.show_version_menu()
             if not new_version_data:
-                return False
+                return None
             
             new_version = new_version_data["name"]
             
             if new_version == current_version:
                 ui.print_warning("选择的版本与当前版本相同")
                 if not ui.confirm("是否强制重新安装？"):
-                    return False
+                    return None
             
             # 备份提醒
             ui.print_warning("更新前建议备份重要文件：")
@@ -2056,111 +2179,72 @@ pause
             
             if not ui.confirm("是否已完成备份并继续更新？"):
                 ui.print_info("更新已取消")
-                return False
+                return None
+            return {"config": config, "version_data": new_version_data}
             
+        except Exception as e:
+            ui.print_error(f"更新过程出错：{str(e)}")
+            logger.error("更新过程异常", error=str(e))
+            return None
+
+    def run_update(self, update_config: Dict) -> bool:
+        """更新的执行阶段：创建快照、下载新版本并切换，可作为后台任务运行。"""
+        try:
+            config = update_config["config"]
+            new_version_data = update_config["version_data"]
+            mai_path = config["mai_path"]
+            current_version = config.get("version_path", "unknown")
+            new_version = new_version_data["name"]
+
             # 开始更新
             ui.print_info("开始更新实例...")
             logger.info("开始更新实例", current_version=current_version, new_version=new_version)
             
-            # 创建备份
-            backup_dir = f"{mai_path}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            ui.print_info("创建备份...")
-            shutil.copytree(mai_path, backup_dir)
-            ui.print_success(f"备份创建完成：{backup_dir}")
+            # 创建快照（未变化的文件与上一个快照共享，只复制有变化的文件）
+            report_progress("创建快照", 0)
+            ui.print_info("创建快照...")
+            snapshot = snapshot_store.create(mai_path)
+            ui.print_success(
+                f"快照创建完成：{snapshot.id}（复制 {snapshot.copied} 个文件 / {snapshot.copied_bytes / 1024 / 1024:.1f} MB，"
+                f"与上一个快照共享 {snapshot.linked} 个文件）"
+            )
+            for removed in snapshot_store.prune(mai_path):
+                logger.info("按保留策略删除旧快照", snapshot=removed)
             
+            # 新版本在暂存目录中准备好后再切换，当前版本保留在 .previous 中用于回滚
+            staged = StagedUpdate(mai_path)
             try:
                 # 创建临时目录下载新版本
                 with tempfile.TemporaryDirectory() as temp_dir:
-                    # 下载新版本
-                    download_url = new_version_data["download_url"]
-                    archive_path = os.path.join(temp_dir, f"{new_version}.zip")
-                    
-                    if not self.download_file(download_url, archive_path):
+                    # 下载新版本并直接解压
+                    report_progress("下载新版本", 20)
+                    source_dir = os.path.join(temp_dir, "source")
+                    if not self.install_source_archive(new_version_data["download_url"], source_dir):
                         raise Exception("下载新版本失败")
                     
-                   
-                    # 解压新版本
-                    if not self.extract_archive(archive_path, temp_dir):
-                        raise Exception("解压新版本失败")
-                    
-                    # 查找解压后的目录
-                    extracted_dirs = [d for d in os.listdir(temp_dir) if os.path.isdir(os.path.join(temp_dir, d)) and d != "__MACOSX"]
-                    if not extracted_dirs:
-                        raise Exception("解压后未找到项目目录")
-                    
-                    source_dir = os.path.join(temp_dir, extracted_dirs[0])
-                    
-                    # 保护重要文件
-                    protected_files = [".env", "config.toml", "bot_config.toml", "data", "*.db", "model_config.toml"]
-                    protected_data = {}
-                    
-                    for pattern in protected_files:
-                        if '*' in pattern:
-                            matching_files = glob.glob(os.path.join(mai_path, pattern))
-                            for file_path in matching_files:
-                                if os.path.exists(file_path):
-                                    rel_path = os.path.relpath(file_path, mai_path)
-                                    if os.path.isfile(file_path):
-                                        with open(file_path, 'rb') as f:
-                                            protected_data[rel_path] = f.read()
-                                    elif os.path.isdir(file_path):
-                                        temp_backup = os.path.join(temp_dir, f"backup_{rel_path}")
-                                        shutil.copytree(file_path, temp_backup)
-                                        protected_data[rel_path] = temp_backup
-                        else:
-                            file_path = os.path.join(mai_path, pattern)
-                            if os.path.exists(file_path):
-                                if os.path.isfile(file_path):
-                                    with open(file_path, 'rb') as f:
-                                        protected_data[pattern] = f.read()
-                                elif os.path.isdir(file_path):
-                                    temp_backup = os.path.join(temp_dir, f"backup_{pattern}")
-                                    shutil.copytree(file_path, temp_backup)
-                                    protected_data[pattern] = temp_backup
-                    
-                    # 删除旧版本文件（保留protected_files）
-                    ui.print_info("删除旧版本文件...")
-                    for item in os.listdir(mai_path):
-                        item_path = os.path.join(mai_path, item)
-                        if item not in protected_files and not any(item.endswith(ext) for ext in ['.db']):
-                            if os.path.isfile(item_path):
-                                os.remove(item_path)
-                            elif os.path.isdir(item_path) and item != 'data':
-                                shutil.rmtree(item_path)
-                    
-                    # 复制新版本文件
-                    ui.print_info("复制新版本文件...")
-                    for item in os.listdir(source_dir):
-                        src_path = os.path.join(source_dir, item)
-                        dst_path = os.path.join(mai_path, item)
-                        
-                        if item in protected_data:
-                            continue  # 跳过受保护的文件
-                        
-                        if os.path.isfile(src_path):
-                            shutil.copy2(src_path, dst_path)
-                        elif os.path.isdir(src_path):
-                            if os.path.exists(dst_path):
-                                shutil.rmtree(dst_path)
-                            shutil.copytree(src_path, dst_path)
-                    
-                    # 恢复保护的文件
-                    ui.print_info("恢复配置文件...")
-                    for rel_path, data in protected_data.items():
-                        target_path = os.path.join(mai_path, rel_path)
-                        
-                        if isinstance(data, bytes):
-                            # 文件数据
-                            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                            with open(target_path, 'wb') as f:
-                                f.write(data)
-                        elif isinstance(data, str) and os.path.isdir(data):
-                            # 目录备份
-                            if os.path.exists(target_path):
-                                shutil.rmtree(target_path)
-                            shutil.copytree(data, target_path)
+                    # 在暂存目录中增量更新：只写入有变化的文件，受保护的文件（配置、数据、数据库）不参与比较
+                    report_progress("同步文件", 50)
+                    ui.print_info("准备暂存目录...")
+                    staging_path = staged.stage()
+                    ui.print_info("比较新旧版本文件...")
+                    plan = sync_release(source_dir, staging_path, PROTECTED_PATTERNS)
+                    ui.print_success(
+                        f"文件更新完成：新增 {len(plan.added)}，修改 {len(plan.changed)}，"
+                        f"删除 {len(plan.deleted)}，未变化 {plan.unchanged}"
+                    )
+                
+                # 检查新版本后再切换
+                report_progress("检查新版本", 60)
+                venv_path = config.get("venv_path", "")
+                passed, detail = smoke_check(staging_path, dependency_stamp.python_executable(venv_path) if venv_path else None)
+                if not passed:
+                    raise Exception(f"新版本检查未通过：{detail}")
+                ui.print_success(f"新版本检查通过：{detail}")
+                staged.activate()
+                ui.print_success(f"已切换到新版本，旧版本保留在 {staged.previous_path}")
                 
                 # 更新适配器
+                report_progress("更新适配器", 70)
                 ui.print_info("正在检查和更新适配器...")
                 adapter_path = self._determine_adapter_requirements(new_version_data["display_name"], mai_path)
                 config["adapter_path"] = adapter_path
@@ -2178,6 +2262,7 @@ pause
                         venv_path = "" # 确保后续不会使用无效路径
                 
                 if venv_path:
+                    report_progress("更新依赖", 80)
                     # 更新MaiBot主依赖
                     requirements_path = os.path.join(mai_path, "requirements.txt")
                     if os.path.exists(requirements_path):
@@ -2192,6 +2277,8 @@ pause
                             self.install_dependencies_in_venv(venv_path, adapter_requirements_path)
                 
                 # 更新配置中的版本号
+                report_progress("保存实例配置", 95)
+                config["previous_version_path"] = current_version
                 config["version_path"] = new_version
                 
                 # 找到配置名称并保存
@@ -2203,24 +2290,25 @@ pause
                         break
                 
                 ui.print_success(f"🎉 实例更新完成！新版本：{new_version_data['display_name']}")
-                ui.print_info(f"备份文件位置：{backup_dir}")
-                ui.print_info("如果更新后出现问题，可以从备份恢复")
+                ui.print_info(f"更新前的快照：{snapshot.id}（{snapshot_store.store_dir(mai_path)}）")
+                ui.print_info("如果更新后出现问题，可以在部署菜单的 [F] 中回滚到更新前的版本，或在 [E] 实例快照中恢复")
                 logger.info("实例更新成功", new_version=new_version)
                 return True
                 
             except Exception as e:
-                # 更新失败，尝试从备份恢复
+                # 更新失败：尚未切换时丢弃暂存目录即可，已切换时改名换回旧版本
                 ui.print_error(f"更新失败：{str(e)}")
-                ui.print_warning("正在从备份恢复...")
-                
                 try:
-                    if os.path.exists(mai_path):
-                        shutil.rmtree(mai_path)
-                    shutil.copytree(backup_dir, mai_path)
-                    ui.print_success("已从备份恢复")
+                    if staged.activated:
+                        ui.print_warning("正在回滚到更新前的版本...")
+                        staged.rollback()
+                        ui.print_success("已回滚到更新前的版本")
+                    else:
+                        staged.discard()
+                        ui.print_info("实例未被改动")
                 except Exception as restore_error:
-                    ui.print_error(f"备份恢复失败：{str(restore_error)}")
-                    ui.print_error(f"请手动从 {backup_dir} 恢复文件")
+                    ui.print_error(f"回滚失败：{str(restore_error)}")
+                    ui.print_error(f"更新前的版本位于 {staged.previous_path}，也可以从快照 {snapshot.path} 恢复")
                 
                 logger.error("实例更新失败", error=str(e))
                 return False
@@ -2230,6 +2318,169 @@ pause
             logger.error("更新过程异常", error=str(e))
             return False
     
+    def manage_artifact_cache(self):
+        """查看和清理下载缓存"""
+        while True:
+            ui.clear_screen()
+            ui.components.show_title("下载缓存", symbol="deployment")
+            entries = artifact_cache.entries()
+            total = sum(entry["size"] for entry in entries)
+            ui.console.print(
+                f"缓存目录：{artifact_cache.directory}\n"
+                f"共 {len(entries)} 个文件，{total / 1024 / 1024:.1f} MB / 上限 {artifact_cache.max_size / 1024 / 1024:.0f} MB",
+                style=ui.colors["info"]
+            )
+            if entries:
+                table = Table(show_header=True, header_style=ui.colors["table_header"])
+                table.add_column("文件名", style=ui.colors["cyan"])
+                table.add_column("大小", style=ui.colors["white"])
+                table.add_column("最近使用", style=ui.colors["white"])
+                table.add_column("SHA-256", style=ui.colors["white"])
+                table.add_column("来源", style=ui.colors["white"], overflow="fold")
+                for entry in entries:
+                    table.add_row(
+                        entry.get("name", ""),
+                        f"{entry['size'] / 1024 / 1024:.1f} MB",
+                        datetime.fromtimestamp(entry["last_access"]).strftime("%Y-%m-%d %H:%M"),
+                        entry["sha256"][:12],
+                        "\n".join(entry["urls"]),
+                    )
+                ui.console.print(table)
+
+            ui.console.print("\n [P] 清理至大小上限  [S] 清理至指定大小  [C] 清空缓存  [Q] 返回", style=ui.colors["info"])
+            choice = ui.get_choice("请选择操作", ["P", "S", "C", "Q"])
+            if choice == "Q":
+                return
+            elif choice == "P":
+                freed = artifact_cache.prune()
+            elif choice == "S":
+                size_mb = ui.get_input("保留的最大缓存大小（MB）")
+                if not size_mb.isdigit():
+                    ui.print_error("请输入整数")
+                    ui.countdown(1)
+                    continue
+                freed = artifact_cache.prune(int(size_mb) * 1024 * 1024)
+            elif choice == "C":
+                if not ui.confirm("确定清空所有下载缓存吗？"):
+                    continue
+                freed = artifact_cache.prune(0)
+            else:
+                ui.print_error("无效选项")
+                ui.countdown(1)
+                continue
+            ui.print_success(f"已释放 {freed / 1024 / 1024:.1f} MB")
+            ui.pause()
+
+    def rollback_instance(self) -> bool:
+        """回滚到更新前的版本（与当前版本交换，再次执行即可换回）"""
+        from ..modules.config_manager import config_mgr
+        config = config_mgr.select_configuration()
+        if not config:
+            return False
+        mai_path = config.get("mai_path", "")
+        if not mai_path or not os.path.exists(mai_path):
+            ui.print_error("实例路径无效")
+            return False
+        if not has_previous(mai_path):
+            ui.print_error("没有可回滚的版本（只保留最近一次更新前的版本）")
+            return False
+
+        current_version = config.get("version_path", "unknown")
+        previous_version = config.get("previous_version_path", "unknown")
+        ui.print_warning("回滚前请先停止该实例")
+        if not ui.confirm(f"确定从 {current_version} 回滚到 {previous_version} 吗？"):
+            return False
+        try:
+            swap_previous(mai_path)
+        except OSError as e:
+            ui.print_error(f"回滚失败：{str(e)}")
+            logger.error("实例回滚失败", mai_path=mai_path, error=str(e))
+            return False
+
+        config["version_path"], config["previous_version_path"] = previous_version, current_version
+        configurations = config_manager.get_all_configurations()
+        for name, cfg in configurations.items():
+            if cfg.get("serial_number") == config.get("serial_number"):
+                config_manager.add_configuration(name, config)
+                config_manager.save()
+                break
+        ui.print_success(f"已回滚到 {previous_version}（再次回滚可换回 {current_version}）")
+        logger.info("实例回滚成功", mai_path=mai_path, version=previous_version)
+        return True
+
+    def manage_snapshots(self):
+        """查看、恢复和删除实例快照"""
+        from ..modules.config_manager import config_mgr
+        config = config_mgr.select_configuration()
+        if not config:
+            return
+        mai_path = config.get("mai_path", "")
+        if not mai_path:
+            ui.print_error("实例路径无效")
+            ui.pause()
+            return
+
+        while True:
+            ui.clear_screen()
+            ui.components.show_title("实例快照", symbol="deployment")
+            snapshots = snapshot_store.list(mai_path)
+            retention = snapshot_store.retention
+            ui.console.print(
+                f"快照目录：{snapshot_store.store_dir(mai_path)}\n"
+                f"共 {len(snapshots)} 个快照，实际占用 {snapshot_store.disk_usage(mai_path) / 1024 / 1024:.1f} MB"
+                f"（保留策略：最近 {retention['keep_last']} 个，每天一个保留 {retention['keep_daily']} 天，"
+                f"每周一个保留 {retention['keep_weekly']} 周）",
+                style=ui.colors["info"]
+            )
+            if snapshots:
+                table = Table(show_header=True, header_style=ui.colors["table_header"])
+                table.add_column("序号", style=ui.colors["cyan"], width=6)
+                table.add_column("创建时间", style=ui.colors["white"])
+                table.add_column("文件数", style=ui.colors["white"])
+                table.add_column("总大小", style=ui.colors["white"])
+                table.add_column("新增占用", style=ui.colors["white"])
+                for index, snapshot in enumerate(snapshots, 1):
+                    table.add_row(
+                        str(index),
+                        datetime.fromtimestamp(snapshot.created_at).strftime("%Y-%m-%d %H:%M:%S"),
+                        str(snapshot.files),
+                        f"{snapshot.total_bytes / 1024 / 1024:.1f} MB",
+                        f"{snapshot.copied_bytes / 1024 / 1024:.1f} MB",
+                    )
+                ui.console.print(table)
+
+            ui.console.print("\n [S] 立即创建快照  [R] 恢复快照  [D] 删除快照  [P] 按保留策略清理  [Q] 返回",
+                             style=ui.colors["info"])
+            choice = ui.get_choice("请选择操作", ["S", "R", "D", "P", "Q"])
+            if choice == "Q":
+                return
+            if choice == "S":
+                snapshot = snapshot_store.create(mai_path)
+                ui.print_success(f"快照创建完成：{snapshot.id}（复制 {snapshot.copied} 个文件，共享 {snapshot.linked} 个文件）")
+            elif choice == "P":
+                removed = snapshot_store.prune(mai_path)
+                ui.print_success(f"已删除 {len(removed)} 个快照")
+            elif choice in ("R", "D"):
+                index = ui.get_input("请输入快照序号")
+                if not index.isdigit() or not 1 <= int(index) <= len(snapshots):
+                    ui.print_error("无效的序号")
+                    ui.countdown(1)
+                    continue
+                snapshot = snapshots[int(index) - 1]
+                if choice == "D":
+                    if ui.confirm(f"确定删除快照 {snapshot.id} 吗？"):
+                        snapshot_store.delete(mai_path, snapshot.id)
+                        ui.print_success("快照已删除")
+                else:
+                    ui.print_warning("恢复会覆盖实例目录中的文件，请先停止该实例")
+                    if ui.confirm(f"确定将实例恢复到快照 {snapshot.id} 吗？"):
+                        stats = snapshot_store.restore(mai_path, snapshot.id)
+                        ui.print_success(
+                            f"恢复完成：恢复 {stats.restored} 个文件，删除 {stats.removed} 个文件，"
+                            f"{stats.unchanged} 个文件无需改动，用时 {stats.seconds:.1f} 秒"
+                        )
+            ui.pause()
+
     def delete_instance(self) -> bool:
         """删除实例"""
         try:
@@ -2334,7 +2585,8 @@ pause
             logger.info("开始WebUI安装检查", install_dir=install_dir, bot_path=bot_path)
             
             # 调用WebUI安装器进行直接安装，传入虚拟环境路径
-            success, webui_path = webui_installer.install_webui_directly(install_dir, venv_path)
+            success, webui_path = webui_installer.install_webui_directly(install_dir, venv_path,
+                                                                        deploy_config.get("webui_branch"))
             
             if success:
                 ui.print_success("✅ WebUI安装检查完成")
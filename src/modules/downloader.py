@@ -0,0 +1,253 @@
+"""
+分段下载模块
+对支持 HTTP Range 的大文件（NapCat一键包、MongoDB压缩包等）按字节范围拆成多段，
+通过连接池并行下载到同一个 .part 文件：
+- 每段的进度记录在 .part.json 清单中，中断后再次下载会从各段停下的位置继续
+- 下载完成后校验长度必须与服务器声明的完全一致，并可选校验SHA-256
+不支持Range或大小未知的资源退化为单连接下载。
+各段通过共享HTTP客户端的连接池下载，代理、SSL校验和连接错误重试遵循统一配置。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+import structlog
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from ..core.task_engine import create_progress_bar, submit_in_context
+from .http_client import http_client
+
+logger = structlog.get_logger(__name__)
+
+# 默认并行段数
+DEFAULT_SEGMENTS = 4
+# 每段的最小字节数，小文件不分段
+MIN_SEGMENT_SIZE = 2 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# 清单写回间隔（秒）
+MANIFEST_SAVE_INTERVAL = 1.0
+REQUEST_TIMEOUT = 30
+
+
+class DownloadError(Exception):
+    """下载失败或校验不通过。"""
+
+
+class _Segment:
+    """一个字节范围 [start, end]（含两端）及已下载的字节数。"""
+
+    def __init__(self, start: int, end: int, done: int = 0):
+        self.start = start
+        self.end = end
+        self.done = done
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.start + 1 - self.done
+
+    def to_list(self) -> List[int]:
+        return [self.start, self.end, self.done]
+
+
+def _plan_segments(size: int, count: int) -> List[_Segment]:
+    count = max(1, min(count, size // MIN_SEGMENT_SIZE))
+    step = size // count
+    segments = []
+    for i in range(count):
+        start = i * step
+        end = size - 1 if i == count - 1 else start + step - 1
+        segments.append(_Segment(start, end))
+    return segments
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SegmentedDownloader:
+    """分段并行下载器，各段通过共享HTTP客户端的连接池下载。"""
+
+    def __init__(self, segments: int = DEFAULT_SEGMENTS, proxies: Optional[Dict[str, str]] = None,
+                 verify: Optional[bool] = None, max_retries: int = 3):
+        """
+        Args:
+            segments: 并行段数
+            proxies: 覆盖共享客户端的代理设置
+            verify: 覆盖共享客户端的SSL校验设置
+            max_retries: 每段的断点重试次数
+        """
+        self.segments = segments
+        self.max_retries = max_retries
+        self._options = {"timeout": REQUEST_TIMEOUT}
+        if proxies:
+            self._options["proxies"] = proxies
+        if verify is not None:
+            self._options["verify"] = verify
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        return http_client.get(url, **self._options, **kwargs)
+
+    def download(self, url: str, dest: str, sha256: Optional[str] = None, desc: Optional[str] = None):
+        """
+        下载 url 到 dest
+
+        Args:
+            url: 下载地址
+            dest: 目标文件路径，下载过程中写入 dest + ".part"
+            sha256: 期望的SHA-256（十六进制），为空时不校验
+            desc: 进度条描述
+
+        Raises:
+            DownloadError: 下载失败或校验不通过（.part 文件会保留，以便下次续传）
+        """
+        part_path = dest + ".part"
+        manifest_path = part_path + ".json"
+        desc = desc or os.path.basename(dest)
+
+        size, etag, ranged = self._probe(url)
+        if size is None or not ranged:
+            logger.info("服务器不支持分段下载，使用单连接下载", url=url)
+            self._download_single(url, part_path, size, desc)
+        else:
+            segments = self._load_manifest(manifest_path, url, size, etag)
+            if segments is None:
+                segments = _plan_segments(size, self.segments)
+                with open(part_path, "wb") as f:
+                    f.truncate(size)
+            else:
+                logger.info("继续未完成的下载", url=url, downloaded=sum(s.done for s in segments), size=size)
+            self._download_segments(url, part_path, manifest_path, size, etag, segments, desc)
+
+        actual_size = os.path.getsize(part_path)
+        if size is not None and actual_size != size:
+            raise DownloadError(f"文件长度不符：预期 {size} 字节，实际 {actual_size} 字节")
+        if sha256:
+            actual_hash = _file_sha256(part_path)
+            if actual_hash.lower() != sha256.lower():
+                # 内容已损坏，续传没有意义
+                os.remove(part_path)
+                self._remove(manifest_path)
+                raise DownloadError(f"SHA-256校验失败：预期 {sha256}，实际 {actual_hash}")
+        os.replace(part_path, dest)
+        self._remove(manifest_path)
+
+    def _probe(self, url: str):
+        """获取资源大小、ETag以及是否支持Range。"""
+        response = self._get(url, headers={"Range": "bytes=0-0"}, stream=True, allow_redirects=True)
+        try:
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            if response.status_code == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rsplit("/", 1)[-1]
+                if total.isdigit():
+                    return int(total), etag, True
+            length = response.headers.get("Content-Length")
+            return (int(length) if length and length.isdigit() else None), etag, False
+        finally:
+            response.close()
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _load_manifest(self, manifest_path: str, url: str, size: int,
+                       etag: Optional[str]) -> Optional[List[_Segment]]:
+        """读取续传清单，资源已变化或 .part 文件不匹配时返回None。"""
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["url"] != url or manifest["size"] != size or manifest["etag"] != etag:
+                return None
+            if os.path.getsize(manifest_path[:-len(".json")]) != size:
+                return None
+            return [_Segment(*item) for item in manifest["segments"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def _save_manifest(manifest_path: str, url: str, size: int, etag: Optional[str], segments: List[_Segment]):
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "size": size, "etag": etag,
+                       "segments": [segment.to_list() for segment in segments]}, f)
+        os.replace(temp_path, manifest_path)
+
+    def _download_segments(self, url: str, part_path: str, manifest_path: str, size: int,
+                           etag: Optional[str], segments: List[_Segment], desc: str):
+        lock = threading.Lock()
+        stop = threading.Event()
+        with create_progress_bar(desc=desc, total=size, unit="iB", unit_scale=True, unit_divisor=1024,
+                                 initial=sum(s.done for s in segments)) as bar:
+
+            def on_chunk(n: int):
+                with lock:
+                    bar.update(n)
+
+            pending = [segment for segment in segments if segment.remaining > 0]
+            with ThreadPoolExecutor(max_workers=max(1, len(pending)), thread_name_prefix="download") as executor:
+                futures = [submit_in_context(executor, self._fetch_segment, url, part_path, etag, segment,
+                                             on_chunk, stop) for segment in pending]
+                not_done = set(futures)
+                while not_done:
+                    done, not_done = wait(not_done, timeout=MANIFEST_SAVE_INTERVAL)
+                    # 任一分段彻底失败时通知其余分段尽快停下，已下载的部分保留在清单中
+                    if any(future.exception() for future in done):
+                        stop.set()
+                    self._save_manifest(manifest_path, url, size, etag, segments)
+                for future in futures:
+                    future.result()
+
+    def _fetch_segment(self, url: str, part_path: str, etag: Optional[str], segment: _Segment,
+                       on_chunk, stop: threading.Event):
+        """下载一个分段，连接中断时从已写入的位置重试。"""
+        for attempt in range(self.max_retries):
+            if segment.remaining <= 0:
+                return
+            headers = {"Range": f"bytes={segment.start + segment.done}-{segment.end}"}
+            if etag:
+                headers["If-Range"] = etag
+            try:
+                with self._get(url, headers=headers, stream=True) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise DownloadError("服务器未按分段返回内容（资源可能已变化）")
+                    # 不经过缓冲直接写入，保证清单中记录的进度都已落到文件里
+                    with open(part_path, "r+b", buffering=0) as f:
+                        f.seek(segment.start + segment.done)
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if stop.is_set():
+                                return
+                            chunk = chunk[:segment.remaining]
+                            f.write(chunk)
+                            segment.done += len(chunk)
+                            on_chunk(len(chunk))
+                            if segment.remaining <= 0:
+                                return
+            except requests.RequestException as e:
+                logger.warning("分段下载中断，准备重试", start=segment.start, done=segment.done,
+                               attempt=attempt + 1, error=str(e))
+                if attempt < self.max_retries - 1:
+                    time.sleep(min(2 ** attempt, 10))
+        if segment.remaining > 0:
+            raise DownloadError(f"分段 {segment.start}-{segment.end} 下载失败")
+
+    def _download_single(self, url: str, part_path: str, size: Optional[int], desc: str):
+        with self._get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(part_path, "wb") as f, create_progress_bar(
+                desc=desc, total=size or 0, unit="iB", unit_scale=True, unit_divisor=1024
+            ) as bar:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    bar.update(len(chunk))
@@ -0,0 +1,194 @@
+"""
+Git镜像模块
+为每个上游仓库在 ~/.maibot/git 下维护一个共享的裸仓库镜像：
+- 安装或更新时只把所需的分支/标签 fetch 到镜像中，已有的对象不会重复下载，分支版本的更新只需下载新提交
+- 标签已存在于镜像中时不访问网络
+- 通过 git archive 把对应提交导出到目标目录（流式解压，不生成压缩包），
+  实例目录仍是普通目录，增量更新、受保护文件和回滚等流程照常工作
+系统中没有git、地址无法识别或git操作失败时，调用方回退到下载源码包。
+"""
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import structlog
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..core.config import config_manager
+from .archive_stream import extract_tar_stream
+
+logger = structlog.get_logger(__name__)
+
+MIRROR_ROOT = Path.home() / ".maibot" / "git"
+FETCH_TIMEOUT = 1800
+
+# GitHub源码包地址 -> (仓库, 引用)
+_GITHUB_PATTERNS = [
+    re.compile(r"^https://github\.com/([^/]+)/([^/]+)/archive/(refs/(?:heads|tags)/.+?)\.(?:zip|tar\.gz)$"),
+    re.compile(r"^https://github\.com/([^/]+)/([^/]+)/archive/(.+?)\.(?:zip|tar\.gz)$"),
+    re.compile(r"^https://codeload\.github\.com/([^/]+)/([^/]+)/(?:zip|tar\.gz)/(.+)$"),
+    re.compile(r"^https://api\.github\.com/repos/([^/]+)/([^/]+)/(?:zipball|tarball)/(.+)$"),
+]
+
+
+class GitMirrorError(Exception):
+    """git操作失败。"""
+
+
+def parse_source_url(url: str) -> Optional[Tuple[str, str]]:
+    """
+    把GitHub源码包地址转换为 (仓库地址, 引用)
+
+    引用为 refs/heads/<分支>、refs/tags/<标签>，或无法区分时的名称本身（先按标签、再按分支解析）
+    """
+    for pattern in _GITHUB_PATTERNS:
+        match = pattern.match(url)
+        if match:
+            owner, repo, ref = match.groups()
+            return f"https://github.com/{owner}/{repo}.git", ref
+    return None
+
+
+class GitMirror:
+    """共享的裸仓库镜像。"""
+
+    def __init__(self, root: Path = MIRROR_ROOT):
+        self.root = root
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(config_manager.get("git_updates", {}).get("enabled", True)) and shutil.which("git") is not None
+
+    def handles(self, url: str) -> bool:
+        """该源码包地址能否通过git镜像获取。"""
+        return self.enabled and parse_source_url(url) is not None
+
+    def mirror_path(self, repo_url: str) -> Path:
+        match = re.match(r"^https://([^/]+)/([^/]+)/([^/]+?)(?:\.git)?/?$", repo_url)
+        if match:
+            host, owner, repo = match.groups()
+            return self.root / host / owner / f"{repo}.git"
+        # 本地路径或其他地址
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", repo_url.rstrip("/").rsplit("/", 1)[-1]) or "repo"
+        return self.root / "other" / f"{name}-{hashlib.sha1(repo_url.encode()).hexdigest()[:8]}.git"
+
+    def _lock(self, path: Path) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(str(path), threading.Lock())
+
+    @staticmethod
+    def _git(args: List[str], git_dir: Optional[Path] = None, timeout: Optional[float] = None,
+             check: bool = True) -> subprocess.CompletedProcess:
+        command = ["git"] + (["--git-dir", str(git_dir)] if git_dir else []) + args
+        env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout, env=env)
+        if check and result.returncode != 0:
+            raise GitMirrorError(f"git {' '.join(args[:2])} 失败：{result.stderr.strip() or result.returncode}")
+        return result
+
+    def _ensure_mirror(self, repo_url: str) -> Path:
+        path = self.mirror_path(repo_url)
+        if not (path / "HEAD").exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._git(["init", "--bare", "--quiet", str(path)])
+            self._git(["remote", "add", "origin", repo_url], git_dir=path)
+            logger.info("已创建git镜像", repo=repo_url, path=str(path))
+        return path
+
+    def _resolve_local(self, path: Path, ref: str) -> Optional[str]:
+        result = self._git(["rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"], git_dir=path, check=False)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def fetch(self, repo_url: str, ref: str) -> str:
+        """
+        把引用同步到镜像（只下载镜像中还没有的对象）
+
+        Returns:
+            引用指向的提交
+
+        Raises:
+            GitMirrorError: fetch失败或引用不存在
+        """
+        path = self.mirror_path(repo_url)
+        with self._lock(path):
+            path = self._ensure_mirror(repo_url)
+            candidates = [ref] if ref.startswith("refs/") else [f"refs/tags/{ref}", f"refs/heads/{ref}"]
+            # 标签不会移动，已在镜像中时无需联网
+            for candidate in candidates:
+                if candidate.startswith("refs/tags/"):
+                    commit = self._resolve_local(path, candidate)
+                    if commit:
+                        logger.info("git镜像中已有该标签", repo=repo_url, ref=candidate, commit=commit[:12])
+                        return commit
+
+            errors = []
+            for candidate in candidates:
+                started = time.perf_counter()
+                result = self._git(["fetch", "--quiet", "--no-tags", "origin", f"+{candidate}:{candidate}"],
+                                   git_dir=path, timeout=FETCH_TIMEOUT, check=False)
+                if result.returncode == 0:
+                    commit = self._resolve_local(path, candidate)
+                    if commit:
+                        logger.info("git镜像同步完成", repo=repo_url, ref=candidate, commit=commit[:12],
+                                    seconds=round(time.perf_counter() - started, 2))
+                        return commit
+                errors.append(result.stderr.strip())
+            raise GitMirrorError(f"无法获取 {ref}：{errors[-1] if errors else '未知错误'}")
+
+    def export(self, repo_url: str, commit: str, target_dir: str) -> int:
+        """
+        把提交的文件导出到 target_dir（不含.git）
+
+        Returns:
+            写入的文件数
+        """
+        path = self.mirror_path(repo_url)
+        process = subprocess.Popen(
+            ["git", "--git-dir", str(path), "archive", "--format=tar", "--prefix=source/", commit],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        try:
+            count = extract_tar_stream(process.stdout, target_dir, mode="r|")
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read().decode(errors="replace")
+            process.stderr.close()
+            returncode = process.wait()
+        if returncode != 0:
+            raise GitMirrorError(f"git archive 失败：{stderr.strip() or returncode}")
+        return count
+
+    def checkout(self, url: str, target_dir: str) -> str:
+        """
+        通过镜像获取源码包地址对应的版本并导出到 target_dir
+
+        Returns:
+            导出的提交
+
+        Raises:
+            GitMirrorError: 地址无法识别或git操作失败
+        """
+        parsed = parse_source_url(url)
+        if parsed is None:
+            raise GitMirrorError(f"无法识别的源码地址：{url}")
+        repo_url, ref = parsed
+        return self.checkout_ref(repo_url, ref, target_dir)
+
+    def checkout_ref(self, repo_url: str, ref: str, target_dir: str) -> str:
+        """fetch 引用并导出到 target_dir，返回提交。"""
+        commit = self.fetch(repo_url, ref)
+        started = time.perf_counter()
+        count = self.export(repo_url, commit, target_dir)
+        logger.info("已从git镜像导出源码", repo=repo_url, ref=ref, commit=commit[:12], files=count,
+                    target=target_dir, seconds=round(time.perf_counter() - started, 2))
+        return commit
+
+
+# 全局git镜像实例
+git_mirror = GitMirror()
@@ -0,0 +1,202 @@
+"""
+GitHub元数据缓存模块
+版本列表、分支列表等GitHub API响应保存在 ~/.maibot/cache/github 中（每个地址一个文件），连同 ETag 和 Last-Modified：
+- 有效期内直接使用缓存，菜单无需等待网络
+- 过期后先返回缓存内容，同时在后台发送 If-None-Match / If-Modified-Since 条件请求重新验证；
+  内容未变化时GitHub返回304，不计入未认证请求每小时60次的限额
+- 没有缓存或强制刷新时同步请求，请求失败时退回缓存内容
+- 遵守 X-RateLimit-Remaining / X-RateLimit-Reset 和 Retry-After：限额用尽后直到重置前不再请求，只使用缓存
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+import structlog
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..core.config import config_manager
+from .http_client import http_client
+
+logger = structlog.get_logger(__name__)
+
+CACHE_DIR = Path.home() / ".maibot" / "cache" / "github"
+RATE_LIMIT_FILE = "rate_limit.json"
+DEFAULT_MAX_AGE_MINUTES = 10
+DEFAULT_TIMEOUT = 30
+# 没有 Retry-After 和重置时间时的退避秒数
+DEFAULT_BACKOFF = 60
+
+
+class RateLimitedError(requests.RequestException):
+    """GitHub API限额已用尽，且没有可用的缓存。"""
+
+
+class GitHubMetadataCache:
+    """带条件请求的GitHub API响应缓存。"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._blocked_until: Optional[float] = None
+
+    @property
+    def max_age(self) -> float:
+        settings = config_manager.get("github_metadata", {}) or {}
+        return float(settings.get("max_age_minutes", DEFAULT_MAX_AGE_MINUTES)) * 60
+
+    def _entry_path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha1(url.encode()).hexdigest()}.json"
+
+    def _write_json(self, path: Path, data: Dict):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("写入GitHub元数据缓存失败", path=str(path), error=str(e))
+
+    def _load_entry(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self._entry_path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry if entry.get("url") == url and "data" in entry else None
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, AttributeError) as e:
+            logger.debug("读取GitHub元数据缓存失败", url=url, error=str(e))
+            return None
+
+    def rate_limited_until(self) -> Optional[float]:
+        """限额用尽时返回重置的时间戳（跨进程共享），否则返回 None。"""
+        if self._blocked_until is None:
+            try:
+                with open(self.cache_dir / RATE_LIMIT_FILE, "r", encoding="utf-8") as f:
+                    self._blocked_until = float(json.load(f).get("blocked_until", 0))
+            except (OSError, ValueError, AttributeError, TypeError):
+                self._blocked_until = 0.0
+        return self._blocked_until if self._blocked_until > time.time() else None
+
+    def _note_rate_limit(self, response: requests.Response):
+        """根据响应头记录限额状态。"""
+        headers = response.headers
+        blocked_until = None
+        retry_after = headers.get("Retry-After")
+        if retry_after and response.status_code in (403, 429):
+            try:
+                blocked_until = time.time() + float(retry_after)
+            except ValueError:
+                blocked_until = time.time() + DEFAULT_BACKOFF
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                blocked_until = float(headers.get("X-RateLimit-Reset", ""))
+            except ValueError:
+                blocked_until = time.time() + DEFAULT_BACKOFF
+        elif response.status_code == 429:
+            blocked_until = time.time() + DEFAULT_BACKOFF
+        if blocked_until is None:
+            return
+        self._blocked_until = blocked_until
+        self._write_json(self.cache_dir / RATE_LIMIT_FILE, {"blocked_until": blocked_until})
+        logger.warning("GitHub API限额已用尽，重置前只使用缓存",
+                       reset=time.strftime("%H:%M:%S", time.localtime(blocked_until)))
+
+    def _request(self, url: str, headers: Optional[Dict[str, str]], timeout: float,
+                 entry: Optional[Dict]) -> Any:
+        """发送（条件）请求并更新缓存，返回响应内容。"""
+        if self.rate_limited_until():
+            if entry is not None:
+                return entry["data"]
+            raise RateLimitedError("GitHub API限额已用尽，请稍后再试")
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        started = time.perf_counter()
+        response = http_client.get(url, headers=request_headers, timeout=timeout)
+        self._note_rate_limit(response)
+        if response.status_code == 304 and entry is not None:
+            entry["fetched_at"] = time.time()
+            self._write_json(self._entry_path(url), entry)
+            logger.debug("GitHub元数据未变化", url=url, seconds=round(time.perf_counter() - started, 3))
+            return entry["data"]
+        if response.status_code in (403, 429) and self.rate_limited_until() and entry is not None:
+            return entry["data"]
+        response.raise_for_status()
+
+        data = response.json()
+        self._write_json(self._entry_path(url), {
+            "url": url,
+            "data": data,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        })
+        logger.debug("GitHub元数据已更新", url=url, seconds=round(time.perf_counter() - started, 3))
+        return data
+
+    def _revalidate_in_background(self, url: str, headers: Optional[Dict[str, str]], timeout: float,
+                                  entry: Dict):
+        with self._lock:
+            if url in self._revalidating:
+                return
+            self._revalidating.add(url)
+
+        def run():
+            try:
+                self._request(url, headers, timeout, entry)
+            except (requests.RequestException, ValueError) as e:
+                logger.debug("后台重新验证GitHub元数据失败", url=url, error=str(e))
+            finally:
+                with self._lock:
+                    self._revalidating.discard(url)
+
+        threading.Thread(target=run, name="github-revalidate", daemon=True).start()
+
+    def get_json(self, url: str, headers: Optional[Dict[str, str]] = None,
+                 timeout: float = DEFAULT_TIMEOUT, force_refresh: bool = False) -> Any:
+        """
+        获取GitHub API的JSON响应
+
+        Args:
+            url: API地址
+            headers: 额外的请求头
+            timeout: 请求超时秒数
+            force_refresh: 同步重新验证（仍使用条件请求）
+
+        Returns:
+            响应内容（可能来自缓存）
+
+        Raises:
+            requests.RequestException: 请求失败且没有缓存
+        """
+        entry = self._load_entry(url)
+        if entry is not None and not force_refresh:
+            if time.time() - entry.get("fetched_at", 0) >= self.max_age:
+                self._revalidate_in_background(url, headers, timeout, entry)
+            return entry["data"]
+
+        try:
+            return self._request(url, headers, timeout, entry)
+        except (requests.RequestException, ValueError) as e:
+            if entry is None:
+                raise
+            logger.warning("刷新GitHub元数据失败，使用缓存", url=url, error=str(e))
+            return entry["data"]
+
+    def has_cached(self, url: str) -> bool:
+        """是否已有该地址的缓存（无论是否过期）。"""
+        return self._entry_path(url).exists()
+
+
+# 全局GitHub元数据缓存实例
+github_metadata = GitHubMetadataCache()
@@ -0,0 +1,166 @@
+"""
+共享HTTP客户端模块
+所有安装器（部署、WebUI、MongoDB）以及版本列表、下载缓存都通过同一个 requests.Session 访问网络：
+- 按主机复用keep-alive连接池，一次部署中对GitHub、PyPI等少数主机的请求不再反复握手
+- 统一的超时、SSL校验和代理策略（配置中的 http 一节；未配置代理时使用 HTTP(S)_PROXY 环境变量）
+- 连接错误和5xx响应按指数退避自动重试（只重试GET/HEAD），遵守 Retry-After；测速和探测可关闭重试
+- 记录每个请求的耗时（到收到响应头为止），可按主机汇总
+"""
+import threading
+import time
+import requests
+import structlog
+from collections import deque
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+
+from ..core.config import config_manager
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+# 每个主机保持的最大连接数（分段下载和并发获取阶段会同时访问同一主机）
+POOL_MAXSIZE = 16
+RETRY_STATUSES = (500, 502, 503, 504)
+# 保留的请求记录条数
+METRICS_SIZE = 1000
+
+
+class RequestMetric(NamedTuple):
+    """一次请求的记录。"""
+    method: str
+    host: str
+    status: Optional[int]   # 请求失败时为 None
+    seconds: float          # 到收到响应头为止的耗时（包括自动重试）
+    error: str = ""
+
+
+class HttpClient:
+    """共享的HTTP客户端，会话在第一次使用时按配置创建（自动重试和不重试的请求各用一个会话）。"""
+
+    def __init__(self):
+        self._sessions: Dict[bool, requests.Session] = {}
+        self._session_lock = threading.Lock()
+        self._metrics = deque(maxlen=METRICS_SIZE)
+
+    @property
+    def settings(self) -> Dict:
+        return config_manager.get("http", {}) or {}
+
+    @property
+    def timeout(self):
+        """默认超时：(连接, 读取) 秒数。"""
+        settings = self.settings
+        return (float(settings.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)),
+                float(settings.get("read_timeout", DEFAULT_READ_TIMEOUT)))
+
+    @property
+    def proxies(self) -> Dict[str, str]:
+        """实际使用的代理（配置优先，其次环境变量）。"""
+        proxy = (self.settings.get("proxy") or "").strip()
+        if proxy:
+            return {"http": proxy, "https": proxy}
+        return {scheme: url for scheme, url in requests.utils.get_environ_proxies("https://example.com").items()
+                if scheme in ("http", "https")}
+
+    def _create_session(self, retries: bool) -> requests.Session:
+        settings = self.settings
+        retry = Retry(
+            total=int(settings.get("retries", DEFAULT_RETRIES)),
+            backoff_factor=float(settings.get("backoff", DEFAULT_BACKOFF)),
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        ) if retries else 0
+        adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.verify = bool(settings.get("verify_ssl", True))
+        proxy = (settings.get("proxy") or "").strip()
+        if proxy:
+            session.proxies.update({"http": proxy, "https": proxy})
+        if not session.verify and retries:
+            logger.warning("已按配置关闭HTTPS证书校验（http.verify_ssl = false）")
+        logger.debug("已创建共享HTTP会话", verify=session.verify, proxy=bool(proxy), retries=retries)
+        return session
+
+    def _get_session(self, retries: bool) -> requests.Session:
+        session = self._sessions.get(retries)
+        if session is None:
+            with self._session_lock:
+                session = self._sessions.get(retries)
+                if session is None:
+                    session = self._sessions[retries] = self._create_session(retries)
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        return self._get_session(True)
+
+    def reset(self):
+        """关闭连接池，下次请求时按当前配置重新创建会话（例如修改代理设置后）。"""
+        with self._session_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def request(self, method: str, url: str, retries: bool = True, **kwargs) -> requests.Response:
+        """
+        发送请求，未指定 timeout 时使用统一的超时
+
+        Args:
+            retries: 是否自动重试；测速和可达性探测需要如实反映单次请求的结果时关闭
+
+        Raises:
+            requests.RequestException: 重试后仍然失败
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        started = time.perf_counter()
+        try:
+            response = self._get_session(retries).request(method, url, **kwargs)
+        except requests.RequestException as e:
+            self._metrics.append(RequestMetric(method, host, None, time.perf_counter() - started, str(e)))
+            raise
+        seconds = time.perf_counter() - started
+        self._metrics.append(RequestMetric(method, host, response.status_code, seconds))
+        logger.debug("HTTP请求", method=method, url=url, status=response.status_code, seconds=round(seconds, 3))
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", True)
+        return self.request("HEAD", url, **kwargs)
+
+    def metrics(self) -> List[RequestMetric]:
+        """最近的请求记录（从旧到新）。"""
+        return list(self._metrics)
+
+    def summary(self) -> Dict[str, Dict]:
+        """按主机汇总请求数、失败数、总耗时和最长耗时。"""
+        result: Dict[str, Dict] = {}
+        for item in self.metrics():
+            host = result.setdefault(item.host, {"requests": 0, "errors": 0, "seconds": 0.0, "slowest": 0.0})
+            host["requests"] += 1
+            host["errors"] += item.status is None or item.status >= 400
+            host["seconds"] += item.seconds
+            host["slowest"] = max(host["slowest"], item.seconds)
+        return result
+
+    def log_summary(self):
+        for host, stats in self.summary().items():
+            logger.info("HTTP请求统计", host=host, requests=stats["requests"], errors=stats["errors"],
+                        seconds=round(stats["seconds"], 2), slowest=round(stats["slowest"], 2))
+
+
+# 全局HTTP客户端实例
+http_client = HttpClient()
@@ -7,6 +7,8 @@ import subprocess
 import structlog
 from typing import Dict, Any, Optional
 from ..ui.interface import ui
+from .launcher import MONGODB_PORT
+from .readiness import ProbeContext, TcpPortProbe, wait_until_ready
 from pathlib import Path
 
 logger = structlog.get_logger(__name__)
@@ -530,22 +532,30 @@ class KnowledgeBuilder:
                 ui.print_error("源版本MongoDB路径未配置或不存在")
                 return False
             
-            if not ui.confirm("是否启动MongoDB服务？"):
-                ui.print_info("迁移已取消")
-                return False
-            
-            # 启动MongoDB
-            ui.print_info("正在启动MongoDB服务...")
-            mongodb_cmd = f'start cmd /k "cd /d "{mongodb_path}\\mongodb-win32-x64_windows-windows-8.2.0-alpha-2686-g3770008\\bin" && mongod --dbpath ..\\data && pause"'
-            
-            subprocess.run(mongodb_cmd, shell=True, capture_output=False, text=True)
-            ui.print_success("MongoDB服务已在新窗口启动")
-            ui.console.print("请确保MongoDB服务正常运行后再继续", style=ui.colors["warning"])
-            
-            # 等待用户确认MongoDB启动
-            if not ui.confirm("MongoDB服务是否已正常启动？"):
-                ui.print_error("请确保MongoDB服务正常启动后再重试")
-                return False
+            mongodb_probe = TcpPortProbe("127.0.0.1", MONGODB_PORT, timeout=60)
+            if mongodb_probe.check():
+                ui.print_info("MongoDB服务已经在运行")
+            else:
+                if not ui.confirm("是否启动MongoDB服务？"):
+                    ui.print_info("迁移已取消")
+                    return False
+                
+                # 启动MongoDB
+                ui.print_info("正在启动MongoDB服务...")
+                mongodb_cmd = f'start cmd /k "cd /d "{mongodb_path}\\mongodb-win32-x64_windows-windows-8.2.0-alpha-2686-g3770008\\bin" && mongod --dbpath ..\\data && pause"'
+                
+                subprocess.run(mongodb_cmd, shell=True, capture_output=False, text=True)
+                ui.print_success("MongoDB服务已在新窗口启动")
+                
+                # 等待MongoDB端口可连接
+                ui.print_info(f"等待MongoDB就绪（端口 {MONGODB_PORT}）...")
+                context = ProbeContext(None, "MongoDB", lambda _: [], tracks_process=False, captures_output=False)
+                ready, reason, elapsed = wait_until_ready([mongodb_probe], context)
+                if not ready:
+                    ui.print_error(f"MongoDB未能就绪：{reason}")
+                    ui.print_error("请确保MongoDB服务正常启动后再重试")
+                    return False
+                ui.print_success(f"MongoDB服务已就绪，用时 {elapsed:.1f} 秒")
             
             # 第四步：执行迁移脚本
             ui.console.print("\n📋 步骤4：执行数据迁移脚本", style=ui.colors["info"])
@@ -2,77 +2,404 @@
 麦麦启动器模块
 负责启动和管理麦麦实例及其相关组件。
 """
+import datetime
+import glob
+import json
 import os
+import re
 import subprocess
+import threading
 import time
+import toml
 import structlog
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, Any, Optional, List, Tuple
 
+from ..core.config import config_manager
+from ..core.task_engine import report_progress, submit_in_context
 from ..ui.interface import ui
 from ..utils.common import check_process, validate_path
+from ..utils.process_table import process_table
 from ..utils.version_detector import is_legacy_version
+from .log_store import LogStore, safe_name
+from .pid_registry import AdoptedProcess, is_supported as pid_registry_supported, pid_registry
+from .process_backend import ProcessBackend, create_backend
+from .resource_monitor import format_bytes, resource_sampler, sparkline
+from .supervisor import STATE_DEGRADED, STATE_RESTARTING, RestartPolicy, Supervisor
+from .readiness import (
+    ProbeContext, ProcessAliveProbe, ReadinessProbe, TcpPortProbe,
+    probe_from_spec, wait_until_ready,
+)
 
 logger = structlog.get_logger(__name__)
 
+# 各组件的默认监听端口
+MONGODB_PORT = 27017
+NAPCAT_WEBUI_PORT = 6099
+# NapCat WebUI配置文件相对NapCat目录的可能位置（Shell版与OneKey版目录结构不同）
+NAPCAT_WEBUI_CONFIGS = (
+    os.path.join("config", "webui.json"),
+    os.path.join("napcat", "config", "webui.json"),
+    os.path.join("versions", "*", "resources", "app", "napcat", "config", "webui.json"),
+)
+ADAPTER_DEFAULT_PORT = 8095
+MAI_DEFAULT_PORT = 8000
+
+# 日志查看（指定时间之后、搜索）最多显示的行数
+LOG_VIEW_LIMIT = 200
+
+# 停止组件时的默认优雅等待时间（秒），超时后强制结束
+DEFAULT_GRACE_PERIOD = 10.0
+# 等待进程组退出时的检查间隔（秒）
+STOP_POLL_INTERVAL = 0.1
+
+# 组件启动依赖关系（组件 -> 需先就绪的组件），同时决定了串行时的启动顺序
+LAUNCH_DEPENDENCIES: Dict[str, List[str]] = {
+    "mongodb": [],
+    "napcat": [],
+    "webui": [],
+    "adapter": ["napcat"],
+    "mai": ["adapter", "mongodb"],
+}
+
+
+def process_key(title: str, instance_id: Optional[str] = None, component: Optional[str] = None,
+                part: Optional[str] = None) -> str:
+    """
+    获取进程的唯一键：实例编号 + 组件（+ 组件内的部分，如WebUI的HTTP服务器和适配器）。
+    不同实例可能是同一版本，窗口标题相同，因此不能以标题区分；缺少实例信息时退回窗口标题。
+    """
+    if instance_id is None or not component:
+        return title
+    return ":".join(str(p) for p in (instance_id, component, part) if p)
+
+
+def _display_name(title: str, instance_id: Optional[str]) -> str:
+    """进程的显示名称：窗口标题，以及区分同版本实例的实例编号。"""
+    return f"{title} [实例 {instance_id}]" if instance_id is not None else title
+
+
 # --- 内部辅助类 ---
 
 class _ProcessManager:
     """
     内部进程管理器。
-    负责在新CMD窗口中启动、跟踪和停止进程。
+    负责通过进程后端启动、跟踪和停止进程。
     """
-    def __init__(self):
+    def __init__(self, backend: Optional[ProcessBackend] = None):
+        self.backend = backend or create_backend(config_manager.get("process_backend", "auto"))
         self.running_processes: List[Dict[str, Any]] = []
+        # 并行启动时多个线程会同时登记进程
+        self._lock = threading.Lock()
+        # 监管模式：组件异常退出后自动重启（仅在后端能跟踪组件进程本身时有效）
+        self.supervisor = Supervisor(RestartPolicy.from_config(config_manager.get("restart_policy", {})))
+        self.supervise = bool(config_manager.get("supervise_processes", True)) and self.backend.tracks_process
+        # 进程键 -> 日志存储（进程停止后保留，以便继续查看日志）及其显示名称
+        self.log_stores: Dict[str, LogStore] = {}
+        self.log_labels: Dict[str, str] = {}
 
-    def start_in_new_cmd(self, command: str, cwd: str, title: str) -> Optional[subprocess.Popen]:
-        """在新的CMD窗口中启动命令。"""
+    def start_process(self, argv: List[str], cwd: str, title: str, instance_id: Optional[str] = None,
+                      component: Optional[str] = None, log_dir: Optional[str] = None,
+                      part: Optional[str] = None) -> Optional[subprocess.Popen]:
+        """
+        使用当前进程后端启动命令，log_dir 不为空且后端捕获输出时将输出写入该目录。
+        进程以 process_key(title, instance_id, component, part) 区分。
+        """
+        command = subprocess.list2cmdline(argv)
+        key = process_key(title, instance_id, component, part)
         try:
-            cmd_command = f'start "{title}" cmd /k "chcp 65001 && cd /d "{cwd}" && {command}"'
-            logger.info("在新CMD窗口启动进程", title=title, command=command, cwd=cwd)
+            logger.info("启动进程", title=title, key=key, command=command, cwd=cwd, backend=self.backend.name)
             
-            process = subprocess.Popen(cmd_command, shell=True, cwd=cwd)
+            log_store = self._open_log_store(key, os.path.join(log_dir, safe_name(title)) if log_dir else None,
+                                             _display_name(title, instance_id))
+            process = self.backend.spawn(argv, cwd, title, key)
             
             process_info = {
                 "process": process,
+                "key": key,
                 "title": title,
+                "argv": argv,
                 "command": command,
                 "cwd": cwd,
-                "start_time": time.time()
+                "start_time": time.time(),
+                "restarts": 0,
+                "instance_id": instance_id,
+                "component": component,
+                "log_path": log_store.directory if log_store else None,
             }
-            self.running_processes.append(process_info)
-            ui.print_success(f"组件 '{title}' 启动成功！")
+            with self._lock:
+                self.running_processes.append(process_info)
+            if self.backend.tracks_process:
+                resource_sampler.track(key, process.pid)
+                pid_registry.register(key, title, process.pid, argv, cwd, instance_id, component,
+                                      process_info["log_path"])
+            process_table.invalidate()
+            ui.print_success(f"组件 '{title}' 进程已启动。")
             return process
         except Exception as e:
             ui.print_error(f"组件 '{title}' 启动失败: {e}")
             logger.error("进程启动失败", title=title, error=str(e))
             return None
 
-    def stop_all(self):
-        """停止所有由该管理器启动的进程。"""
-        stopped_count = 0
-        for info in self.running_processes:
-            process = info["process"]
-            if process.poll() is None:  # 如果进程仍在运行
-                try:
-                    process.terminate()
-                    stopped_count += 1
-                    logger.info("终止进程", pid=process.pid, title=info['title'])
-                except Exception as e:
-                    logger.warning("终止进程失败", pid=process.pid, title=info['title'], error=str(e))
-        
-        if stopped_count > 0:
-            ui.print_info(f"已成功停止 {stopped_count} 个相关进程。")
+    def _open_log_store(self, key: str, directory: Optional[str], label: str) -> Optional[LogStore]:
+        """获取进程的日志存储，首次使用或目录变化时创建并订阅其输出。"""
+        if not (directory and self.backend.captures_output):
+            return None
+        store = self.log_stores.get(key)
+        if store is not None and os.path.abspath(store.directory) != os.path.abspath(directory):
+            # 实例目录变化（例如实例被移动）后写入新目录
+            store.flush()
+            self.backend.remove_output_listener(key, store.append)
+            del self.log_stores[key]
+        if key not in self.log_stores:
+            try:
+                store = LogStore(directory)
+            except OSError as e:
+                logger.warning("创建组件日志目录失败", key=key, error=str(e))
+                return None
+            self.log_stores[key] = store
+            self.backend.add_output_listener(key, store.append)
+        self.log_labels[key] = label
+        return self.log_stores[key]
+
+    def _find(self, process) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((p for p in self.running_processes if p["process"] is process), None)
+
+    def wait_until_ready(self, process: subprocess.Popen, title: str, probes: List[ReadinessProbe]) -> bool:
+        """等待进程通过所有就绪探针，就绪后在监管模式下开始监管该进程。"""
+        info = self._find(process)
+        if not probes:
+            self._supervise(info, probes)
+            return True
         
-        self.running_processes.clear()
+        context = ProbeContext(
+            process, title, self.backend.get_output,
+            tracks_process=self.backend.tracks_process,
+            captures_output=self.backend.captures_output,
+            output_name=info["key"] if info else None,
+        )
+        ui.print_info(f"等待组件 '{title}' 就绪（{', '.join(p.description for p in probes)}）...")
+        ready, reason, elapsed = wait_until_ready(probes, context)
+        if ready:
+            ui.print_success(f"组件 '{title}' 已就绪，用时 {elapsed:.1f} 秒")
+            logger.info("组件已就绪", title=title, elapsed=round(elapsed, 2))
+            self._supervise(info, probes)
+        else:
+            ui.print_error(f"组件 '{title}' 未能就绪：{reason}")
+            logger.error("组件未能就绪", title=title, reason=reason, elapsed=round(elapsed, 2))
+        return ready
+
+    def _supervise(self, info: Optional[Dict[str, Any]], probes: List[ReadinessProbe]):
+        """将进程交给监管器。"""
+        if self.supervise and info:
+            self.supervisor.watch(info["key"], info["process"], lambda: self._respawn(info, probes),
+                                  stop=lambda process: self._stop_respawned(info, process))
+
+    def _respawn(self, info: Dict[str, Any], probes: List[ReadinessProbe]) -> Optional[subprocess.Popen]:
+        """由监管器调用，以原有参数重新启动组件并等待就绪。"""
+        key, title = info["key"], info["title"]
+        process = self.backend.spawn(info["argv"], info["cwd"], title, key)
+        context = ProbeContext(
+            process, title, self.backend.get_output,
+            tracks_process=self.backend.tracks_process,
+            captures_output=self.backend.captures_output,
+            output_name=key,
+        )
+        ready, reason, _ = wait_until_ready(probes, context)
+        if not ready:
+            logger.error("重启后组件未能就绪", title=title, reason=reason)
+            # 与主动停止相同，结束整个进程组（包括脚本或外壳启动的子进程）
+            self._stop_one({**info, "process": process})
+            return None
+        with self._lock:
+            info["process"] = process
+            info["start_time"] = time.time()
+            info["restarts"] += 1
+        resource_sampler.track(key, process.pid)
+        pid_registry.register(key, title, process.pid, info["argv"], info["cwd"], info["instance_id"],
+                              info["component"], info["log_path"])
+        return process
+
+    def _stop_respawned(self, info: Dict[str, Any], process: subprocess.Popen):
+        """由监管器调用：重启期间组件被主动停止，结束新进程的整个进程组并移除其登记。"""
+        resource_sampler.untrack(info["key"])
+        pid_registry.unregister(info["key"])
+        self._stop_one({**info, "process": process})
+
+    def stop_process(self, process: subprocess.Popen):
+        """停止单个由该管理器启动的进程。"""
+        with self._lock:
+            info = next((p for p in self.running_processes if p["process"] is process), None)
+            self.running_processes = [p for p in self.running_processes if p["process"] is not process]
+        if info:
+            self._release(info)
+            self._stop_one(info)
+
+    def _release(self, info: Dict[str, Any]):
+        """停止监管、采样并移除登记记录。"""
+        self.supervisor.forget(info["key"])
+        resource_sampler.untrack(info["key"])
+        pid_registry.unregister(info["key"])
+        if info["key"] in self.log_stores:
+            self.log_stores[info["key"]].flush()
+
+    def _grace_period(self, component: Optional[str]) -> float:
+        """获取组件的优雅停止等待时间。"""
+        grace_periods = config_manager.get("shutdown_grace_periods", {})
+        return float(grace_periods.get(component or "", grace_periods.get("default", DEFAULT_GRACE_PERIOD)))
+
+    def _stop_one(self, info: Dict[str, Any]) -> Tuple[str, float]:
+        """
+        停止一个组件的整个进程组：先发送终止信号，超过等待时间后强制结束。
+
+        Returns:
+            (结果, 耗时秒数)，结果为 "exited"（此前已退出）、"graceful" 或 "killed"
+        """
+        process, title = info["process"], info["title"]
+        started = time.time()
+        if not self.backend.group_alive(process, title):
+            return "exited", 0.0
+
+        deadline = started + self._grace_period(info.get("component"))
+        try:
+            self.backend.signal_group(process, title)
+            try:
+                process.wait(timeout=max(0.0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                pass
+            # 组长退出后，等待组内其余进程（如由脚本启动的python）退出
+            while self.backend.group_alive(process, title) and time.time() < deadline:
+                time.sleep(STOP_POLL_INTERVAL)
+            if not self.backend.group_alive(process, title):
+                logger.info("进程已停止", pid=process.pid, title=title, elapsed=round(time.time() - started, 2))
+                return "graceful", time.time() - started
+
+            logger.warning("进程未在等待时间内退出，强制结束", pid=process.pid, title=title)
+            self.backend.signal_group(process, title, force=True)
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                logger.error("强制结束进程失败", pid=process.pid, title=title)
+        except Exception as e:
+            logger.warning("终止进程失败", pid=process.pid, title=title, error=str(e))
+        return "killed", time.time() - started
+
+    def adopt_registered(self) -> int:
+        """重新接管登记表中仍在运行的进程，返回接管的数量。"""
+        adopted = 0
+        for key, entry in pid_registry.load_live().items():
+            with self._lock:
+                if any(p["key"] == key for p in self.running_processes):
+                    continue
+            title = entry.get("title") or key
+            process = AdoptedProcess(entry["pid"], entry["argv"], entry["start_time"], entry["cmdline_hash"])
+            info = {
+                "process": process,
+                "key": key,
+                "title": title,
+                "argv": entry["argv"],
+                "command": subprocess.list2cmdline(entry["argv"]),
+                "cwd": entry["cwd"],
+                "start_time": entry["start_time"],
+                "restarts": 0,
+                "instance_id": entry.get("instance_id"),
+                "component": entry.get("component"),
+                "log_path": entry.get("log_path"),
+                "adopted": True,
+            }
+            # 先订阅输出再继续读取输出文件，接管前积累的输出一并写入日志
+            self._open_log_store(key, info["log_path"], _display_name(title, info["instance_id"]))
+            self.backend.attach(process, title, key)
+            with self._lock:
+                self.running_processes.append(info)
+            resource_sampler.track(key, process.pid)
+            self._supervise(info, [])
+            logger.info("重新接管进程", title=title, key=key, pid=process.pid)
+            adopted += 1
+        return adopted
+
+    def get_output(self, key: str, count: Optional[int] = None) -> List[str]:
+        """获取进程最近的输出行（仅捕获输出的后端可用）。"""
+        return [text for _, _, text in self.backend.get_output(key, count)]
+
+    def detach_all(self):
+        """
+        启动器退出但保留组件运行：停止监管，保存输出读取位置并写出缓冲的日志。
+        已登记的进程在下次打开启动器时重新接管。
+        """
+        self.supervisor.stop()
+        self.backend.detach_all()
+        for store in self.log_stores.values():
+            store.flush()
+
+    def stop_all(self):
+        """
+        停止所有由该管理器启动的进程。
+        按启动依赖的逆序停止（依赖某组件的组件先停止），互不依赖的组件同时发送信号并并行等待。
+        """
+        # 先停止监管，避免主动终止被当作崩溃而触发重启
+        self.supervisor.stop()
+        with self._lock:
+            infos = self.running_processes
+            self.running_processes = []
+        if not infos:
+            return
+        for info in infos:
+            self._release(info)
+
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for info in infos:
+            groups.setdefault(info.get("component") or "", []).append(info)
+        # 组件 -> 尚未停止的、依赖它的组件
+        blockers = {name: {n for n in groups if name in LAUNCH_DEPENDENCIES.get(n, [])} for name in groups}
+        remaining = {name: len(items) for name, items in groups.items()}
+        stopped: set = set()
+        results: List[Tuple[str, str, float]] = []
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=len(infos)) as executor:
+            futures = {}
+
+            def submit_ready():
+                for name in [n for n, waiting in blockers.items() if waiting <= stopped]:
+                    del blockers[name]
+                    for info in groups[name]:
+                        futures[executor.submit(self._stop_one, info)] = (name, info["title"])
+
+            submit_ready()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, title = futures.pop(future)
+                    outcome, elapsed = future.result()
+                    results.append((title, outcome, elapsed))
+                    remaining[name] -= 1
+                    if remaining[name] == 0:
+                        stopped.add(name)
+                submit_ready()
+
+        stopped_results = [r for r in results if r[1] != "exited"]
+        if not stopped_results:
+            return
+        outcome_labels = {"graceful": "已退出", "killed": "超时，已强制结束"}
+        for title, outcome, elapsed in stopped_results:
+            ui.console.print(f"  • {title}: {outcome_labels[outcome]}，用时 {elapsed:.1f} 秒", style="dim")
+        ui.print_info(f"已成功停止 {len(stopped_results)} 个相关进程，总用时 {time.time() - started:.1f} 秒。")
 
     def get_running_processes_info(self) -> List[Dict]:
-        """获取当前仍在运行的进程信息。"""
+        """获取当前仍在运行（或正在被监管重启、已降级）的进程信息。"""
         active_processes = []
-        # 过滤掉已经结束的进程
-        self.running_processes = [p for p in self.running_processes if p["process"].poll() is None]
-        for info in self.running_processes:
+        with self._lock:
+            for info in self.running_processes:
+                status = self.supervisor.get_status(info["key"]) if self.supervise else None
+                info["state"] = status["state"] if status else None
+                if info["process"].poll() is None or info["state"] in (STATE_RESTARTING, STATE_DEGRADED):
+                    active_processes.append(info)
+            # 过滤掉已经结束的进程
+            self.running_processes = active_processes
+        for info in active_processes:
             info["running_time"] = time.time() - info["start_time"]
-            active_processes.append(info)
         return active_processes
 
 
@@ -80,6 +407,9 @@ class _LaunchComponent:
     """
     可启动组件的基类。
     """
+    # 组件在实例配置 readiness_probes 中的键名
+    key = ""
+
     def __init__(self, name: str, config: Dict[str, Any]):
         self.name = name
         self.config = config
@@ -89,12 +419,28 @@ class _LaunchComponent:
         """检查该组件是否根据配置启用。"""
         raise NotImplementedError
 
-    def get_launch_details(self) -> Optional[Tuple[str, str, str]]:
-        """获取启动所需的命令、工作目录和窗口标题。"""
+    def get_launch_details(self) -> Optional[Tuple[List[str], str, str]]:
+        """获取启动所需的命令参数列表、工作目录和窗口标题。"""
         raise NotImplementedError
 
+    def get_default_readiness_probes(self) -> List[ReadinessProbe]:
+        """获取组件默认的就绪探针。"""
+        return []
+
+    def get_log_dir(self) -> Optional[str]:
+        """获取组件输出日志的存放目录（实例目录下的 launcher_logs）。"""
+        instance_dir = _get_instance_dir(self.config)
+        return os.path.join(instance_dir, "launcher_logs") if instance_dir else None
+
+    def get_readiness_probes(self) -> List[ReadinessProbe]:
+        """获取就绪探针，实例配置中的 readiness_probes 优先于默认探针。"""
+        specs = self.config.get("readiness_probes", {}).get(self.key)
+        if specs is None:
+            return self.get_default_readiness_probes()
+        return [probe for probe in map(probe_from_spec, specs) if probe]
+
     def start(self, process_manager: _ProcessManager) -> bool:
-        """启动组件。"""
+        """启动组件，并在就绪后返回。"""
         if not self.is_enabled:
             ui.print_warning(f"组件 '{self.name}' 未启用或配置无效，跳过启动。")
             return False
@@ -104,14 +450,41 @@ class _LaunchComponent:
             ui.print_error(f"无法获取组件 '{self.name}' 的启动详情。")
             return False
             
-        command, cwd, title = details
-        return process_manager.start_in_new_cmd(command, cwd, title) is not None
+        argv, cwd, title = details
+        return self._start_and_wait(process_manager, argv, cwd, title) is not None
+
+    def _start_and_wait(self, process_manager: _ProcessManager, argv: List[str], cwd: str, title: str,
+                        probes: Optional[List[ReadinessProbe]] = None,
+                        part: Optional[str] = None) -> Optional[subprocess.Popen]:
+        """启动进程并等待探针通过，未能就绪时返回None。part 区分同一组件的多个进程。"""
+        process = process_manager.start_process(argv, cwd, title, instance_id=self.config.get("serial_number"),
+                                                component=self.key, log_dir=self.get_log_dir(), part=part)
+        if not process:
+            return None
+        if probes is None:
+            probes = self.get_readiness_probes()
+        if not process_manager.wait_until_ready(process, title, probes):
+            return None
+        return process
 
 
 # --- 具体组件实现 ---
 
+def _get_instance_dir(config: Dict[str, Any]) -> Optional[str]:
+    """获取实例目录（麦麦本体目录的上一级）。"""
+    bot_path = config.get("mofox_path" if config.get("bot_type") == "MoFox_bot" else "mai_path", "")
+    return os.path.dirname(os.path.abspath(bot_path)) if bot_path else None
+
+
+def _probe_host(host: str) -> str:
+    """将监听地址转换为可用于探测的地址。"""
+    return "127.0.0.1" if host in ("", "0.0.0.0", "::") else host
+
+
 class _MongoDbComponent(_LaunchComponent):
     """MongoDB组件。"""
+    key = "mongodb"
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__("MongoDB", config)
         self.check_enabled()
@@ -119,32 +492,48 @@ class _MongoDbComponent(_LaunchComponent):
     def check_enabled(self):
         self.is_enabled = self.config.get("install_options", {}).get("install_mongodb", False)
 
-    def get_launch_details(self) -> Optional[Tuple[str, str, str]]:
+    def get_launch_details(self) -> Optional[Tuple[List[str], str, str]]:
         mongodb_path = self.config.get("mongodb_path", "")
         if not (mongodb_path and os.path.exists(mongodb_path)):
             logger.warning("MongoDB路径无效", path=mongodb_path)
             return None
         
-        mongod_exe = next((os.path.join(root, f) for root, _, files in os.walk(mongodb_path) for f in files if f == "mongod.exe"), None)
-        
+        mongod_exe = self._find_mongod(mongodb_path)
         if not mongod_exe:
-            logger.error("在MongoDB路径中未找到mongod.exe", path=mongodb_path)
+            logger.error("在MongoDB路径中未找到mongod", path=mongodb_path)
             return None
             
         data_dir = os.path.join(mongodb_path, "data")
         os.makedirs(data_dir, exist_ok=True)
         
-        command = f'"{mongod_exe}" --dbpath "{data_dir}"'
+        argv = [mongod_exe, "--dbpath", data_dir]
         title = f"MongoDB - {self.config.get('version_path', 'N/A')}"
-        return command, mongodb_path, title
+        return argv, mongodb_path, title
+
+    @staticmethod
+    def _find_mongod(mongodb_path: str) -> Optional[str]:
+        return next((os.path.join(root, f) for root, _, files in os.walk(mongodb_path) for f in files if f in ("mongod.exe", "mongod")), None)
+
+    def get_default_readiness_probes(self) -> List[ReadinessProbe]:
+        return [TcpPortProbe("127.0.0.1", MONGODB_PORT, timeout=30)]
 
     def start(self, process_manager: _ProcessManager) -> bool:
         if not self.is_enabled:
             return True # 如果没配置，也算作“成功”
         
-        if check_process("mongod.exe"):
-            ui.print_info("MongoDB 已经在运行。")
-            logger.info("MongoDB已经在运行")
+        if TcpPortProbe("127.0.0.1", MONGODB_PORT).check():
+            mongodb_path = self.config.get("mongodb_path", "")
+            mongod_exe = self._find_mongod(mongodb_path) if mongodb_path and os.path.exists(mongodb_path) else None
+            running = process_table.find(os.path.basename(mongod_exe)) if mongod_exe else []
+            # 只有进程快照带有可执行文件路径时才能区分（Windows未安装psutil时tasklist不提供路径）
+            if any(entry.exe for entry in running) \
+                    and not check_process(os.path.basename(mongod_exe), exe_path=mongod_exe):
+                # 端口被其他路径下的mongod占用（例如另一个实例的MongoDB）
+                ui.print_warning("MongoDB 端口已被其他实例的 MongoDB 占用，将共用该服务。")
+                logger.warning("MongoDB端口被其他实例占用", port=MONGODB_PORT, expected_exe=mongod_exe)
+            else:
+                ui.print_info("MongoDB 已经在运行。")
+                logger.info("MongoDB已经在运行", port=MONGODB_PORT)
             return True
         
         ui.print_info("尝试启动 MongoDB...")
@@ -152,6 +541,8 @@ class _MongoDbComponent(_LaunchComponent):
 
 
 class _NapCatComponent(_LaunchComponent):
+    key = "napcat"
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__("NapCat", config)
         self.check_enabled()
@@ -159,67 +550,85 @@ class _NapCatComponent(_LaunchComponent):
     def check_enabled(self):
         self.is_enabled = self.config.get("install_options", {}).get("install_napcat", False)
 
-    def get_launch_details(self) -> Optional[Tuple[str, str, str]]:
+    def _get_launch_candidates(self) -> List[Tuple[List[str], str, str]]:
+        """按优先级获取所有可用的启动方式。"""
         napcat_path = self.config.get("napcat_path", "")
         if not (napcat_path and os.path.exists(napcat_path) and napcat_path.lower().endswith('.exe')):
             logger.error("NapCat路径无效", path=napcat_path)
-            return None
+            return []
         
         # 获取NapCat版本
         napcat_version = self.config.get("napcat_version", "")
         
         # 检查是否有QQ号配置
         qq_account = self.config.get("qq_account")
+        version = self.config.get('version_path', 'N/A')
         
         # 根据NapCat版本确定启动命令
-        if napcat_version == "NapCat.Shell":
-            # NapCat.Shell版本的启动方式
-            # 获取NapCat根目录
-            napcat_dir = os.path.dirname(napcat_path)
-            
-            # 检测操作系统版本
-            import platform
-            is_win10 = platform.release() == "10"
-            
-            # 确定启动脚本名称
-            if is_win10:
-                preferred_script = "launcher-win10-user.bat"
-                fallback_script = "launcher-win10.bat"
-            else:
-                preferred_script = "launcher-user.bat"
-                fallback_script = "launcher.bat"
-            
-            # 检查首选脚本是否存在
-            preferred_script_path = os.path.join(napcat_dir, preferred_script)
-            if os.path.exists(preferred_script_path):
-                command = f'"{preferred_script_path}"'
-                if qq_account:
-                    command += f" {qq_account}"
-                cwd = napcat_dir
-                title = f"NapCatQQ - {self.config.get('version_path', 'N/A')} (Shell)"
-                return command, cwd, title
-            
-            # 检查备选脚本是否存在
-            fallback_script_path = os.path.join(napcat_dir, fallback_script)
-            if os.path.exists(fallback_script_path):
-                command = f'"{fallback_script_path}"'
-                if qq_account:
-                    command += f" {qq_account}"
-                cwd = napcat_dir
-                title = f"NapCatQQ - {self.config.get('version_path', 'N/A')} (Shell)"
-                return command, cwd, title
-            
-            # 如果都没有找到，返回None
-            logger.error("未找到NapCat.Shell启动脚本", preferred=preferred_script_path, fallback=fallback_script_path)
-            return None
-        else:
+        if napcat_version != "NapCat.Shell":
             # 默认启动方式（OneKey版本）
-            command = f'"{napcat_path}"'
+            argv = [napcat_path]
             if qq_account:
-                command += f" {qq_account}"
-            cwd = os.path.dirname(napcat_path)
-            title = f"NapCatQQ - {self.config.get('version_path', 'N/A')}"
-            return command, cwd, title
+                argv.append(qq_account)
+            return [(argv, os.path.dirname(napcat_path), f"NapCatQQ - {version}")]
+
+        # NapCat.Shell版本的启动方式
+        # 获取NapCat根目录
+        napcat_dir = os.path.dirname(napcat_path)
+        
+        # 检测操作系统版本
+        import platform
+        is_win10 = platform.release() == "10"
+        
+        # 确定启动脚本名称，首选脚本在前
+        if is_win10:
+            scripts = ["launcher-win10-user.bat", "launcher-win10.bat"]
+        else:
+            scripts = ["launcher-user.bat", "launcher.bat"]
+        
+        candidates = []
+        for script in scripts:
+            script_path = os.path.join(napcat_dir, script)
+            if os.path.exists(script_path):
+                argv = [script_path]
+                if qq_account:
+                    argv.append(qq_account)
+                candidates.append((argv, napcat_dir, f"NapCatQQ - {version} (Shell)"))
+        
+        if not candidates:
+            logger.error("未找到NapCat.Shell启动脚本", napcat_dir=napcat_dir, scripts=scripts)
+        return candidates
+
+    def get_launch_details(self) -> Optional[Tuple[List[str], str, str]]:
+        candidates = self._get_launch_candidates()
+        return candidates[0] if candidates else None
+
+    def _read_webui_config(self) -> Optional[Dict[str, Any]]:
+        """读取NapCat自己的WebUI配置（webui.json），找不到或无法解析时返回None。"""
+        napcat_dir = os.path.dirname(self.config.get("napcat_path", ""))
+        for pattern in NAPCAT_WEBUI_CONFIGS:
+            for path in sorted(glob.glob(os.path.join(napcat_dir, pattern)), reverse=True):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.info("读取NapCat WebUI配置失败", path=path, error=str(e))
+                    continue
+                if isinstance(data, dict):
+                    return data
+        return None
+
+    def get_default_readiness_probes(self) -> List[ReadinessProbe]:
+        # NapCat的WebUI在登录前即开始监听，可作为进程已正常启动的标志；
+        # 端口以NapCat自己的配置为准，没有配置或WebUI已关闭时只检查进程存活
+        webui = self._read_webui_config()
+        if webui is None or webui.get("enable") is False or webui.get("disableWebUI") is True:
+            return [ProcessAliveProbe(3000)]
+        try:
+            port = int(webui.get("port", NAPCAT_WEBUI_PORT))
+        except (TypeError, ValueError):
+            return [ProcessAliveProbe(3000)]
+        return [TcpPortProbe(_probe_host(str(webui.get("host", ""))), port, timeout=30)]
 
     def start(self, process_manager: _ProcessManager) -> bool:
         if not self.is_enabled:
@@ -229,79 +638,40 @@ class _NapCatComponent(_LaunchComponent):
             ui.print_info("NapCat 已经在运行。")
             logger.info("NapCat已经在运行")
             return True
-            
-        # 获取NapCat版本
-        napcat_version = self.config.get("napcat_version", "")
         
-        # 如果是NapCat.Shell版本，需要特殊处理
-        if napcat_version == "NapCat.Shell":
-            napcat_path = self.config.get("napcat_path", "")
-            napcat_dir = os.path.dirname(napcat_path)
-            
-            # 检测操作系统版本
-            import platform
-            is_win10 = platform.release() == "10"
-            
-            # 确定启动脚本名称
-            if is_win10:
-                preferred_script = "launcher-win10-user.bat"
-                fallback_script = "launcher-win10.bat"
+        candidates = self._get_launch_candidates()
+        if not candidates:
+            ui.print_error(f"无法获取组件 '{self.name}' 的启动详情。")
+            return False
+        
+        for index, (argv, cwd, title) in enumerate(candidates):
+            if index > 0:
+                ui.print_warning("NapCat未能就绪，这应该不是您或我们的问题，我们可以换一种方式启动...")
+                ui.print_info("尝试使用备选启动脚本...")
             else:
-                preferred_script = "launcher-user.bat"
-                fallback_script = "launcher.bat"
+                ui.print_info(f"尝试启动 {title}...")
             
-            # 尝试启动首选脚本
-            ui.print_info("尝试启动 NapCat (Shell)...")
-            preferred_script_path = os.path.join(napcat_dir, preferred_script)
-            if os.path.exists(preferred_script_path):
-                command = f'"{preferred_script_path}"'
-                qq_account = self.config.get("qq_account")
-                if qq_account:
-                    command += f" {qq_account}"
-                
-                process = process_manager.start_in_new_cmd(command, napcat_dir, f"NapCatQQ - {self.config.get('version_path', 'N/A')} (Shell)")
-                if process:
-                    time.sleep(3)  # 等待NapCat启动
-                    # 询问用户是否启动成功
-                    ui.print_warning("NapCat可能启动失败，这应该不是您或我们的问题，我们可以换一种方式启动...")
-                    if ui.confirm("您的NapCat启动成功了吗？"):
-                        return True
-                    else:
-                        # 尝试启动备选脚本
-                        ui.print_info("尝试使用备选启动脚本...")
-                        fallback_script_path = os.path.join(napcat_dir, fallback_script)
-                        if os.path.exists(fallback_script_path):
-                            command = f'"{fallback_script_path}"'
-                            if qq_account:
-                                command += f" {qq_account}"
-                            process = process_manager.start_in_new_cmd(command, napcat_dir, f"NapCatQQ - {self.config.get('version_path', 'N/A')} (Shell)")
-                            if process:
-                                time.sleep(3)  # 等待NapCat启动
-                                return True
-            else:
-                # 首选脚本不存在，直接尝试备选脚本
-                fallback_script_path = os.path.join(napcat_dir, fallback_script)
-                if os.path.exists(fallback_script_path):
-                    ui.print_info("尝试启动 NapCat (Shell)...")
-                    command = f'"{fallback_script_path}"'
-                    qq_account = self.config.get("qq_account")
-                    if qq_account:
-                        command += f" {qq_account}"
-                    process = process_manager.start_in_new_cmd(command, napcat_dir, f"NapCatQQ - {self.config.get('version_path', 'N/A')} (Shell)")
-                    if process:
-                        time.sleep(3)  # 等待NapCat启动
-                        return True
-            return False
-        else:
-            # 默认启动方式（OneKey版本）
-            ui.print_info("尝试启动 NapCat...")
-            if super().start(process_manager):
-                time.sleep(3)  # 等待NapCat启动
+            process = process_manager.start_process(argv, cwd, title, instance_id=self.config.get("serial_number"),
+                                                    component=self.key, log_dir=self.get_log_dir())
+            if not process:
+                continue
+            if process_manager.wait_until_ready(process, title, self.get_readiness_probes()):
                 return True
-            return False
+            if not (process_manager.backend.tracks_process and process.poll() is not None):
+                # 探针未通过不一定是启动失败（例如需要扫码登录），不直接结束仍在运行的NapCat，由用户确认
+                if ui.confirm("NapCat 未在预期时间内就绪，请查看其窗口：NapCat 启动成功了吗？"):
+                    return True
+                if index == len(candidates) - 1:
+                    ui.print_warning("没有其他启动方式了，NapCat 进程保持运行，请手动检查。")
+                    return False
+                # 用户确认失败后再结束，避免与备选方式同时运行
+                process_manager.stop_process(process)
+        return False
 
 
 class _AdapterComponent(_LaunchComponent):
+    key = "adapter"
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__("适配器", config)
         self.check_enabled()
@@ -311,29 +681,42 @@ class _AdapterComponent(_LaunchComponent):
         version = self.config.get("version_path", "")
         self.is_enabled = opts.get("install_adapter", False) and not is_legacy_version(version)
 
-    def get_launch_details(self) -> Optional[Tuple[str, str, str]]:
+    def get_launch_details(self) -> Optional[Tuple[List[str], str, str]]:
         adapter_path = self.config.get("adapter_path", "")
         valid, _ = validate_path(adapter_path, check_file="main.py")
         if not valid:
             logger.error("适配器路径无效", path=adapter_path)
             return None
         
-        python_cmd = MaiLauncher._get_python_command(self.config, adapter_path)
-        command = f"{python_cmd} main.py"
+        python_exe = MaiLauncher._get_python_executable(self.config, adapter_path)
+        argv = [python_exe, "main.py"]
         title = f"麦麦适配器 - {self.config.get('version_path', 'N/A')}"
-        return command, adapter_path, title
+        return argv, adapter_path, title
+
+    def get_default_readiness_probes(self) -> List[ReadinessProbe]:
+        # 适配器作为WebSocket服务端等待NapCat连接，监听地址见 config.toml 的 [napcat_server]
+        host, port = "127.0.0.1", ADAPTER_DEFAULT_PORT
+        config_path = os.path.join(self.config.get("adapter_path", ""), "config.toml")
+        try:
+            adapter_config = toml.load(config_path)
+            for section, values in adapter_config.items():
+                if section.lower() == "napcat_server" and isinstance(values, dict):
+                    host = _probe_host(str(values.get("host", host)))
+                    port = int(values.get("port", port))
+        except Exception as e:
+            logger.info("读取适配器监听地址失败，使用默认端口", path=config_path, error=str(e))
+        return [TcpPortProbe(host, port, timeout=30)]
     
     def start(self, process_manager: _ProcessManager) -> bool:
         if not self.is_enabled:
             return True
         ui.print_info("尝试启动适配器...")
-        if super().start(process_manager):
-            time.sleep(2) # 等待适配器启动
-            return True
-        return False
+        return super().start(process_manager)
 
 
 class _WebUIComponent(_LaunchComponent):
+    key = "webui"
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__("WebUI", config)
         self.check_enabled()
@@ -341,6 +724,9 @@ class _WebUIComponent(_LaunchComponent):
     def check_enabled(self):
         self.is_enabled = self.config.get("install_options", {}).get("install_webui", False)
 
+    def get_default_readiness_probes(self) -> List[ReadinessProbe]:
+        return [ProcessAliveProbe(1000)]
+
     def start(self, process_manager: _ProcessManager) -> bool:
         if not self.is_enabled:
             return True
@@ -360,8 +746,9 @@ class _WebUIComponent(_LaunchComponent):
             ui.print_error("未找到 http_server/main.py，WebUI 启动失败")
             return False
         
-        python_cmd_http = MaiLauncher._get_python_command(self.config, http_server_dir)
-        if not process_manager.start_in_new_cmd(f"{python_cmd_http} main.py", http_server_dir, f"WebUI-HTTPServer - {version}"):
+        python_exe_http = MaiLauncher._get_python_executable(self.config, http_server_dir)
+        if not self._start_and_wait(process_manager, [python_exe_http, "main.py"], http_server_dir,
+                                    f"WebUI-HTTPServer - {version}", part="http_server"):
             return False
 
         # 2. 启动Adapter
@@ -371,26 +758,31 @@ class _WebUIComponent(_LaunchComponent):
             ui.print_error("未找到 adapter/maimai_http_adapter.py，WebUI 启动失败")
             return False
             
-        python_cmd_adapter = MaiLauncher._get_python_command(self.config, adapter_dir)
-        if not process_manager.start_in_new_cmd(f"{python_cmd_adapter} maimai_http_adapter.py", adapter_dir, f"WebUI-Adapter - {version}"):
+        python_exe_adapter = MaiLauncher._get_python_executable(self.config, adapter_dir)
+        if not self._start_and_wait(process_manager, [python_exe_adapter, "maimai_http_adapter.py"], adapter_dir,
+                                    f"WebUI-Adapter - {version}", part="adapter"):
             return False
             
         return True
 
 
 class _MaiComponent(_LaunchComponent):
+    key = "mai"
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__("麦麦本体", config)
         self.is_enabled = True # 本体总是启用
 
-    def get_launch_details(self) -> Optional[Tuple[str, str, str]]:
+    def _get_mai_path(self) -> str:
         # 根据bot_type字段选择正确的路径字段
         bot_type = self.config.get("bot_type", "MaiBot")  # 获取bot类型，默认为MaiBot
         if bot_type == "MoFox_bot":
-            mai_path = self.config.get("mofox_path", "")
-        else:
-            mai_path = self.config.get("mai_path", "")
-        
+            return self.config.get("mofox_path", "")
+        return self.config.get("mai_path", "")
+
+    def get_launch_details(self) -> Optional[Tuple[List[str], str, str]]:
+        bot_type = self.config.get("bot_type", "MaiBot")
+        mai_path = self._get_mai_path()
         version = self.config.get("version_path", "")
         
         if is_legacy_version(version):
@@ -398,18 +790,38 @@ class _MaiComponent(_LaunchComponent):
             if not os.path.exists(run_bat):
                 logger.error("旧版本麦麦缺少run.bat", path=run_bat)
                 return None
-            command = f'"{run_bat}"'
+            argv = [run_bat]
         else:
-            python_cmd = MaiLauncher._get_python_command(self.config, mai_path)
+            python_exe = MaiLauncher._get_python_executable(self.config, mai_path)
             # 根据bot类型确定启动文件
             if bot_type == "MoFox_bot":
                 start_file = "bot.py"
             else:
                 start_file = "bot.py"
-            command = f"{python_cmd} {start_file}"
+            argv = [python_exe, start_file]
             
         title = f"麦麦本体 - {version}"
-        return command, mai_path, title
+        return argv, mai_path, title
+
+    def get_default_readiness_probes(self) -> List[ReadinessProbe]:
+        if is_legacy_version(self.config.get("version_path", "")):
+            return [ProcessAliveProbe(3000)]
+        
+        # 新版本按 .env 中的 HOST/PORT 监听适配器连接
+        host, port = "127.0.0.1", MAI_DEFAULT_PORT
+        env_path = os.path.join(self._get_mai_path(), ".env")
+        try:
+            with open(env_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    name, _, value = line.partition("=")
+                    value = value.split("#")[0].strip().strip('"\'')
+                    if name.strip() == "HOST" and value:
+                        host = _probe_host(value)
+                    elif name.strip() == "PORT" and value.isdigit():
+                        port = int(value)
+        except OSError as e:
+            logger.info("读取麦麦监听地址失败，使用默认端口", path=env_path, error=str(e))
+        return [TcpPortProbe(host, port, timeout=60)]
     
     def start(self, process_manager: _ProcessManager) -> bool:
         ui.print_info("尝试启动麦麦本体...")
@@ -429,29 +841,29 @@ class MaiLauncher:
         self._config: Optional[Dict[str, Any]] = None
 
     @staticmethod
-    def _get_python_command(config: Dict[str, Any], cwd: str) -> str:
-        """获取Python命令，优先使用虚拟环境。"""
+    def _get_python_executable(config: Dict[str, Any], cwd: str) -> str:
+        """获取Python解释器路径，优先使用虚拟环境。"""
         venv_path = config.get("venv_path", "")
         if venv_path and os.path.exists(venv_path):
             py_exe = os.path.join(venv_path, "Scripts" if os.name == 'nt' else "bin", "python.exe" if os.name == 'nt' else "python")
             if os.path.exists(py_exe):
                 logger.info("使用虚拟环境Python", path=py_exe)
-                return f'"{py_exe}"'
+                return py_exe
         
         # 检查工作目录下的常见虚拟环境
         for venv_dir in ["venv", ".venv", "env"]:
             py_exe = os.path.join(cwd, venv_dir, "Scripts" if os.name == 'nt' else "bin", "python.exe" if os.name == 'nt' else "python")
             if os.path.exists(py_exe):
                 logger.info("使用项目内虚拟环境Python", path=py_exe)
-                return f'"{py_exe}"'
+                return py_exe
 
         logger.info("使用系统Python")
         return "python"
 
-    def _register_components(self, config: Dict[str, Any]):
-        """根据配置注册所有可用的组件。"""
-        self._config = config
-        self._components = {
+    @staticmethod
+    def _create_components(config: Dict[str, Any]) -> Dict[str, _LaunchComponent]:
+        """根据配置创建所有组件。"""
+        return {
             "mongodb": _MongoDbComponent(config),
             "napcat": _NapCatComponent(config),
             "adapter": _AdapterComponent(config),
@@ -459,6 +871,11 @@ class MaiLauncher:
             "mai": _MaiComponent(config),
         }
 
+    def _register_components(self, config: Dict[str, Any]):
+        """根据配置注册所有可用的组件。"""
+        self._config = config
+        self._components = self._create_components(config)
+
     def validate_configuration(self, config: Dict[str, Any]) -> list:
         """验证配置的有效性。"""
         errors = []
@@ -498,6 +915,13 @@ class MaiLauncher:
 
     def show_launch_menu(self, config: Dict[str, Any]) -> bool:
         """显示启动选择菜单并处理用户选择。"""
+        components_to_start = self.select_launch_components(config)
+        if not components_to_start:
+            return False
+        return self.launch(components_to_start, config)
+
+    def select_launch_components(self, config: Dict[str, Any]) -> Optional[List[str]]:
+        """显示启动选择菜单，返回要启动的组件列表，用户取消时返回None。"""
         self._register_components(config)
         
         ui.clear_screen()
@@ -541,39 +965,42 @@ class MaiLauncher:
         while True:
             choice = ui.get_input("请选择启动方式: ").strip().upper()
             if choice == 'Q':
-                return False
+                return None
             if choice in menu_options:
                 _, components_to_start = menu_options[choice]
-                return self.launch(components_to_start)
+                return components_to_start
             else:
                 ui.print_error("无效选项，请重新选择。")
 
-    def launch(self, components_to_start: List[str]) -> bool:
-        """根据给定的组件列表启动。"""
-        if not self._config:
+    def launch(self, components_to_start: List[str], config: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        根据给定的组件列表启动，互不依赖的组件并行启动。
+        传入 config 时使用独立的组件实例，可与其他实例的启动同时进行。
+        """
+        config = config or self._config
+        if not config:
             ui.print_error("配置未加载，无法启动。")
             return False
+        components = self._create_components(config)
 
-        # 确保MongoDB总是最先启动
-        if self._components['mongodb'].is_enabled:
-            if not self._components['mongodb'].start(self._process_manager):
-                ui.print_warning("MongoDB启动失败，但将继续尝试启动其他组件。")
-        
         # 处理全栈启动
         if "full_stack" in components_to_start:
-            components_to_start = [name for name, comp in self._components.items() if comp.is_enabled and name != "mongodb"]
+            components_to_start = [name for name, comp in components.items() if comp.is_enabled]
 
-        # 按顺序启动组件
-        launch_order = ["napcat", "webui", "adapter", "mai"]
-        final_success = True
-        
-        for comp_name in launch_order:
-            if comp_name in components_to_start:
-                if not self._components[comp_name].start(self._process_manager):
-                    # 麦麦本体是核心，如果它失败了，整个启动就算失败
-                    if comp_name == "mai":
-                        final_success = False
-                        break
+        # MongoDB启用时总是随之启动
+        selected = [name for name in LAUNCH_DEPENDENCIES if name in components_to_start]
+        if components['mongodb'].is_enabled and "mongodb" not in selected:
+            selected.insert(0, "mongodb")
+
+        results, timings = self._launch_graph(components, selected)
+
+        # 麦麦本体是核心，如果它失败了，整个启动就算失败
+        final_success = results.get("mai", True)
+        for name in selected:
+            if name != "mai" and not results.get(name, False):
+                ui.print_warning(f"组件 '{components[name].name}' 启动失败或未就绪。")
+
+        self._report_critical_path(components, selected, timings)
         
         if final_success:
             ui.print_success("🎉 启动流程完成！")
@@ -582,11 +1009,98 @@ class MaiLauncher:
 
         return final_success
 
+    def _launch_graph(self, components: Dict[str, _LaunchComponent],
+                      selected: List[str]) -> Tuple[Dict[str, bool], Dict[str, Tuple[float, float]]]:
+        """
+        按依赖关系图启动组件
+
+        一个组件在其所有（已选中的）依赖结束后立即启动，依赖失败时仍会尝试启动，
+        与原有的"失败后继续启动其他组件"行为保持一致。
+
+        Returns:
+            (各组件是否成功, 各组件相对启动开始的(开始, 结束)时间)
+        """
+        deps = {name: [d for d in LAUNCH_DEPENDENCIES[name] if d in selected] for name in selected}
+        results: Dict[str, bool] = {}
+        timings: Dict[str, Tuple[float, float]] = {}
+        launch_start = time.time()
+
+        def run(name: str) -> bool:
+            started = time.time() - launch_start
+            try:
+                return components[name].start(self._process_manager)
+            except Exception as e:
+                ui.print_error(f"组件 '{components[name].name}' 启动异常: {e}")
+                logger.error("组件启动异常", component=name, error=str(e))
+                return False
+            finally:
+                timings[name] = (started, time.time() - launch_start)
+
+        pending = set(selected)
+        with ThreadPoolExecutor(max_workers=len(selected) or 1, thread_name_prefix="launch") as executor:
+            running = {}
+            while pending or running:
+                for name in [n for n in selected if n in pending and all(d in results for d in deps[n])]:
+                    pending.discard(name)
+                    running[submit_in_context(executor, run, name)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    report_progress(f"组件 '{components[name].name}' {'已就绪' if results[name] else '启动失败'}",
+                                    len(results) / len(selected) * 100)
+
+        return results, timings
+
+    def _report_critical_path(self, components: Dict[str, _LaunchComponent], selected: List[str],
+                              timings: Dict[str, Tuple[float, float]]):
+        """输出启动的关键路径及其耗时。"""
+        if not timings:
+            return
+        
+        # 从最晚结束的组件出发，沿最晚结束的依赖回溯
+        node = max(timings, key=lambda n: timings[n][1])
+        path = [node]
+        while True:
+            deps = [d for d in LAUNCH_DEPENDENCIES[node] if d in selected and d in timings]
+            if not deps:
+                break
+            node = max(deps, key=lambda n: timings[n][1])
+            path.append(node)
+        path.reverse()
+        
+        steps = " → ".join(
+            f"{components[n].name}({timings[n][1] - timings[n][0]:.1f}s)" for n in path
+        )
+        total = timings[path[-1]][1]
+        serial_total = sum(end - start for start, end in timings.values())
+        ui.print_info(f"关键路径: {steps}，总用时 {total:.1f} 秒（逐个启动约需 {serial_total:.1f} 秒）")
+        logger.info("启动关键路径", path=path, total=round(total, 2),
+                    timings={n: round(end - start, 2) for n, (start, end) in timings.items()})
+
+    def adopt_running_processes(self):
+        """重新接管上次运行启动器时启动、且仍在运行的进程。"""
+        adopted = self._process_manager.adopt_registered()
+        if adopted:
+            ui.print_info(f"已重新接管 {adopted} 个上次启动的进程，可在进程状态中查看或停止。")
+
     def stop_all_processes(self):
         """停止所有由启动器启动的进程。"""
         ui.print_info("正在停止所有相关进程...")
         self._process_manager.stop_all()
 
+    def detach_processes(self):
+        """启动器退出时保留仍在运行的进程（不停止），下次打开启动器时重新接管已登记的进程。"""
+        self._process_manager.detach_all()
+
+    def running_process_count(self) -> int:
+        """由启动器启动（或重新接管）且仍在运行的进程数。"""
+        return len(self._process_manager.get_running_processes_info())
+
+    def can_adopt_processes(self) -> bool:
+        """保留运行的进程能否在下次打开启动器时重新接管。"""
+        return self._process_manager.backend.tracks_process and pid_registry_supported()
+
     def show_running_processes(self):
         """显示当前正在运行的进程状态。"""
         active_processes = self._process_manager.get_running_processes_info()
@@ -596,14 +1110,123 @@ class MaiLauncher:
             return
         
         ui.console.print("\n[📊 正在运行的进程]", style=ui.colors["primary"])
+        state_labels = {
+            STATE_RESTARTING: ("等待重启", "warning"),
+            STATE_DEGRADED: ("已降级（反复崩溃，已停止重启）", "error"),
+        }
         for info in active_processes:
             running_time = int(info["running_time"])
+            label, color = state_labels.get(info.get("state"), (f"运行时间: {running_time}秒", "success"))
+            restarts = f"，已重启 {info['restarts']} 次" if info.get("restarts") else ""
+            if info.get("adopted"):
+                restarts += "（重新接管）"
             ui.console.print(
-                f"• {info['title']} - 运行时间: {running_time}秒",
-                style=ui.colors["success"]
+                f"• {_display_name(info['title'], info.get('instance_id'))} - {label}{restarts}",
+                style=ui.colors[color]
             )
             ui.console.print(f"  路径: {info['cwd']}", style="dim")
             ui.console.print(f"  命令: {info['command']}", style="dim")
+            self._show_resource_usage(info["key"])
+            recent_output = self._process_manager.get_output(info["key"], 3)
+            if recent_output:
+                ui.console.print("  最近输出:", style="dim")
+                for line in recent_output:
+                    ui.console.print(f"    {line}", style="dim", markup=False)
+
+    @staticmethod
+    def _show_resource_usage(key: str):
+        """显示进程树的资源占用（当前值、峰值和火花图）。"""
+        samples = resource_sampler.get_samples(key)
+        if not samples:
+            return
+        current = samples[-1]
+        cpu = [s.cpu_percent for s in samples]
+        rss = [s.rss for s in samples]
+        ui.console.print(
+            f"  CPU: {current.cpu_percent:5.1f}% (峰值 {max(cpu):.1f}%) {sparkline(cpu)}",
+            style="dim"
+        )
+        ui.console.print(
+            f"  内存: {format_bytes(current.rss)} (峰值 {format_bytes(max(rss))}) {sparkline(rss)}",
+            style="dim"
+        )
+        ui.console.print(
+            f"  线程: {current.threads}  句柄: {current.fds}  "
+            f"磁盘读: {format_bytes(current.read_bytes)}  磁盘写: {format_bytes(current.write_bytes)}",
+            style="dim"
+        )
+
+    def browse_logs(self):
+        """选择组件并查看其日志末尾、指定时间之后的日志或按正则搜索。"""
+        stores = self._process_manager.log_stores
+        if not stores:
+            ui.print_info("当前没有已记录的组件日志（仅管道进程后端会记录组件输出）。")
+            return
+
+        keys = list(stores)
+        ui.console.print("\n[📜 组件日志]", style=ui.colors["primary"])
+        for index, key in enumerate(keys, 1):
+            ui.console.print(f" [{index}] {self._process_manager.log_labels.get(key, key)}  "
+                             f"({format_bytes(stores[key].disk_usage())})")
+        choice = ui.get_input("请选择组件编号（Q返回）: ").strip().upper()
+        if choice == "Q":
+            return
+        if not (choice.isdigit() and 1 <= int(choice) <= len(keys)):
+            ui.print_error("无效选项")
+            return
+        store = stores[keys[int(choice) - 1]]
+
+        ui.console.print(" [1] 查看最后N行")
+        ui.console.print(" [2] 查看指定时间之后的日志")
+        ui.console.print(" [3] 正则搜索")
+        mode = ui.get_input("请选择查看方式: ").strip()
+        try:
+            if mode == "1":
+                count = ui.get_input("显示行数（默认50）: ").strip()
+                lines = store.tail(int(count) if count.isdigit() else 50)
+            elif mode == "2":
+                since = self._parse_log_time(ui.get_input("起始时间（HH:MM、YYYY-MM-DD HH:MM 或 N 分钟前的 N）: "))
+                if since is None:
+                    ui.print_error("无法识别的时间格式")
+                    return
+                lines = store.since(since, limit=LOG_VIEW_LIMIT)
+            elif mode == "3":
+                pattern = ui.get_input("正则表达式: ")
+                since_text = ui.get_input("限定起始时间（可留空）: ").strip()
+                since = self._parse_log_time(since_text) if since_text else None
+                lines = store.search(pattern, since=since, limit=LOG_VIEW_LIMIT)
+            else:
+                ui.print_error("无效选项")
+                return
+        except re.error as e:
+            ui.print_error(f"正则表达式无效：{e}")
+            return
+
+        if not lines:
+            ui.print_info("没有匹配的日志。")
+            return
+        for timestamp, channel, text in lines:
+            stamp = datetime.datetime.fromtimestamp(timestamp).strftime("%m-%d %H:%M:%S")
+            ui.console.print(f"{stamp} {text}", style=ui.colors["warning"] if channel == "stderr" else None,
+                             markup=False, highlight=False)
+        if len(lines) >= LOG_VIEW_LIMIT and mode != "1":
+            ui.print_info(f"仅显示前 {LOG_VIEW_LIMIT} 条结果。")
+
+    @staticmethod
+    def _parse_log_time(text: str) -> Optional[float]:
+        """解析时间输入：HH:MM[:SS]（今天）、YYYY-MM-DD HH:MM[:SS]，或表示N分钟前的整数。"""
+        text = text.strip()
+        if text.isdigit():
+            return time.time() - int(text) * 60
+        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%H:%M:%S", "%H:%M"):
+            try:
+                parsed = datetime.datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            if not fmt.startswith("%Y"):
+                parsed = datetime.datetime.combine(datetime.date.today(), parsed.time())
+            return parsed.timestamp()
+        return None
 
 
 # 全局启动器实例
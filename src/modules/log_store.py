@@ -0,0 +1,230 @@
+"""
+组件日志存储模块
+将组件输出写入实例目录下按大小轮转的gzip分段文件：
+- 每个分段由若干独立压缩的gzip成员（块）拼接而成，整个文件仍可直接用gzip解压
+- 每个分段附带一个稀疏索引（每块一行：起止时间戳、字节偏移、长度、行数），
+  按时间查找和搜索时只解压索引命中的块，无需解压整个文件
+"""
+import gzip
+import os
+import re
+import threading
+import structlog
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = structlog.get_logger(__name__)
+
+# 每块未压缩数据的上限（字节），也是索引的粒度
+BLOCK_SIZE = 64 * 1024
+# 缓冲中的行最长保留时间（秒），超过后随下一行写入一起落盘
+FLUSH_INTERVAL = 2.0
+# 单个分段的压缩后大小上限（字节）
+SEGMENT_SIZE = 16 * 1024 * 1024
+# 每个组件保留的分段数
+MAX_SEGMENTS = 64
+
+LogLine = Tuple[float, str, str]  # (时间戳, 通道, 文本)
+
+
+class IndexEntry(NamedTuple):
+    """分段索引中的一项，对应一个压缩块。"""
+    first_ts: float
+    last_ts: float
+    offset: int
+    length: int
+    lines: int
+
+
+def safe_name(title: str) -> str:
+    """将窗口标题转换为可用作目录名的字符串。"""
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", title).strip("_") or "component"
+
+
+class LogStore:
+    """单个组件的日志存储。"""
+
+    def __init__(self, directory: str, segment_size: int = SEGMENT_SIZE, max_segments: int = MAX_SEGMENTS):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._buffer_bytes = 0
+        self._first_ts = self._last_ts = 0.0
+        # 已封闭分段的索引不会再变化，可以缓存
+        self._index_cache: Dict[int, List[IndexEntry]] = {}
+        os.makedirs(directory, exist_ok=True)
+        segments = self._segments()
+        # 每次打开都从新分段开始，避免在可能不完整的旧分段后追加
+        self._seq = (segments[-1] + 1) if segments else 1
+
+    # --- 写入 ---
+
+    def append(self, line: LogLine):
+        """追加一行输出（可作为输出多路复用器的回调）。"""
+        timestamp, channel, text = line
+        record = f"{timestamp:.3f}\t{channel}\t{text}\n"
+        with self._lock:
+            if not self._buffer:
+                self._first_ts = timestamp
+            self._buffer.append(record)
+            self._buffer_bytes += len(record)
+            self._last_ts = timestamp
+            if self._buffer_bytes >= BLOCK_SIZE or timestamp - self._first_ts >= FLUSH_INTERVAL:
+                self._flush_locked()
+
+    def flush(self):
+        """将缓冲中的行写入磁盘。"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = "".join(self._buffer).encode("utf-8")
+        compressed = gzip.compress(data, compresslevel=6, mtime=0)
+        first_ts, last_ts, lines = self._first_ts, self._last_ts, len(self._buffer)
+        try:
+            with open(self._segment_path(self._seq), "ab") as f:
+                offset = f.tell()
+                f.write(compressed)
+            with open(self._index_path(self._seq), "a", encoding="utf-8") as f:
+                f.write(f"{first_ts:.3f}\t{last_ts:.3f}\t{offset}\t{len(compressed)}\t{lines}\n")
+        except OSError as e:
+            logger.warning("写入组件日志失败", directory=self.directory, error=str(e))
+            return
+        finally:
+            self._buffer, self._buffer_bytes = [], 0
+
+        if offset + len(compressed) >= self.segment_size:
+            self._rotate()
+
+    def _rotate(self):
+        self._seq += 1
+        segments = self._segments()
+        for seq in segments[:max(0, len(segments) - self.max_segments + 1)]:
+            for path in (self._segment_path(seq), self._index_path(seq)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._index_cache.pop(seq, None)
+
+    # --- 读取 ---
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:06d}.log.gz")
+
+    def _index_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:06d}.idx")
+
+    def _segments(self) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(int(name[:6]) for name in names if name.endswith(".log.gz") and name[:6].isdigit())
+
+    def _read_index(self, seq: int) -> List[IndexEntry]:
+        if seq in self._index_cache:
+            return self._index_cache[seq]
+        entries = []
+        try:
+            with open(self._index_path(seq), "r", encoding="utf-8") as f:
+                for row in f:
+                    parts = row.split("\t")
+                    if len(parts) == 5:
+                        entries.append(IndexEntry(float(parts[0]), float(parts[1]), int(parts[2]),
+                                                  int(parts[3]), int(parts[4])))
+        except (OSError, ValueError):
+            pass
+        if seq != self._seq:
+            self._index_cache[seq] = entries
+        return entries
+
+    def _read_block(self, seq: int, entry: IndexEntry) -> List[LogLine]:
+        try:
+            with open(self._segment_path(seq), "rb") as f:
+                f.seek(entry.offset)
+                data = gzip.decompress(f.read(entry.length)).decode("utf-8", errors="replace")
+        except (OSError, EOFError, gzip.BadGzipFile) as e:
+            logger.warning("读取日志块失败", segment=seq, offset=entry.offset, error=str(e))
+            return []
+        lines = []
+        # 只按换行符切分：splitlines 还会在 \r、\x0c 等字符处切分，而组件输出中可能含有这些字符
+        for record in data.split("\n"):
+            parts = record.split("\t", 2)
+            if len(parts) != 3:
+                continue
+            try:
+                lines.append((float(parts[0]), parts[1], parts[2]))
+            except ValueError:
+                # 跳过损坏的记录，不影响同一块中的其余日志
+                continue
+        return lines
+
+    def _blocks(self, since: Optional[float] = None, until: Optional[float] = None,
+                reverse: bool = False) -> Iterator[List[LogLine]]:
+        """按时间顺序（或逆序）逐块读取与时间窗口相交的日志，仅按索引定位需要解压的块。"""
+        self.flush()
+        refs = []
+        for seq in self._segments():
+            for entry in self._read_index(seq):
+                if since is not None and entry.last_ts < since:
+                    continue
+                if until is not None and entry.first_ts > until:
+                    continue
+                refs.append((seq, entry))
+        if reverse:
+            refs.reverse()
+        for seq, entry in refs:
+            yield self._read_block(seq, entry)
+
+    def tail(self, count: int) -> List[LogLine]:
+        """获取最后 count 行。"""
+        collected: List[LogLine] = []
+        for block in self._blocks(reverse=True):
+            collected[:0] = block
+            if len(collected) >= count:
+                break
+        return collected[-count:] if count else []
+
+    def since(self, timestamp: float, limit: Optional[int] = None) -> List[LogLine]:
+        """获取指定时间之后的行（最多 limit 行，从最早的开始）。"""
+        result: List[LogLine] = []
+        for block in self._blocks(since=timestamp):
+            result.extend(line for line in block if line[0] >= timestamp)
+            if limit and len(result) >= limit:
+                return result[:limit]
+        return result
+
+    def search(self, pattern: str, since: Optional[float] = None, until: Optional[float] = None,
+               limit: int = 200) -> List[LogLine]:
+        """
+        按正则搜索日志，从最新的块开始，找到 limit 条后停止
+
+        Returns:
+            按时间顺序排列的匹配行
+        """
+        regex = re.compile(pattern)
+        matches: List[LogLine] = []
+        for block in self._blocks(since=since, until=until, reverse=True):
+            for line in reversed(block):
+                if since is not None and line[0] < since or until is not None and line[0] > until:
+                    continue
+                if regex.search(line[2]):
+                    matches.append(line)
+                    if len(matches) >= limit:
+                        return matches[::-1]
+        return matches[::-1]
+
+    def disk_usage(self) -> int:
+        """日志占用的磁盘空间（字节）。"""
+        total = 0
+        for seq in self._segments():
+            for path in (self._segment_path(seq), self._index_path(seq)):
+                try:
+                    total += os.path.getsize(path)
+                except OSError:
+                    pass
+        return total
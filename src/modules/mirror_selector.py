@@ -0,0 +1,165 @@
+"""
+PyPI镜像选择模块
+安装依赖前并发探测所有配置的PyPI索引：请求一个较小的 simple 索引页面，
+测量首字节时间（TTFB）和吞吐量，按预计耗时排序，结果缓存一段时间。
+pip/uv 依次使用排序后的健康索引，前一个失败时换下一个。
+"""
+import json
+import os
+import time
+import requests
+import structlog
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from ..core.config import config_manager
+from .http_client import http_client
+from .network_probe import network_probe
+
+logger = structlog.get_logger(__name__)
+
+CACHE_FILE = Path.home() / ".maibot" / "cache" / "pypi_mirrors.json"
+DEFAULT_INDEXES = [
+    "https://pypi.tuna.tsinghua.edu.cn/simple",
+    "https://pypi.org/simple",
+    "https://mirrors.aliyun.com/pypi/simple",
+]
+DEFAULT_PROBE_TIMEOUT = 3.0
+DEFAULT_CACHE_MINUTES = 30
+# 测速使用的项目页面（内容较小且所有镜像都有）
+PROBE_PROJECT = "pip"
+# 排序时按下载这么多字节的预计耗时比较，兼顾延迟和带宽
+REFERENCE_BYTES = 256 * 1024
+
+
+class MirrorProbe(NamedTuple):
+    """一个索引的测速结果。"""
+    url: str
+    healthy: bool
+    ttfb: float          # 首字节时间（秒）
+    throughput: float    # 字节/秒
+    error: str = ""
+
+    @property
+    def score(self) -> float:
+        """预计下载 REFERENCE_BYTES 的耗时（秒），越小越好；不健康的索引为无穷大。"""
+        if not self.healthy:
+            return float("inf")
+        return self.ttfb + REFERENCE_BYTES / max(self.throughput, 1.0)
+
+
+class MirrorSelector:
+    """并发测速并排序PyPI索引，结果按配置的有效期缓存。"""
+
+    def __init__(self, cache_file: Path = CACHE_FILE):
+        self.cache_file = cache_file
+
+    @property
+    def settings(self) -> Dict:
+        return config_manager.get("pypi_mirrors", {}) or {}
+
+    @property
+    def indexes(self) -> List[str]:
+        return [url.rstrip("/") for url in self.settings.get("indexes") or DEFAULT_INDEXES]
+
+    def probe(self, url: str, timeout: Optional[float] = None) -> MirrorProbe:
+        """测速一个索引。"""
+        timeout = timeout or float(self.settings.get("probe_timeout", DEFAULT_PROBE_TIMEOUT))
+        started = time.perf_counter()
+        try:
+            # 不自动重试，测得的是单次请求的耗时
+            with http_client.get(f"{url}/{PROBE_PROJECT}/", retries=False, stream=True, timeout=timeout,
+                                 headers={"Accept": "text/html"}) as response:
+                response.raise_for_status()
+                size = 0
+                ttfb = None
+                for chunk in response.iter_content(chunk_size=16 * 1024):
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - started
+                    size += len(chunk)
+                    # 整体超时：iter_content 的超时只针对单次读取
+                    if time.perf_counter() - started > timeout:
+                        raise requests.Timeout("读取索引页面超时")
+                elapsed = time.perf_counter() - started
+            if not size:
+                return MirrorProbe(url, False, elapsed, 0.0, "索引页面为空")
+            transfer = max(elapsed - ttfb, 1e-6)
+            return MirrorProbe(url, True, ttfb, size / transfer)
+        except requests.RequestException as e:
+            return MirrorProbe(url, False, time.perf_counter() - started, 0.0, str(e))
+
+    def probe_all(self, urls: Sequence[str], timeout: Optional[float] = None) -> List[MirrorProbe]:
+        """并发测速所有索引，按预计耗时从快到慢排序。"""
+        if not urls:
+            return []
+        # 网络检查时已确认不可达的索引不再测速
+        unreachable = [url for url in urls if network_probe.is_reachable(url) is False]
+        probes = [MirrorProbe(url, False, 0.0, 0.0, "网络检查时不可达") for url in unreachable]
+        pending = [url for url in urls if url not in unreachable]
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="mirror-probe") as executor:
+                probes += list(executor.map(lambda url: self.probe(url, timeout), pending))
+        for item in probes:
+            logger.info("PyPI索引测速", url=item.url, healthy=item.healthy, ttfb=round(item.ttfb, 3),
+                        throughput=int(item.throughput), error=item.error or None)
+        return sorted(probes, key=lambda item: item.score)
+
+    def _load_cache(self, urls: Sequence[str]) -> Optional[List[MirrorProbe]]:
+        ttl = float(self.settings.get("cache_minutes", DEFAULT_CACHE_MINUTES)) * 60
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if sorted(data["indexes"]) != sorted(urls) or time.time() - data["probed_at"] > ttl:
+                return None
+            return [MirrorProbe(*item) for item in data["ranking"]]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug("读取索引测速缓存失败", error=str(e))
+            return None
+
+    def _save_cache(self, urls: Sequence[str], ranking: List[MirrorProbe]):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.cache_file.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"indexes": list(urls), "probed_at": time.time(),
+                           "ranking": [list(item) for item in ranking]}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.cache_file)
+        except OSError as e:
+            logger.warning("写入索引测速缓存失败", error=str(e))
+
+    def ranking(self, urls: Optional[Sequence[str]] = None, refresh: bool = False) -> List[MirrorProbe]:
+        """获取索引排序（优先使用有效期内的缓存结果）。"""
+        urls = [url.rstrip("/") for url in urls] if urls else self.indexes
+        if not refresh:
+            cached = self._load_cache(urls)
+            if cached is not None:
+                return cached
+        ranking = self.probe_all(urls)
+        self._save_cache(urls, ranking)
+        return ranking
+
+    def ordered_indexes(self, urls: Optional[Sequence[str]] = None, refresh: bool = False) -> List[str]:
+        """
+        返回依次尝试的索引列表：健康的按速度排序在前；
+        全部测速失败时（例如只是测速被拦截）按配置顺序全部返回，仍交给pip/uv尝试
+        """
+        ranking = self.ranking(urls, refresh)
+        healthy = [item.url for item in ranking if item.healthy]
+        if healthy:
+            return healthy
+        logger.warning("所有PyPI索引测速失败，按配置顺序尝试")
+        return [url.rstrip("/") for url in urls] if urls else self.indexes
+
+    def invalidate(self):
+        """清除缓存的测速结果（例如所选索引安装失败后）。"""
+        try:
+            os.remove(self.cache_file)
+        except OSError:
+            pass
+
+
+# 全局PyPI镜像选择器实例
+mirror_selector = MirrorSelector()
@@ -5,17 +5,21 @@ MongoDB安装模块
 """
 import os
 import subprocess
-import zipfile
-import requests
 import structlog
 import re
 from typing import Optional, Tuple
 from pathlib import Path
-from tqdm import tqdm
 from ..ui.interface import ui
+from .archive_stream import extract_zip
+from .artifact_cache import artifact_cache
+from .downloader import SegmentedDownloader
 
 logger = structlog.get_logger(__name__)
 
+# MongoDB压缩包中只需要 bin/ 下的可执行文件，调试符号（.pdb）体积很大且用不到
+MONGODB_INCLUDE = ["*/bin/*"]
+MONGODB_EXCLUDE = ["*.pdb"]
+
 
 class MongoDBInstaller:
     """MongoDB安装器类"""
@@ -96,7 +100,20 @@ class MongoDBInstaller:
     
     def download_file(self, url: str, filename: str) -> bool:
         """
-        下载文件并显示进度条
+        下载文件，同一URL的内容未变化时直接使用下载缓存
+        
+        Args:
+            url: 下载链接
+            filename: 保存的文件名
+            
+        Returns:
+            是否下载成功
+        """
+        return artifact_cache.fetch(url, filename, self._download_file)
+    
+    def _download_file(self, url: str, filename: str) -> bool:
+        """
+        分段并行下载文件并显示进度条，中断后再次调用会续传
         
         Args:
             url: 下载链接
@@ -109,21 +126,7 @@ class MongoDBInstaller:
             ui.print_info(f"正在下载 {filename}...")
             logger.info("开始下载文件", url=url, filename=filename)
             
-            resp = requests.get(url, stream=True)
-            resp.raise_for_status()
-            
-            total = int(resp.headers.get("content-length", 0))
-            
-            with open(filename, "wb") as file, tqdm(
-                desc=filename,
-                total=total,
-                unit="iB",
-                unit_scale=True,
-                unit_divisor=1024,
-            ) as bar:
-                for data in resp.iter_content(chunk_size=1024):
-                    size = file.write(data)
-                    bar.update(size)
+            SegmentedDownloader(verify=True).download(url, filename)
             
             ui.print_success(f"{filename} 下载完成")
             logger.info("文件下载完成", filename=filename)
@@ -145,8 +148,8 @@ class MongoDBInstaller:
             ui.print_info("正在解压MongoDB...")
             logger.info("开始解压MongoDB", filename=self.mongodb_filename)
             
-            with zipfile.ZipFile(self.mongodb_filename, 'r') as zip_ref:
-                zip_ref.extractall(self.mongodb_extract_dir)
+            extract_zip(self.mongodb_filename, self.mongodb_extract_dir,
+                        include=MONGODB_INCLUDE, exclude=MONGODB_EXCLUDE)
             
             # 清理下载的zip文件
             os.remove(self.mongodb_filename)
@@ -178,8 +181,8 @@ class MongoDBInstaller:
             # 确保目标目录存在
             os.makedirs(os.path.dirname(extract_dir), exist_ok=True)
             
-            with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
+            stats = extract_zip(zip_filename, extract_dir, include=MONGODB_INCLUDE, exclude=MONGODB_EXCLUDE)
+            logger.info("MongoDB解压统计", files=stats.files, throughput=f"{stats.throughput:.1f}MB/s")
             
             # 清理下载的zip文件
             if os.path.exists(zip_filename):
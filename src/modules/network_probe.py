@@ -0,0 +1,209 @@
+"""
+网络可达性探测模块
+同时对所有端点（GitHub API、GitHub、源码包下载 codeload、配置的PyPI索引）依次进行
+DNS解析、TCP连接和HTTPS HEAD请求：
+- 任一端点的HTTPS请求成功即得出"网络可用"的结论并立即返回，其余探测在后台继续完成
+- 结论在短时间内缓存，部署和更新流程中重复检查不会再次等待
+- 每个端点的结果记录在可达性表中，后续阶段（选择PyPI索引、下载源码包）据此选择线路而无需再次探测
+配置了代理时DNS和TCP结果只作诊断参考，以经过代理的HTTPS结果为准。
+"""
+import queue
+import socket
+import threading
+import time
+import requests
+import structlog
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .http_client import http_client
+
+logger = structlog.get_logger(__name__)
+
+# (名称, 地址)
+CORE_ENDPOINTS = [
+    ("GitHub API", "https://api.github.com"),
+    ("GitHub", "https://github.com"),
+    ("GitHub源码包", "https://codeload.github.com"),
+]
+# 每个阶段（DNS、TCP、HTTPS）的超时秒数
+DEFAULT_TIMEOUT = 5.0
+# 结论的缓存时间：网络可用时较长；不可用时较短，以便用户修改代理后重试
+VERDICT_TTL = 60
+FAILURE_TTL = 10
+# 可达性表的有效期，超过后视为未知
+MAP_MAX_AGE = 600
+
+
+class EndpointStatus(NamedTuple):
+    """一个端点的探测结果。"""
+    name: str
+    url: str
+    dns: bool
+    tcp: bool
+    https: bool
+    seconds: float      # 完成探测的耗时
+    error: str = ""
+    checked_at: float = 0.0
+
+    @property
+    def reachable(self) -> bool:
+        return self.https
+
+
+def endpoint_key(url: str) -> str:
+    """可达性表按 scheme://主机[:端口] 区分端点。"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def probe_endpoint(name: str, url: str, timeout: float = DEFAULT_TIMEOUT) -> EndpointStatus:
+    """依次探测DNS、TCP和HTTPS，不抛出异常。"""
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    proxies = http_client.proxies
+    started = time.perf_counter()
+
+    def result(dns: bool, tcp: bool, https: bool, error: str = "") -> EndpointStatus:
+        return EndpointStatus(name, url, dns, tcp, https, time.perf_counter() - started, error, time.time())
+
+    dns = tcp = False
+    error = ""
+    try:
+        address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        dns = True
+        with socket.socket(address[0], address[1], address[2]) as sock:
+            sock.settimeout(timeout)
+            sock.connect(address[4])
+        tcp = True
+    except OSError as e:
+        error = f"{'TCP连接' if dns else 'DNS解析'}失败：{e}"
+    # 直连不通时只有经过代理才可能访问
+    if not tcp and not proxies:
+        return result(dns, tcp, False, error)
+
+    try:
+        response = http_client.head(url, retries=False, timeout=timeout, allow_redirects=False)
+        response.close()
+        # 收到任何非5xx响应都说明端点可以访问
+        if response.status_code < 500:
+            return result(dns, tcp, True)
+        return result(dns, tcp, False, f"HTTP {response.status_code}")
+    except requests.RequestException as e:
+        return result(dns, tcp, False, f"HTTPS请求失败：{e}")
+
+
+class NetworkProbe:
+    """并发探测网络可达性，缓存结论并记录每个端点的可达性。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statuses: Dict[str, EndpointStatus] = {}
+        self._verdict: Optional[Tuple[bool, str]] = None
+        self._verdict_at = 0.0
+
+    def _record(self, status: EndpointStatus):
+        with self._lock:
+            self._statuses[endpoint_key(status.url)] = status
+        logger.info("端点探测结果", endpoint=status.name, reachable=status.reachable, dns=status.dns,
+                    tcp=status.tcp, seconds=round(status.seconds, 3), error=status.error or None)
+
+    def _cached_verdict(self) -> Optional[Tuple[bool, str]]:
+        if self._verdict is None:
+            return None
+        ttl = VERDICT_TTL if self._verdict[0] else FAILURE_TTL
+        return self._verdict if time.time() - self._verdict_at < ttl else None
+
+    def check(self, extra_urls: Sequence[str] = (), timeout: float = DEFAULT_TIMEOUT,
+              force: bool = False) -> Tuple[bool, str]:
+        """
+        检查网络是否可用
+
+        Args:
+            extra_urls: 额外探测的地址（例如PyPI索引）
+            timeout: 每个阶段的超时秒数
+            force: 忽略缓存的结论
+
+        Returns:
+            (是否可用, 不可用时的原因)
+        """
+        if not force:
+            cached = self._cached_verdict()
+            if cached is not None:
+                return cached
+
+        endpoints = list(CORE_ENDPOINTS)
+        known = {endpoint_key(url) for _, url in endpoints}
+        for url in extra_urls:
+            key = endpoint_key(url)
+            if key not in known:
+                known.add(key)
+                endpoints.append((urlsplit(url).hostname or url, key))
+
+        started = time.perf_counter()
+        results: "queue.Queue[EndpointStatus]" = queue.Queue()
+
+        def run(name: str, url: str):
+            status = probe_endpoint(name, url, timeout)
+            self._record(status)
+            results.put(status)
+
+        # 守护线程：得出结论后直接返回，未完成的探测不会阻塞程序退出
+        for name, url in endpoints:
+            threading.Thread(target=run, args=(name, url), name="net-probe", daemon=True).start()
+
+        finished: List[EndpointStatus] = []
+        deadline = time.monotonic() + timeout * 3 + 1
+        verdict = None
+        while len(finished) < len(endpoints):
+            try:
+                status = results.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            finished.append(status)
+            if status.reachable:
+                verdict = (True, "")
+                break
+
+        if verdict is None:
+            if any(status.dns for status in finished):
+                verdict = (False, "DNS可达但GitHub不可访问，可能需要代理")
+            else:
+                verdict = (False, "网络连接不可用，请检查网络设置或代理配置")
+        logger.info("网络连接检查完成", reachable=verdict[0], probed=len(finished), endpoints=len(endpoints),
+                    seconds=round(time.perf_counter() - started, 3))
+        with self._lock:
+            self._verdict = verdict
+            self._verdict_at = time.time()
+        return verdict
+
+    def status(self, url: str) -> Optional[EndpointStatus]:
+        """端点最近的探测结果，未探测或已过期时返回 None。"""
+        with self._lock:
+            status = self._statuses.get(endpoint_key(url))
+        if status is None or time.time() - status.checked_at > MAP_MAX_AGE:
+            return None
+        return status
+
+    def is_reachable(self, url: str) -> Optional[bool]:
+        """端点是否可达，未知时返回 None。"""
+        status = self.status(url)
+        return None if status is None else status.reachable
+
+    def reachability_map(self) -> Dict[str, EndpointStatus]:
+        """所有有效期内的探测结果。"""
+        now = time.time()
+        with self._lock:
+            return {key: status for key, status in self._statuses.items()
+                    if now - status.checked_at <= MAP_MAX_AGE}
+
+    def invalidate(self):
+        """清除缓存的结论和可达性表（例如修改代理设置后）。"""
+        with self._lock:
+            self._statuses.clear()
+            self._verdict = None
+
+
+# 全局网络探测实例
+network_probe = NetworkProbe()
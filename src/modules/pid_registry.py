@@ -0,0 +1,233 @@
+"""
+进程登记模块
+将启动器启动的组件进程（PID、进程启动时间、命令行哈希、实例编号、日志路径）持久化到磁盘，
+启动器重新打开后可校验并重新接管仍在运行的进程。
+"""
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+import structlog
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = structlog.get_logger(__name__)
+
+REGISTRY_PATH = Path.home() / ".maibot" / "processes.json"
+# 进程启动时间比较的容差（秒）
+START_TIME_TOLERANCE = 1.0
+
+
+def _read_boot_time() -> Optional[float]:
+    try:
+        with open("/proc/stat") as f:
+            for line in f:
+                if line.startswith("btime"):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+_BOOT_TIME = _read_boot_time()
+
+
+def get_process_start_time(pid: int) -> Optional[float]:
+    """获取进程启动时间（Unix时间戳），进程不存在或无法获取时返回None。"""
+    if _BOOT_TIME is not None:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            # 第22个字段starttime，单位为开机后的时钟滴答数
+            return _BOOT_TIME + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        except (OSError, IndexError, ValueError):
+            return None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+    return None
+
+
+def get_process_cmdline(pid: int) -> Optional[List[str]]:
+    """获取进程的命令行参数列表。"""
+    if _BOOT_TIME is not None:
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                raw = f.read()
+            return [arg.decode("utf-8", errors="replace") for arg in raw.split(b"\0")[:-1]]
+        except OSError:
+            return None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).cmdline()
+        except psutil.Error:
+            return None
+    return None
+
+
+def hash_cmdline(argv: List[str]) -> str:
+    """计算命令行的哈希值。"""
+    return hashlib.sha256("\0".join(argv).encode("utf-8")).hexdigest()[:16]
+
+
+def is_supported() -> bool:
+    """当前系统能否校验进程身份（需要/proc或psutil）。"""
+    return _BOOT_TIME is not None or psutil is not None
+
+
+def is_same_process(pid: int, start_time: float, cmdline_hash: str) -> bool:
+    """校验PID当前对应的进程是否仍是登记时的那个进程（防止PID复用）。"""
+    actual_start = get_process_start_time(pid)
+    if actual_start is None or abs(actual_start - start_time) > START_TIME_TOLERANCE:
+        return False
+    cmdline = get_process_cmdline(pid)
+    return cmdline is not None and hash_cmdline(cmdline) == cmdline_hash
+
+
+class AdoptedProcess:
+    """
+    重新接管的进程。
+    它不是当前启动器的子进程，提供与Popen相同的最小接口（poll/wait/terminate/kill）。
+    无法获取退出码：退出后 returncode 记为-1，exit_status_known 为 False，监管器不将其视为崩溃。
+    """
+    exit_status_known = False
+
+    def __init__(self, pid: int, args: List[str], start_time: float, cmdline_hash: str):
+        self.pid = pid
+        self.args = args
+        self.start_time = start_time
+        self.cmdline_hash = cmdline_hash
+        self.returncode: Optional[int] = None
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None and not is_same_process(self.pid, self.start_time, self.cmdline_hash):
+            self.returncode = -1
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(0.1)
+        return self.returncode
+
+    def send_signal(self, sig: int):
+        if self.poll() is not None:
+            return
+        if psutil is not None:
+            try:
+                psutil.Process(self.pid).send_signal(sig)
+            except psutil.NoSuchProcess:
+                pass
+        else:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(getattr(signal, "SIGKILL", signal.SIGTERM))
+
+
+class PidRegistry:
+    """
+    进程登记表。
+    以进程键（实例编号和组件，见 launcher.process_key）为键保存在一个JSON文件中，每次修改后原子写回。
+    """
+
+    def __init__(self, path: Path = REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("读取进程登记表失败", path=str(self.path), error=str(e))
+            return {}
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("写入进程登记表失败", path=str(self.path), error=str(e))
+
+    def register(self, key: str, title: str, pid: int, argv: List[str], cwd: str,
+                 instance_id: Optional[str] = None, component: Optional[str] = None,
+                 log_path: Optional[str] = None):
+        """登记一个已启动的进程，同一键的旧记录会被覆盖。"""
+        start_time = get_process_start_time(pid)
+        cmdline = get_process_cmdline(pid)
+        if start_time is None or cmdline is None:
+            logger.debug("无法获取进程身份信息，跳过登记", title=title, pid=pid)
+            return
+        with self._lock:
+            entries = self._load()
+            entries[key] = {
+                "title": title,
+                "pid": pid,
+                "start_time": start_time,
+                "cmdline_hash": hash_cmdline(cmdline),
+                "argv": argv,
+                "cwd": cwd,
+                "instance_id": instance_id,
+                "component": component,
+                "log_path": log_path,
+            }
+            self._save(entries)
+
+    def unregister(self, key: str):
+        """移除登记记录。"""
+        with self._lock:
+            entries = self._load()
+            if entries.pop(key, None) is not None:
+                self._save(entries)
+
+    def load_live(self) -> Dict[str, Dict[str, Any]]:
+        """
+        读取仍在运行的登记进程，并清理已失效的记录
+
+        Returns:
+            进程键 -> 登记信息
+        """
+        with self._lock:
+            entries = self._load()
+            live = {}
+            for key, entry in entries.items():
+                try:
+                    alive = is_same_process(entry["pid"], entry["start_time"], entry["cmdline_hash"])
+                except (KeyError, TypeError):
+                    alive = False
+                if alive:
+                    live[key] = entry
+                else:
+                    logger.info("清理失效的进程登记", key=key, pid=entry.get("pid"))
+            if len(live) != len(entries):
+                self._save(live)
+            return live
+
+
+# 全局进程登记表实例
+pid_registry = PidRegistry()
@@ -0,0 +1,430 @@
+"""
+进程后端模块
+负责以不同方式启动组件进程：
+- ConsoleBackend: 在新的CMD窗口中启动（Windows原有行为）
+- PipeBackend: 以argv列表直接启动并捕获输出，组件的stdout/stderr写入 ~/.maibot/spool 下的输出文件，
+  所有组件的输出文件由同一个读取线程汇聚到各自的环形缓冲区中。
+  输出文件不依赖启动器存活，启动器退出后组件可以继续运行，重新接管时从上次读到的位置继续读取
+"""
+import collections
+import os
+import signal
+import subprocess
+import threading
+import time
+import structlog
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .log_store import safe_name
+
+logger = structlog.get_logger(__name__)
+
+# 每个组件保留的输出行数
+DEFAULT_BUFFER_LINES = 2000
+# 单次从输出文件读取的最大字节数
+READ_CHUNK_SIZE = 65536
+# 组件输出文件的存放目录
+SPOOL_DIR = Path.home() / ".maibot" / "spool"
+# 读取输出文件的轮询间隔（秒）
+TAIL_INTERVAL = 0.1
+# 读完后输出文件超过该大小时清空，避免长期运行的组件占满磁盘（内容已交给日志存储）
+SPOOL_COMPACT_BYTES = 4 * 1024 * 1024
+# 读取位置写回磁盘的最小间隔（秒）
+OFFSET_SAVE_INTERVAL = 1.0
+CHANNELS = ("stdout", "stderr")
+
+OutputLine = Tuple[float, str, str]  # (时间戳, 通道, 文本)
+
+
+class _SpoolReader:
+    """一个输出文件的读取状态。"""
+
+    def __init__(self, name: str, channel: str, path: Path, alive: Callable[[], bool]):
+        self.name = name
+        self.channel = channel
+        self.path = path
+        self.alive = alive
+        self.fd = os.open(path, os.O_RDONLY)
+        self.offset = self._load_offset()
+        self.saved_offset = self.offset
+        self.saved_at = time.monotonic()
+        self.partial = b""
+
+    @property
+    def offset_path(self) -> Path:
+        return self.path.with_suffix(".offset")
+
+    def _load_offset(self) -> int:
+        try:
+            offset = int(self.offset_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return 0
+        return offset if 0 <= offset <= os.fstat(self.fd).st_size else 0
+
+    def save_offset(self):
+        if self.offset == self.saved_offset:
+            return
+        try:
+            self.offset_path.write_text(str(self.offset), encoding="utf-8")
+        except OSError as e:
+            logger.debug("保存输出读取位置失败", path=str(self.path), error=str(e))
+        self.saved_offset = self.offset
+        self.saved_at = time.monotonic()
+
+    def read(self) -> bytes:
+        """读取新写入的内容，没有新内容时返回空字节串。"""
+        chunks = []
+        while True:
+            data = os.pread(self.fd, READ_CHUNK_SIZE, self.offset)
+            if not data:
+                break
+            chunks.append(data)
+            self.offset += len(data)
+        return b"".join(chunks)
+
+    def compact(self):
+        """
+        已读完的输出文件过大时清空。组件以追加方式写入，清空后新内容从文件开头继续写。
+        与 copytruncate 方式的日志轮转相同，确认读完与清空之间写入的极少量内容可能丢失。
+        """
+        if self.offset < SPOOL_COMPACT_BYTES or os.fstat(self.fd).st_size != self.offset:
+            return
+        os.truncate(self.path, 0)
+        self.offset = 0
+        self.save_offset()
+
+    def close(self, remove: bool):
+        os.close(self.fd)
+        if remove:
+            for path in (self.path, self.offset_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        else:
+            self.save_offset()
+
+
+class OutputMultiplexer:
+    """
+    输出多路复用器。
+    使用一个线程轮询所有组件的输出文件，并按组件写入环形缓冲区；
+    组件的进程组全部退出且输出读完后删除其输出文件。
+    """
+
+    def __init__(self, buffer_lines: int = DEFAULT_BUFFER_LINES, spool_dir: Path = SPOOL_DIR):
+        self.buffer_lines = buffer_lines
+        self.spool_dir = spool_dir
+        self._buffers: Dict[str, Deque[OutputLine]] = {}
+        self._listeners: Dict[str, List[Callable[[OutputLine], None]]] = collections.defaultdict(list)
+        self._readers: Dict[Tuple[str, str], _SpoolReader] = {}
+        self._lock = threading.Lock()
+        # 读取线程处理输出文件期间持有，保证创建、接管和分离与读取互不交错
+        self._readers_lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+
+    def spool_path(self, name: str, channel: str) -> Path:
+        return self.spool_dir / safe_name(name) / f"{channel}.log"
+
+    def create_spool(self, name: str, channel: str) -> int:
+        """
+        为组件新建（清空）输出文件，返回供子进程写入的文件描述符（调用方负责关闭）。
+        同名组件此前的输出文件会先读完再替换。
+        """
+        path = self.spool_path(name, channel)
+        with self._readers_lock:
+            reader = self._readers.pop((name, channel), None)
+            if reader is not None:
+                self._drain(reader)
+                self._finish(reader)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.remove(path.with_suffix(".offset"))
+            except OSError:
+                pass
+            return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o600)
+
+    def attach(self, name: str, channel: str, alive: Callable[[], bool]):
+        """
+        开始读取组件的输出文件，从上次保存的读取位置继续
+
+        Args:
+            name: 组件名称
+            channel: "stdout" 或 "stderr"
+            alive: 组件进程组是否仍有进程存活，全部退出且读完后停止读取
+        """
+        path = self.spool_path(name, channel)
+        with self._lock:
+            self._buffers.setdefault(name, collections.deque(maxlen=self.buffer_lines))
+        with self._readers_lock:
+            if (name, channel) in self._readers:
+                return
+            try:
+                self._readers[(name, channel)] = _SpoolReader(name, channel, path, alive)
+            except OSError as e:
+                logger.warning("无法读取组件输出文件", name=name, path=str(path), error=str(e))
+                return
+        self._ensure_thread()
+
+    def detach_all(self):
+        """停止读取所有输出文件并保存读取位置（组件继续运行，下次接管时继续读取）。"""
+        with self._readers_lock:
+            for reader in self._readers.values():
+                reader.close(remove=False)
+            self._readers.clear()
+
+    def add_listener(self, name: str, callback: Callable[[OutputLine], None]):
+        """为指定组件添加输出行回调（在读取线程中调用）。"""
+        with self._lock:
+            self._listeners[name].append(callback)
+
+    def remove_listener(self, name: str, callback: Callable[[OutputLine], None]):
+        """移除输出行回调。"""
+        with self._lock:
+            if callback in self._listeners.get(name, []):
+                self._listeners[name].remove(callback)
+
+    def get_lines(self, name: str, count: Optional[int] = None) -> List[OutputLine]:
+        """获取组件最近的输出行。"""
+        with self._lock:
+            lines = list(self._buffers.get(name, ()))
+        return lines[-count:] if count else lines
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="output-multiplexer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._readers_lock:
+                for key, reader in list(self._readers.items()):
+                    try:
+                        self._poll(key, reader)
+                    except OSError as e:
+                        logger.warning("读取组件输出失败", name=reader.name, channel=reader.channel, error=str(e))
+                        del self._readers[key]
+                        reader.close(remove=False)
+            time.sleep(TAIL_INTERVAL)
+
+    def _poll(self, key: Tuple[str, str], reader: _SpoolReader):
+        # 先确认进程组已退出再读取，保证退出前写入的内容都能读到
+        exited = not reader.alive()
+        if self._drain(reader):
+            reader.compact()
+            if time.monotonic() - reader.saved_at >= OFFSET_SAVE_INTERVAL:
+                reader.save_offset()
+        elif exited:
+            del self._readers[key]
+            self._finish(reader)
+
+    def _drain(self, reader: _SpoolReader) -> bool:
+        """读取并分发输出文件中的新内容，返回是否读到内容。"""
+        data = reader.read()
+        if not data:
+            return False
+        *complete, reader.partial = (reader.partial + data).split(b"\n")
+        for raw in complete:
+            self._append(reader.name, reader.channel, raw)
+        return True
+
+    def _finish(self, reader: _SpoolReader):
+        """组件已退出：输出最后不完整的一行并删除输出文件。"""
+        if reader.partial:
+            self._append(reader.name, reader.channel, reader.partial)
+        reader.close(remove=True)
+
+    def _append(self, name: str, channel: str, raw: bytes):
+        line = (time.time(), channel, raw.rstrip(b"\r").decode("utf-8", errors="replace"))
+        with self._lock:
+            self._buffers[name].append(line)
+            listeners = list(self._listeners.get(name, ()))
+        for callback in listeners:
+            try:
+                callback(line)
+            except Exception as e:
+                logger.warning("输出回调执行失败", name=name, error=str(e))
+
+
+class ProcessBackend:
+    """进程后端基类。"""
+    name = ""
+
+    def spawn(self, argv: List[str], cwd: str, title: str, name: Optional[str] = None) -> subprocess.Popen:
+        """
+        启动进程并返回Popen对象
+
+        Args:
+            argv: 命令参数列表
+            cwd: 工作目录
+            title: 窗口标题
+            name: 组件的唯一名称，用于区分输出（默认为窗口标题）
+        """
+        raise NotImplementedError
+
+    def attach(self, process, title: str, name: Optional[str] = None):
+        """重新接管进程后继续读取其输出，不支持捕获的后端忽略。"""
+
+    def detach_all(self):
+        """启动器退出但组件继续运行时调用，停止读取输出并保存读取位置。"""
+
+    def get_output(self, name: str, count: Optional[int] = None) -> List[OutputLine]:
+        """获取进程最近的输出，不支持捕获的后端返回空列表。"""
+        return []
+
+    def add_output_listener(self, name: str, callback: Callable[[OutputLine], None]):
+        """为组件添加输出行回调，不支持捕获的后端忽略。"""
+
+    def remove_output_listener(self, name: str, callback: Callable[[OutputLine], None]):
+        """移除输出行回调。"""
+
+    def signal_group(self, process, title: str, force: bool = False):
+        """向组件的整个进程组发送终止信号，force为True时强制结束。"""
+        if process.poll() is None:
+            if force:
+                process.kill()
+            else:
+                process.terminate()
+
+    def group_alive(self, process, title: str) -> bool:
+        """组件的进程组中是否仍有进程存活。"""
+        return process.poll() is None
+
+    @property
+    def captures_output(self) -> bool:
+        return False
+
+    @property
+    def tracks_process(self) -> bool:
+        """返回的Popen是否就是组件进程本身（而非启动它的外壳）。"""
+        return False
+
+
+class ConsoleBackend(ProcessBackend):
+    """在新的CMD窗口中启动进程（Windows）。"""
+    name = "console"
+
+    def spawn(self, argv: List[str], cwd: str, title: str, name: Optional[str] = None) -> subprocess.Popen:
+        command = subprocess.list2cmdline(argv)
+        cmd_command = f'start "{title}" cmd /k "chcp 65001 && cd /d "{cwd}" && {command}"'
+        return subprocess.Popen(cmd_command, shell=True, cwd=cwd)
+
+    @staticmethod
+    def _title_filter(title: str) -> List[str]:
+        # cmd运行命令时窗口标题会追加命令内容，因此按前缀匹配
+        return ["/FI", f"WINDOWTITLE eq {title}*"]
+
+    def signal_group(self, process, title: str, force: bool = False):
+        # Popen只是已退出的start外壳，按窗口标题结束CMD窗口及其整个进程树
+        argv = ["taskkill", *self._title_filter(title), "/T"]
+        if force:
+            argv.append("/F")
+        subprocess.run(argv, capture_output=True)
+
+    def group_alive(self, process, title: str) -> bool:
+        result = subprocess.run(["tasklist", *self._title_filter(title), "/NH"], capture_output=True, text=True)
+        return "cmd.exe" in result.stdout.lower()
+
+
+class PipeBackend(ProcessBackend):
+    """以argv列表直接启动进程，并通过输出文件捕获输出。"""
+    name = "pipe"
+
+    def __init__(self, multiplexer: Optional[OutputMultiplexer] = None):
+        self.multiplexer = multiplexer or OutputMultiplexer()
+
+    @staticmethod
+    def is_supported() -> bool:
+        # 依赖 os.pread 和进程组（os.killpg），Windows不可用
+        return os.name != "nt"
+
+    def spawn(self, argv: List[str], cwd: str, title: str, name: Optional[str] = None) -> subprocess.Popen:
+        name = name or title
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        # 输出写入文件而不是管道：启动器退出后组件写输出不会因管道断开而出错
+        stdout = self.multiplexer.create_spool(name, "stdout")
+        try:
+            stderr = self.multiplexer.create_spool(name, "stderr")
+            try:
+                process = subprocess.Popen(
+                    argv,
+                    cwd=cwd,
+                    env=env,
+                    stdin=subprocess.DEVNULL,
+                    stdout=stdout,
+                    stderr=stderr,
+                    # 独立的会话（进程组），停止时可连同其子进程一起结束，也不会收到启动器终端的Ctrl+C
+                    start_new_session=True,
+                )
+            finally:
+                os.close(stderr)
+        finally:
+            os.close(stdout)
+        self.attach(process, title, name)
+        return process
+
+    def attach(self, process, title: str, name: Optional[str] = None):
+        for channel in CHANNELS:
+            self.multiplexer.attach(name or title, channel, lambda: self.group_alive(process, title))
+
+    def detach_all(self):
+        self.multiplexer.detach_all()
+
+    def get_output(self, name: str, count: Optional[int] = None) -> List[OutputLine]:
+        return self.multiplexer.get_lines(name, count)
+
+    def add_output_listener(self, name: str, callback: Callable[[OutputLine], None]):
+        self.multiplexer.add_listener(name, callback)
+
+    def remove_output_listener(self, name: str, callback: Callable[[OutputLine], None]):
+        self.multiplexer.remove_listener(name, callback)
+
+    def signal_group(self, process, title: str, force: bool = False):
+        # 进程以新会话启动，进程组ID即其PID；组长退出后组内残留进程仍可通过该ID结束
+        try:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def group_alive(self, process, title: str) -> bool:
+        process.poll()  # 回收已退出的组长，避免僵尸进程被计为存活
+        try:
+            os.killpg(process.pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    @property
+    def captures_output(self) -> bool:
+        return True
+
+    @property
+    def tracks_process(self) -> bool:
+        return True
+
+
+def create_backend(name: str = "auto") -> ProcessBackend:
+    """
+    根据名称创建进程后端
+
+    Args:
+        name: "console"、"pipe" 或 "auto"（Windows使用console，其他系统使用pipe）
+
+    Returns:
+        进程后端实例
+    """
+    name = (name or "auto").lower()
+    if name == "auto":
+        name = "console" if os.name == "nt" else "pipe"
+
+    if name == "pipe":
+        if PipeBackend.is_supported():
+            return PipeBackend()
+        logger.warning("当前系统不支持管道后端，回退到控制台后端")
+        return ConsoleBackend()
+    if name != "console":
+        logger.warning("未知的进程后端，使用控制台后端", backend=name)
+    return ConsoleBackend()
@@ -0,0 +1,174 @@
+"""
+受保护文件转移模块
+在目录之间转移配置、数据目录和数据库等受保护文件时保证内存占用恒定：
+- 同一磁盘上直接改名移动，不读取内容
+- 无法改名时（跨磁盘、文件被占用）按固定大小的缓冲区流式复制
+- SQLite数据库通过在线备份API分批复制页面，即使数据库正在写入也只会得到完整一致的副本
+"""
+import fnmatch
+import os
+import shutil
+import sqlite3
+import tempfile
+import structlog
+from typing import List, NamedTuple, Sequence
+from urllib.request import pathname2url
+
+logger = structlog.get_logger(__name__)
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+COPY_BUFFER_SIZE = 1024 * 1024
+# 实例更新时需要保留的顶层项（配置文件和配置目录、数据目录、数据库）
+PROTECTED_PATTERNS = [".env", "config", "config.toml", "bot_config.toml", "data", "*.db", "model_config.toml"]
+# SQLite数据库旁的日志文件
+SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+
+
+class PreservedItem(NamedTuple):
+    """一个被转移的受保护项。"""
+    relative: str   # 相对原目录的路径
+    holding: str    # 转移后的位置
+    moved: bool     # True 表示改名移动；False 表示复制（原位置的文件仍在）
+
+
+def is_sqlite(path: str) -> bool:
+    """根据文件头判断是否为SQLite数据库。"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except OSError:
+        return False
+
+
+def copy_sqlite(source: str, target: str):
+    """
+    通过在线备份API复制SQLite数据库（包括尚未合并的WAL内容），先写入临时文件再改名
+
+    Raises:
+        sqlite3.Error: 备份失败
+    """
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".backup-", suffix=".db")
+    os.close(fd)
+    try:
+        try:
+            src = sqlite3.connect(f"file:{pathname2url(os.path.abspath(source))}?mode=ro", uri=True)
+        except sqlite3.Error:
+            src = sqlite3.connect(source)
+        try:
+            dst = sqlite3.connect(temp_path)
+            try:
+                # 在一个读事务内一次复制全部页面：页面逐页写入目标文件，内存占用与数据库大小无关；
+                # 分多步复制时其他连接的每次写入都会让备份从头开始，持续写入的数据库可能永远复制不完
+                src.backup(dst, pages=-1)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+        shutil.copystat(source, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def stream_copy(source: str, target: str):
+    """复制文件：SQLite数据库使用在线备份，其余按固定缓冲区流式复制，均先写入临时文件再改名。"""
+    if is_sqlite(source):
+        try:
+            copy_sqlite(source, target)
+            return
+        except sqlite3.Error as e:
+            logger.warning("SQLite在线备份失败，改为直接复制", path=source, error=str(e))
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".copy-")
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+        shutil.copystat(source, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def copy_path(source: str, target: str):
+    """复制文件或目录（目录中的每个文件都经过 stream_copy）。"""
+    if os.path.isdir(source) and not os.path.islink(source):
+        shutil.copytree(source, target, symlinks=True, copy_function=stream_copy, dirs_exist_ok=True)
+    else:
+        stream_copy(source, target)
+
+
+def _move_or_copy(source: str, target: str) -> bool:
+    """
+    改名移动，失败时复制
+
+    Returns:
+        是否为移动
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    # 数据库与其日志文件一起移动，否则未合并的WAL内容会丢失
+    sidecars = [suffix for suffix in SQLITE_SIDECARS if os.path.exists(source + suffix)]
+    try:
+        os.rename(source, target)
+    except OSError as e:
+        logger.info("无法直接移动，改为复制", source=source, error=str(e))
+        copy_path(source, target)
+        return False
+    for suffix in sidecars:
+        try:
+            os.rename(source + suffix, target + suffix)
+        except OSError as e:
+            logger.warning("移动数据库日志文件失败", path=source + suffix, error=str(e))
+    return True
+
+
+def find_protected(root: str, patterns: Sequence[str]) -> List[str]:
+    """列出 root 下顶层名称匹配通配符的项（不含SQLite日志文件，它们随数据库一起处理）。"""
+    if not os.path.isdir(root):
+        return []
+    names = []
+    for name in sorted(os.listdir(root)):
+        if any(name.endswith(suffix) for suffix in SQLITE_SIDECARS):
+            continue
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            names.append(name)
+    return names
+
+
+def preserve(root: str, patterns: Sequence[str], holding_dir: str) -> List[PreservedItem]:
+    """
+    将 root 下的受保护项转移到 holding_dir
+
+    Returns:
+        转移记录，交给 restore() 放回
+    """
+    items = []
+    for name in find_protected(root, patterns):
+        holding = os.path.join(holding_dir, name)
+        moved = _move_or_copy(os.path.join(root, name), holding)
+        items.append(PreservedItem(name, holding, moved))
+    logger.info("已转移受保护文件", root=root, items=[item.relative for item in items],
+                copied=[item.relative for item in items if not item.moved])
+    return items
+
+
+def restore(items: Sequence[PreservedItem], root: str):
+    """将 preserve() 转移的受保护项放回（或放到另一个目录）root 中，覆盖同名项。"""
+    for item in items:
+        target = os.path.join(root, item.relative)
+        if os.path.lexists(target):
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            else:
+                os.remove(target)
+        for suffix in SQLITE_SIDECARS:
+            if os.path.exists(target + suffix):
+                os.remove(target + suffix)
+        _move_or_copy(item.holding, target)
+    logger.info("已放回受保护文件", root=root, items=[item.relative for item in items])
@@ -0,0 +1,193 @@
+"""
+就绪探测模块
+以声明式的探针描述组件何时算作"已启动"，取代固定时长的sleep：
+- TcpPortProbe: TCP端口可连接
+- HttpProbe: HTTP请求返回期望状态码
+- LogLineProbe: 输出中出现匹配正则的行
+- ProcessAliveProbe: 进程持续存活指定毫秒数
+"""
+import re
+import socket
+import time
+import requests
+import structlog
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = structlog.get_logger(__name__)
+
+# 探测轮询间隔（秒）
+POLL_INTERVAL = 0.1
+
+
+class ProbeContext:
+    """探针运行时可访问的进程信息。"""
+
+    def __init__(self, process, title: str, get_output: Callable[[str], List[Tuple[float, str, str]]],
+                 tracks_process: bool = True, captures_output: bool = True, output_name: Optional[str] = None):
+        self.process = process
+        self.title = title
+        self.get_output = get_output
+        # 进程后端中区分组件输出的名称，默认为窗口标题
+        self.output_name = output_name or title
+        self.tracks_process = tracks_process
+        self.captures_output = captures_output
+        self.started_at = time.time()
+
+    def process_exited(self) -> bool:
+        """被跟踪的进程是否已退出。"""
+        return self.tracks_process and self.process is not None and self.process.poll() is not None
+
+
+class ReadinessProbe:
+    """就绪探针基类。"""
+    requires_output = False
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+
+    @property
+    def description(self) -> str:
+        return self.__class__.__name__
+
+    def check(self, context: ProbeContext) -> bool:
+        """执行一次非阻塞检查。"""
+        raise NotImplementedError
+
+
+class TcpPortProbe(ReadinessProbe):
+    """TCP端口可连接即视为就绪。"""
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0):
+        super().__init__(timeout)
+        self.host = host
+        self.port = int(port)
+
+    @property
+    def description(self) -> str:
+        return f"TCP {self.host}:{self.port}"
+
+    def check(self, context: Optional[ProbeContext] = None) -> bool:
+        try:
+            with socket.create_connection((self.host, self.port), timeout=0.5):
+                return True
+        except OSError:
+            return False
+
+
+class HttpProbe(ReadinessProbe):
+    """HTTP请求返回期望状态码即视为就绪。"""
+
+    def __init__(self, url: str, expected_status: int = 200, timeout: float = 30.0):
+        super().__init__(timeout)
+        self.url = url
+        self.expected_status = expected_status
+
+    @property
+    def description(self) -> str:
+        return f"HTTP {self.url}"
+
+    def check(self, context: Optional[ProbeContext] = None) -> bool:
+        try:
+            return requests.get(self.url, timeout=1).status_code == self.expected_status
+        except requests.RequestException:
+            return False
+
+
+class LogLineProbe(ReadinessProbe):
+    """进程输出中出现匹配正则的行即视为就绪。"""
+    requires_output = True
+
+    def __init__(self, pattern: str, timeout: float = 30.0):
+        super().__init__(timeout)
+        self.pattern = re.compile(pattern)
+        self._last_seen = 0.0
+
+    @property
+    def description(self) -> str:
+        return f"日志 /{self.pattern.pattern}/"
+
+    def check(self, context: ProbeContext) -> bool:
+        since = max(self._last_seen, context.started_at)
+        for timestamp, _, text in context.get_output(context.output_name):
+            if timestamp < since:
+                continue
+            self._last_seen = timestamp
+            if self.pattern.search(text):
+                return True
+        return False
+
+
+class ProcessAliveProbe(ReadinessProbe):
+    """进程持续存活指定毫秒数即视为就绪。"""
+
+    def __init__(self, duration_ms: int, timeout: Optional[float] = None):
+        super().__init__(timeout if timeout is not None else duration_ms / 1000 + 5)
+        self.duration_ms = duration_ms
+
+    @property
+    def description(self) -> str:
+        return f"存活 {self.duration_ms}ms"
+
+    def check(self, context: ProbeContext) -> bool:
+        return (time.time() - context.started_at) * 1000 >= self.duration_ms
+
+
+def probe_from_spec(spec: Dict[str, Any]) -> Optional[ReadinessProbe]:
+    """
+    根据配置字典创建探针
+
+    Args:
+        spec: 例如 {"type": "tcp", "port": 8000}、{"type": "http", "url": "..."}、
+              {"type": "log", "pattern": "..."}、{"type": "alive", "duration_ms": 2000}
+
+    Returns:
+        探针实例，无法识别时返回None
+    """
+    probe_type = str(spec.get("type", "")).lower()
+    timeout = float(spec.get("timeout", 30))
+    try:
+        if probe_type == "tcp":
+            return TcpPortProbe(spec.get("host", "127.0.0.1"), spec["port"], timeout)
+        if probe_type == "http":
+            return HttpProbe(spec["url"], int(spec.get("status", 200)), timeout)
+        if probe_type == "log":
+            return LogLineProbe(spec["pattern"], timeout)
+        if probe_type == "alive":
+            return ProcessAliveProbe(int(spec["duration_ms"]), spec.get("timeout"))
+    except (KeyError, ValueError, re.error) as e:
+        logger.warning("就绪探针配置无效", spec=spec, error=str(e))
+        return None
+    logger.warning("未知的就绪探针类型", spec=spec)
+    return None
+
+
+def wait_until_ready(probes: List[ReadinessProbe], context: ProbeContext) -> Tuple[bool, str, float]:
+    """
+    等待所有探针通过
+
+    任一探针超时或被跟踪的进程提前退出时立即失败。
+
+    Returns:
+        (是否就绪, 失败原因, 耗时秒数)
+    """
+    pending = []
+    for probe in probes:
+        if probe.requires_output and not context.captures_output:
+            logger.info("当前进程后端不捕获输出，跳过日志探针", title=context.title, probe=probe.description)
+            continue
+        pending.append(probe)
+
+    while pending:
+        elapsed = time.time() - context.started_at
+        if context.process_exited():
+            return False, f"进程已退出（返回码 {context.process.returncode}）", elapsed
+        for probe in list(pending):
+            if probe.check(context):
+                logger.info("就绪探针通过", title=context.title, probe=probe.description, elapsed=round(elapsed, 2))
+                pending.remove(probe)
+            elif elapsed >= probe.timeout:
+                return False, f"{probe.description} 在 {probe.timeout:g} 秒内未就绪", elapsed
+        if pending:
+            time.sleep(POLL_INTERVAL)
+
+    return True, "", time.time() - context.started_at
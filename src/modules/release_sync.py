@@ -0,0 +1,232 @@
+"""
+增量更新模块
+更新实例时不再删除整个目录再复制新版本，而是：
+- 为新版本和已安装的目录分别生成清单（相对路径、大小、SHA-256）
+- 比较两份清单，只写入新增和改动的文件、删除新版本中已不存在的文件
+- 每个文件先写入同目录的临时文件再改名，中途失败也不会留下写了一半的文件
+- 更新后的清单保存在实例目录中，下次更新时大小和修改时间未变的文件无需重新计算哈希
+受保护的文件（配置、数据、数据库）以及启动器自己管理的目录（虚拟环境、适配器）不参与比较，不会被改动。
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import structlog
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .protected_files import copy_path
+
+logger = structlog.get_logger(__name__)
+
+MANIFEST_FILE = ".maibot-manifest.json"
+MANIFEST_VERSION = 1
+# 启动器在实例目录中自行管理的目录，不属于发布内容
+LOCAL_DIRS = ("venv", "adapter")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class FileEntry(NamedTuple):
+    """清单中的一个文件。"""
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+Manifest = Dict[str, FileEntry]
+
+
+class SyncPlan(NamedTuple):
+    """新旧清单的差异（相对路径，以"/"分隔）。"""
+    added: List[str]
+    changed: List[str]
+    deleted: List[str]
+    unchanged: int
+
+    @property
+    def total_changes(self) -> int:
+        return len(self.added) + len(self.changed) + len(self.deleted)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_excluded(relative: str, protected: Sequence[str]) -> bool:
+    """顶层名称匹配受保护的通配符、属于启动器管理的目录或是清单本身时返回True。"""
+    top = relative.split("/", 1)[0]
+    return (top in LOCAL_DIRS or top == MANIFEST_FILE
+            or any(fnmatch.fnmatch(top, pattern) for pattern in protected))
+
+
+def scan_tree(root: str, protected: Sequence[str] = (), previous: Optional[Manifest] = None) -> Manifest:
+    """
+    生成目录清单
+
+    Args:
+        root: 目录
+        protected: 不参与比较的顶层通配符
+        previous: 上一次保存的清单，大小和修改时间一致的文件直接沿用其中的哈希
+
+    Returns:
+        相对路径 -> FileEntry（不含目录和符号链接）
+    """
+    previous = previous or {}
+    manifest: Manifest = {}
+    reused = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        relative_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        prefix = "" if relative_dir == "." else relative_dir + "/"
+        if not prefix:
+            dirnames[:] = [name for name in dirnames if not is_excluded(name, protected)]
+        for name in filenames:
+            relative = prefix + name
+            if not prefix and is_excluded(relative, protected):
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.islink(path):
+                continue
+            stat = os.stat(path)
+            old = previous.get(relative)
+            if old and old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+                manifest[relative] = old
+                reused += 1
+            else:
+                manifest[relative] = FileEntry(stat.st_size, stat.st_mtime_ns, _file_sha256(path))
+    logger.debug("目录清单生成完成", root=root, files=len(manifest), reused=reused)
+    return manifest
+
+
+def plan_sync(new: Manifest, installed: Manifest) -> SyncPlan:
+    """比较新版本与已安装的清单。"""
+    added = sorted(path for path in new if path not in installed)
+    changed = sorted(path for path, entry in new.items()
+                     if path in installed and (installed[path].size != entry.size
+                                               or installed[path].sha256 != entry.sha256))
+    deleted = sorted(path for path in installed if path not in new)
+    return SyncPlan(added, changed, deleted, len(new) - len(added) - len(changed))
+
+
+def load_manifest(target_dir: str) -> Optional[Manifest]:
+    """读取实例目录中保存的清单，不存在或无法读取时返回None。"""
+    try:
+        with open(os.path.join(target_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return {path: FileEntry(*entry) for path, entry in data["files"].items()}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("读取更新清单失败", target_dir=target_dir, error=str(e))
+        return None
+
+
+def save_manifest(target_dir: str, manifest: Manifest):
+    path = os.path.join(target_dir, MANIFEST_FILE)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "updated_at": time.time(),
+                   "files": {key: list(entry) for key, entry in sorted(manifest.items())}}, f)
+    os.replace(temp_path, path)
+
+
+def _atomic_copy(source: str, target: str) -> os.stat_result:
+    """复制到目标目录中的临时文件再改名替换，返回目标文件的stat。"""
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    if os.path.isdir(target) and not os.path.islink(target):
+        # 旧版本中同名的是目录
+        shutil.rmtree(target)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".sync-")
+    os.close(fd)
+    try:
+        shutil.copy2(source, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return os.stat(target)
+
+
+def _remove_empty_parents(target_dir: str, relative: str):
+    """删除文件后逐级清理变空的上级目录（不超出实例目录）。"""
+    parts = relative.split("/")[:-1]
+    while parts:
+        directory = os.path.join(target_dir, *parts)
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        parts.pop()
+
+
+def apply_sync(source_dir: str, target_dir: str, new: Manifest, plan: SyncPlan) -> Manifest:
+    """
+    按计划把新版本写入实例目录
+
+    Returns:
+        更新后的实例清单（修改时间为写入后的实际值）
+    """
+    # 先删除，新版本中文件变成同名目录时不会冲突
+    for relative in plan.deleted:
+        target = os.path.join(target_dir, *relative.split("/"))
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+        _remove_empty_parents(target_dir, relative)
+
+    result: Manifest = {}
+    for relative in sorted(set(plan.added) | set(plan.changed)):
+        source = os.path.join(source_dir, *relative.split("/"))
+        target = os.path.join(target_dir, *relative.split("/"))
+        stat = _atomic_copy(source, target)
+        result[relative] = FileEntry(stat.st_size, stat.st_mtime_ns, new[relative].sha256)
+    return result
+
+
+def sync_release(source_dir: str, target_dir: str, protected: Sequence[str] = ()) -> SyncPlan:
+    """
+    增量地把新版本（source_dir）同步到实例目录（target_dir）
+
+    没有保存的清单时（首次增量更新）无法区分旧版本的文件和用户自己添加的文件（如插件），只写入新增和改动的文件、
+    不删除任何文件；之后只删除上次清单中记录、新版本中已不存在的文件，用户自己添加的文件保持不动。
+
+    Returns:
+        本次执行的同步计划
+    """
+    started = time.perf_counter()
+    saved = load_manifest(target_dir)
+    new = scan_tree(source_dir, protected)
+    current = scan_tree(target_dir, protected, previous=saved)
+    if saved is not None:
+        installed = {path: entry for path, entry in current.items() if path in saved}
+    else:
+        installed = current
+    plan = plan_sync(new, installed)
+    if saved is None and plan.deleted:
+        logger.info("首次增量更新，保留新版本中不存在的文件", target_dir=target_dir, kept=len(plan.deleted))
+        plan = plan._replace(deleted=[])
+
+    written = apply_sync(source_dir, target_dir, new, plan)
+    # 新版本自带、实例中还没有的受保护内容（例如新增的默认配置）照常复制
+    for name in os.listdir(source_dir):
+        target = os.path.join(target_dir, name)
+        if is_excluded(name, protected) and name not in LOCAL_DIRS and not os.path.lexists(target):
+            copy_path(os.path.join(source_dir, name), target)
+    manifest = {path: written.get(path) or current[path] for path in new}
+    save_manifest(target_dir, manifest)
+    logger.info("增量更新完成", target_dir=target_dir, added=len(plan.added), changed=len(plan.changed),
+                deleted=len(plan.deleted), unchanged=plan.unchanged,
+                seconds=round(time.perf_counter() - started, 2))
+    return plan
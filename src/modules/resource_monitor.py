@@ -0,0 +1,258 @@
+"""
+资源采样模块
+以固定频率采样受管进程（含其所有子孙进程）的资源占用：
+CPU、常驻内存、线程数、打开的文件句柄数和磁盘读写字节数。
+Linux下直接读取/proc，其他系统在安装了psutil时使用psutil。
+"""
+import collections
+import os
+import threading
+import time
+import structlog
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = structlog.get_logger(__name__)
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 1.0
+# 每个进程保留的样本数
+DEFAULT_HISTORY = 300
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class ResourceSample(NamedTuple):
+    """一次采样结果（进程树合计）。"""
+    timestamp: float
+    cpu_percent: float
+    rss: int
+    threads: int
+    fds: int
+    read_bytes: int
+    write_bytes: int
+
+
+class _RawUsage(NamedTuple):
+    cpu_time: float
+    rss: int
+    threads: int
+    fds: int
+    read_bytes: int
+    write_bytes: int
+
+
+class _ProcReader:
+    """从/proc读取进程资源占用。"""
+
+    def __init__(self):
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+    @staticmethod
+    def is_supported() -> bool:
+        return os.path.isdir("/proc/self/task")
+
+    def descendants(self, pid: int) -> List[int]:
+        """返回进程本身及其所有子孙进程的PID。"""
+        result, stack = [], [pid]
+        while stack:
+            current = stack.pop()
+            result.append(current)
+            try:
+                for tid in os.listdir(f"/proc/{current}/task"):
+                    with open(f"/proc/{current}/task/{tid}/children") as f:
+                        stack.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+        return result
+
+    def read(self, pid: int) -> Optional[_RawUsage]:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # 进程名可能包含空格和括号，从最后一个')'之后开始解析
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            return None
+        # fields[0] 对应 stat 中的第3个字段（state）
+        cpu_time = (int(fields[11]) + int(fields[12])) / self._clock_ticks
+        threads = int(fields[17])
+        rss = int(fields[21]) * self._page_size
+
+        try:
+            fds = len(os.listdir(f"/proc/{pid}/fd"))
+        except OSError:
+            fds = 0
+
+        read_bytes = write_bytes = 0
+        try:
+            with open(f"/proc/{pid}/io") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key == "read_bytes":
+                        read_bytes = int(value)
+                    elif key == "write_bytes":
+                        write_bytes = int(value)
+        except OSError:
+            pass
+        return _RawUsage(cpu_time, rss, threads, fds, read_bytes, write_bytes)
+
+
+class _PsutilReader:
+    """通过psutil读取进程资源占用。"""
+
+    def descendants(self, pid: int) -> List[int]:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return [pid]
+
+    def read(self, pid: int) -> Optional[_RawUsage]:
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                cpu = process.cpu_times()
+                rss = process.memory_info().rss
+                threads = process.num_threads()
+                fds = process.num_handles() if os.name == "nt" else process.num_fds()
+                try:
+                    io = process.io_counters()
+                    read_bytes, write_bytes = io.read_bytes, io.write_bytes
+                except (psutil.Error, AttributeError):
+                    read_bytes = write_bytes = 0
+            return _RawUsage(cpu.user + cpu.system, rss, threads, fds, read_bytes, write_bytes)
+        except psutil.Error:
+            return None
+
+
+def _create_reader():
+    if _ProcReader.is_supported():
+        return _ProcReader()
+    if psutil is not None:
+        return _PsutilReader()
+    return None
+
+
+class _TrackedProcess:
+    def __init__(self, pid: int, history: int):
+        self.pid = pid
+        self.samples: Deque[ResourceSample] = collections.deque(maxlen=history)
+        # 上次采样时各进程的CPU时间，用于计算增量
+        self.cpu_times: Dict[int, float] = {}
+        self.last_sampled: Optional[float] = None
+
+
+class ResourceSampler:
+    """
+    资源采样器。
+    一个后台线程按 SAMPLE_INTERVAL 采样所有被跟踪的进程树，结果存入各自的环形缓冲区。
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, history: int = DEFAULT_HISTORY):
+        self.interval = interval
+        self.history = history
+        self._reader = _create_reader()
+        self._tracked: Dict[str, _TrackedProcess] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_available(self) -> bool:
+        """当前系统是否支持资源采样。"""
+        return self._reader is not None
+
+    def track(self, key: str, pid: int):
+        """开始采样一个进程树，同一key再次调用时切换到新PID（例如进程被重启）。"""
+        if not self.is_available:
+            return
+        with self._lock:
+            existing = self._tracked.get(key)
+            if existing:
+                existing.pid = pid
+                existing.cpu_times.clear()
+                existing.last_sampled = None
+            else:
+                self._tracked[key] = _TrackedProcess(pid, self.history)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+                self._thread.start()
+
+    def untrack(self, key: str):
+        """停止采样并丢弃历史。"""
+        with self._lock:
+            self._tracked.pop(key, None)
+
+    def get_samples(self, key: str, count: Optional[int] = None) -> List[ResourceSample]:
+        """获取最近的样本。"""
+        with self._lock:
+            tracked = self._tracked.get(key)
+            samples = list(tracked.samples) if tracked else []
+        return samples[-count:] if count else samples
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            with self._lock:
+                if not self._tracked:
+                    self._thread = None
+                    return
+                tracked = list(self._tracked.values())
+            for item in tracked:
+                try:
+                    self._sample(item)
+                except Exception as e:
+                    logger.debug("资源采样失败", pid=item.pid, error=str(e))
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _sample(self, item: _TrackedProcess):
+        now = time.monotonic()
+        totals = [0, 0, 0, 0, 0]
+        cpu_times: Dict[int, float] = {}
+        cpu_delta = 0.0
+        for pid in self._reader.descendants(item.pid):
+            usage = self._reader.read(pid)
+            if usage is None:
+                continue
+            cpu_times[pid] = usage.cpu_time
+            # 新出现的子进程按本周期内的增量计入，避免首次采样出现尖峰
+            cpu_delta += max(0.0, usage.cpu_time - item.cpu_times.get(pid, usage.cpu_time))
+            for i, value in enumerate(usage[1:]):
+                totals[i] += value
+        if not cpu_times:
+            return
+
+        cpu_percent = 0.0
+        if item.last_sampled is not None:
+            cpu_percent = cpu_delta / max(now - item.last_sampled, 1e-6) * 100
+        item.cpu_times = cpu_times
+        item.last_sampled = now
+        item.samples.append(ResourceSample(time.time(), cpu_percent, *totals))
+
+
+def sparkline(values: Iterable[float], width: int = 20) -> str:
+    """将数值序列渲染为字符火花图。"""
+    values = list(values)[-width:]
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    span = high - low
+    if span <= 0:
+        return SPARK_CHARS[0] * len(values)
+    return "".join(SPARK_CHARS[int((v - low) / span * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+def format_bytes(size: float) -> str:
+    """格式化字节数。"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+# 全局资源采样器实例
+resource_sampler = ResourceSampler()
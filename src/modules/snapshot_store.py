@@ -0,0 +1,311 @@
+"""
+实例快照模块
+更新前为实例目录创建快照，代替每次完整复制整个目录：
+- 与上一个快照相比大小和修改时间都未变的文件直接硬链接到上一个快照中的同一文件，只复制有变化的文件，
+  备份耗时和占用的磁盘空间只与变化量有关
+- 快照先写入临时目录，完成后再改名，中断的快照不会被当作可用的快照
+- 按保留策略（最近N个、每天/每周各保留一个）自动清理旧快照
+- 恢复时只复制与快照不一致的文件并删除快照中没有的文件
+- SQLite数据库通过在线备份API复制，其余文件流式复制，内存占用与文件大小无关
+快照中的文件只和其他快照共享（硬链接），不会与实例目录共享，实例中的文件被原地修改（例如数据库写入）不会影响快照。
+快照保存在实例目录旁的 "<实例目录>_snapshots" 中，与实例位于同一磁盘。
+"""
+import json
+import os
+import shutil
+import time
+import structlog
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from ..core.config import config_manager
+from .protected_files import stream_copy
+
+logger = structlog.get_logger(__name__)
+
+SNAPSHOT_META = "snapshot.json"
+FILES_DIR = "files"
+TIME_FORMAT = "%Y%m%d_%H%M%S"
+DEFAULT_RETENTION = {"keep_last": 3, "keep_daily": 7, "keep_weekly": 4}
+
+
+class SnapshotInfo(NamedTuple):
+    """一个已完成的快照。"""
+    id: str
+    path: str
+    created_at: float
+    files: int
+    linked: int        # 与上一个快照共享（硬链接）的文件数
+    copied: int        # 新复制的文件数
+    copied_bytes: int  # 新复制的字节数
+    total_bytes: int   # 快照中所有文件的总大小
+
+
+class RestoreStats(NamedTuple):
+    """一次恢复的统计。"""
+    restored: int
+    removed: int
+    unchanged: int
+    seconds: float
+
+
+def _same_file(stat: os.stat_result, entry: Dict[str, Any]) -> bool:
+    return (entry.get("link") is None and stat.st_size == entry["size"]
+            and stat.st_mtime_ns == entry["mtime_ns"])
+
+
+class SnapshotStore:
+    """基于硬链接的增量快照。"""
+
+    @staticmethod
+    def store_dir(instance_path: str) -> str:
+        return os.path.abspath(instance_path).rstrip(os.sep) + "_snapshots"
+
+    @property
+    def retention(self) -> Dict[str, int]:
+        return {**DEFAULT_RETENTION, **(config_manager.get("snapshots", {}) or {})}
+
+    # --- 查询 ---
+
+    def _load_meta(self, snapshot_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(snapshot_path, SNAPSHOT_META), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("读取快照信息失败", path=snapshot_path, error=str(e))
+            return None
+
+    def list(self, instance_path: str) -> List[SnapshotInfo]:
+        """列出实例的所有快照，最新的在前。"""
+        store = self.store_dir(instance_path)
+        if not os.path.isdir(store):
+            return []
+        snapshots = []
+        for name in os.listdir(store):
+            if name.endswith(".tmp"):
+                continue
+            meta = self._load_meta(os.path.join(store, name))
+            if meta is None:
+                continue
+            stats = meta.get("stats", {})
+            snapshots.append(SnapshotInfo(
+                name, os.path.join(store, name), meta.get("created_at", 0.0), len(meta.get("files", {})),
+                stats.get("linked", 0), stats.get("copied", 0), stats.get("copied_bytes", 0),
+                stats.get("total_bytes", 0),
+            ))
+        return sorted(snapshots, key=lambda item: item.created_at, reverse=True)
+
+    def disk_usage(self, instance_path: str) -> int:
+        """快照实际占用的磁盘空间（硬链接的文件只计算一次）。"""
+        seen: Set[tuple] = set()
+        total = 0
+        for dirpath, _, filenames in os.walk(self.store_dir(instance_path)):
+            for name in filenames:
+                stat = os.lstat(os.path.join(dirpath, name))
+                key = (stat.st_dev, stat.st_ino)
+                if key not in seen:
+                    seen.add(key)
+                    total += stat.st_size
+        return total
+
+    # --- 创建 ---
+
+    def create(self, instance_path: str) -> SnapshotInfo:
+        """
+        为实例目录创建快照
+
+        Raises:
+            OSError: 读取实例或写入快照失败（未完成的快照会被删除）
+        """
+        started = time.perf_counter()
+        store = self.store_dir(instance_path)
+        os.makedirs(store, exist_ok=True)
+        snapshot_id = datetime.now().strftime(TIME_FORMAT)
+        while os.path.exists(os.path.join(store, snapshot_id)):
+            time.sleep(1)
+            snapshot_id = datetime.now().strftime(TIME_FORMAT)
+
+        previous = self.list(instance_path)
+        previous_meta = self._load_meta(previous[0].path) if previous else None
+        previous_files = (previous_meta or {}).get("files", {})
+        previous_root = os.path.join(previous[0].path, FILES_DIR) if previous else None
+
+        temp_path = os.path.join(store, snapshot_id + ".tmp")
+        files_root = os.path.join(temp_path, FILES_DIR)
+        files: Dict[str, Dict[str, Any]] = {}
+        dirs: List[str] = []
+        stats = {"linked": 0, "copied": 0, "copied_bytes": 0, "total_bytes": 0}
+        try:
+            os.makedirs(files_root)
+            for dirpath, dirnames, filenames in os.walk(instance_path):
+                relative_dir = os.path.relpath(dirpath, instance_path)
+                target_dir = files_root if relative_dir == "." else os.path.join(files_root, relative_dir)
+                if relative_dir != ".":
+                    os.makedirs(target_dir, exist_ok=True)
+                    dirs.append(relative_dir.replace(os.sep, "/"))
+                # 指向目录的符号链接按链接本身保存，不进入
+                linked_dirs = [name for name in dirnames if os.path.islink(os.path.join(dirpath, name))]
+                dirnames[:] = [name for name in dirnames if name not in linked_dirs]
+                for name in filenames + linked_dirs:
+                    source = os.path.join(dirpath, name)
+                    relative = os.path.join(relative_dir, name) if relative_dir != "." else name
+                    key = relative.replace(os.sep, "/")
+                    files[key] = self._snapshot_file(source, os.path.join(target_dir, name), key,
+                                                     previous_files, previous_root, stats)
+            with open(os.path.join(temp_path, SNAPSHOT_META), "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time(), "source": os.path.abspath(instance_path),
+                           "stats": stats, "dirs": dirs, "files": files}, f, ensure_ascii=False)
+            os.rename(temp_path, os.path.join(store, snapshot_id))
+        except BaseException:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+
+        logger.info("快照创建完成", instance=instance_path, snapshot=snapshot_id, files=len(files),
+                    seconds=round(time.perf_counter() - started, 2), **stats)
+        return self.list(instance_path)[0]
+
+    @staticmethod
+    def _snapshot_file(source: str, target: str, key: str, previous_files: Dict[str, Dict[str, Any]],
+                       previous_root: Optional[str], stats: Dict[str, int]) -> Dict[str, Any]:
+        """保存一个文件：未变化的硬链接到上一个快照，否则复制。返回清单记录。"""
+        stat = os.lstat(source)
+        if os.path.islink(source):
+            link = os.readlink(source)
+            os.symlink(link, target)
+            return {"size": 0, "mtime_ns": stat.st_mtime_ns, "link": link}
+
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "link": None}
+        stats["total_bytes"] += stat.st_size
+        old = previous_files.get(key)
+        if old is not None and previous_root and _same_file(stat, old):
+            try:
+                os.link(os.path.join(previous_root, *key.split("/")), target)
+                stats["linked"] += 1
+                return entry
+            except OSError as e:
+                # 上一个快照中的文件丢失、跨磁盘或硬链接数达到上限时改为复制
+                logger.debug("无法创建硬链接，改为复制", path=key, error=str(e))
+        stream_copy(source, target)
+        stats["copied"] += 1
+        stats["copied_bytes"] += stat.st_size
+        return entry
+
+    # --- 恢复 ---
+
+    def restore(self, instance_path: str, snapshot_id: str) -> RestoreStats:
+        """
+        将实例目录恢复到快照时的状态：只复制与快照不一致的文件，删除快照中没有的文件
+
+        Raises:
+            FileNotFoundError: 快照不存在
+        """
+        started = time.perf_counter()
+        snapshot_path = os.path.join(self.store_dir(instance_path), snapshot_id)
+        meta = self._load_meta(snapshot_path)
+        if meta is None:
+            raise FileNotFoundError(f"快照不存在或已损坏：{snapshot_path}")
+        files: Dict[str, Dict[str, Any]] = meta["files"]
+        files_root = os.path.join(snapshot_path, FILES_DIR)
+
+        # 删除快照中没有的文件和目录
+        removed = 0
+        keep_dirs = set(meta.get("dirs", []))
+        if os.path.isdir(instance_path):
+            for dirpath, dirnames, filenames in os.walk(instance_path, topdown=False):
+                relative_dir = os.path.relpath(dirpath, instance_path)
+                prefix = "" if relative_dir == "." else relative_dir.replace(os.sep, "/") + "/"
+                for name in filenames + [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]:
+                    if prefix + name not in files:
+                        os.remove(os.path.join(dirpath, name))
+                        removed += 1
+                if prefix and prefix[:-1] not in keep_dirs and not os.listdir(dirpath):
+                    os.rmdir(dirpath)
+
+        for directory in sorted(keep_dirs):
+            path = os.path.join(instance_path, *directory.split("/"))
+            if os.path.lexists(path) and not os.path.isdir(path):
+                os.remove(path)
+            os.makedirs(path, exist_ok=True)
+        os.makedirs(instance_path, exist_ok=True)
+
+        restored = unchanged = 0
+        for key, entry in files.items():
+            target = os.path.join(instance_path, *key.split("/"))
+            source = os.path.join(files_root, *key.split("/"))
+            try:
+                stat = os.lstat(target)
+            except FileNotFoundError:
+                stat = None
+            if entry.get("link") is not None:
+                if stat is not None and os.path.islink(target) and os.readlink(target) == entry["link"]:
+                    unchanged += 1
+                    continue
+                if stat is not None and os.path.isdir(target) and not os.path.islink(target):
+                    shutil.rmtree(target)
+                elif stat is not None:
+                    os.remove(target)
+                os.symlink(entry["link"], target)
+                restored += 1
+                continue
+            if stat is not None and not os.path.islink(target) and _same_file(stat, entry):
+                unchanged += 1
+                continue
+            if stat is not None and os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            # 复制到同目录的临时文件再改名替换（不与快照共享inode）
+            stream_copy(source, target)
+            restored += 1
+
+        result = RestoreStats(restored, removed, unchanged, time.perf_counter() - started)
+        logger.info("快照恢复完成", instance=instance_path, snapshot=snapshot_id, restored=restored,
+                    removed=removed, unchanged=unchanged, seconds=round(result.seconds, 2))
+        return result
+
+    # --- 清理 ---
+
+    def _retained(self, snapshots: List[SnapshotInfo]) -> Set[str]:
+        """按保留策略计算需要保留的快照（snapshots 按时间从新到旧排列）。"""
+        retention = self.retention
+        keep = {item.id for item in snapshots[:max(1, int(retention["keep_last"]))]}
+        for count, period in ((int(retention["keep_daily"]), "%Y-%m-%d"), (int(retention["keep_weekly"]), "%G-W%V")):
+            periods: Set[str] = set()
+            for item in snapshots:
+                label = datetime.fromtimestamp(item.created_at).strftime(period)
+                if label in periods:
+                    continue
+                if len(periods) >= count:
+                    break
+                periods.add(label)
+                keep.add(item.id)
+        return keep
+
+    def prune(self, instance_path: str) -> List[str]:
+        """
+        按保留策略删除旧快照以及中断留下的临时目录
+
+        Returns:
+            被删除的快照ID
+        """
+        store = self.store_dir(instance_path)
+        if not os.path.isdir(store):
+            return []
+        for name in os.listdir(store):
+            if name.endswith(".tmp"):
+                shutil.rmtree(os.path.join(store, name), ignore_errors=True)
+        snapshots = self.list(instance_path)
+        keep = self._retained(snapshots)
+        removed = []
+        for item in snapshots:
+            if item.id not in keep:
+                shutil.rmtree(item.path, ignore_errors=True)
+                removed.append(item.id)
+        if removed:
+            logger.info("已清理旧快照", instance=instance_path, removed=removed)
+        return removed
+
+    def delete(self, instance_path: str, snapshot_id: str):
+        shutil.rmtree(os.path.join(self.store_dir(instance_path), snapshot_id), ignore_errors=True)
+
+
+# 全局快照实例
+snapshot_store = SnapshotStore()
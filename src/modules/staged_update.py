@@ -0,0 +1,211 @@
+"""
+分阶段更新模块
+更新实例时不直接改动正在使用的目录：
+- 在实例旁的 "<实例目录>.staging" 中用硬链接克隆当前版本（不复制内容），再把新版本增量写入其中
+- 检查新版本（入口文件存在、所有Python文件语法正确）
+- 把受保护的数据（配置、数据目录、数据库）改名移入新版本目录，再通过目录改名切换：
+  当前版本变为 "<实例目录>.previous"，新版本成为实例目录
+- 上一个版本原样保留，回滚只需把受保护的数据移回并再次改名，不复制任何文件
+新版本写入时每个文件都是新建后改名替换的，不会修改与当前版本共享的硬链接文件。
+"""
+import fnmatch
+import os
+import shutil
+import subprocess
+import sys
+import time
+import structlog
+from typing import List, Optional, Sequence, Tuple
+
+from .protected_files import PROTECTED_PATTERNS, find_protected, preserve
+from .release_sync import LOCAL_DIRS
+
+logger = structlog.get_logger(__name__)
+
+STAGING_SUFFIX = ".staging"
+PREVIOUS_SUFFIX = ".previous"
+# 交换目录时的中转名称
+SWAP_SUFFIX = ".swap"
+# 新版本必须包含的入口文件
+ENTRY_FILE = "bot.py"
+SMOKE_CHECK_TIMEOUT = 120
+
+# 在目标解释器中检查语法（不写入 .pyc），输出第一个出错的文件
+_SYNTAX_CHECK_SCRIPT = (
+    "import ast, sys\n"
+    "for path in sys.stdin.read().splitlines():\n"
+    "    try:\n"
+    "        with open(path, 'rb') as f:\n"
+    "            ast.parse(f.read(), path)\n"
+    "    except (SyntaxError, ValueError) as e:\n"
+    "        print(f'{path}: {e}')\n"
+    "        sys.exit(1)\n"
+)
+
+
+def clone_tree(source: str, target: str, exclude: Sequence[str] = ()) -> Tuple[int, int]:
+    """
+    用硬链接克隆目录（无法硬链接时复制），跳过顶层名称匹配 exclude 的项
+
+    Returns:
+        (硬链接的文件数, 复制的文件数)
+    """
+    linked = copied = 0
+    for dirpath, dirnames, filenames in os.walk(source):
+        relative_dir = os.path.relpath(dirpath, source)
+        target_dir = target if relative_dir == "." else os.path.join(target, relative_dir)
+        os.makedirs(target_dir, exist_ok=True)
+        if relative_dir == ".":
+            dirnames[:] = [name for name in dirnames if not any(fnmatch.fnmatch(name, p) for p in exclude)]
+            filenames = [name for name in filenames if not any(fnmatch.fnmatch(name, p) for p in exclude)]
+        links = [name for name in dirnames if os.path.islink(os.path.join(dirpath, name))]
+        dirnames[:] = [name for name in dirnames if name not in links]
+        for name in filenames + links:
+            source_path = os.path.join(dirpath, name)
+            target_path = os.path.join(target_dir, name)
+            if os.path.islink(source_path):
+                os.symlink(os.readlink(source_path), target_path)
+                continue
+            try:
+                os.link(source_path, target_path)
+                linked += 1
+            except OSError:
+                shutil.copy2(source_path, target_path)
+                copied += 1
+    return linked, copied
+
+
+def smoke_check(release_dir: str, python_exe: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    检查新版本能否启动：入口文件存在，且发布内容中所有Python文件都能被目标解释器解析
+
+    Args:
+        release_dir: 新版本目录
+        python_exe: 实例使用的解释器，为空时使用当前解释器
+
+    Returns:
+        (是否通过, 说明)
+    """
+    if not os.path.isfile(os.path.join(release_dir, ENTRY_FILE)):
+        return False, f"缺少入口文件 {ENTRY_FILE}"
+
+    sources: List[str] = []
+    for dirpath, dirnames, filenames in os.walk(release_dir):
+        if dirpath == release_dir:
+            dirnames[:] = [name for name in dirnames
+                           if name not in LOCAL_DIRS and not any(fnmatch.fnmatch(name, p) for p in PROTECTED_PATTERNS)]
+        sources.extend(os.path.join(dirpath, name) for name in filenames if name.endswith(".py"))
+
+    python_exe = python_exe if python_exe and os.path.exists(python_exe) else sys.executable
+    try:
+        result = subprocess.run([python_exe, "-c", _SYNTAX_CHECK_SCRIPT], input="\n".join(sources),
+                                capture_output=True, text=True, timeout=SMOKE_CHECK_TIMEOUT)
+    except (OSError, subprocess.SubprocessError) as e:
+        return False, f"无法运行解释器：{e}"
+    if result.returncode != 0:
+        return False, (result.stdout or result.stderr).strip() or f"解释器返回码 {result.returncode}"
+    return True, f"{len(sources)} 个Python文件检查通过"
+
+
+def _make_way(source_root: str, target_root: str, protected: Sequence[str]):
+    """删除 target_root 中与 source_root 的受保护项同名的项（例如新版本自带的默认数据），以便移入。"""
+    for name in find_protected(source_root, protected):
+        stale = os.path.join(target_root, name)
+        if os.path.isdir(stale) and not os.path.islink(stale):
+            shutil.rmtree(stale)
+        elif os.path.lexists(stale):
+            os.remove(stale)
+
+
+class StagedUpdate:
+    """一次分阶段更新：stage() -> 写入新版本 -> activate()，失败时 discard() 或 rollback()。"""
+
+    def __init__(self, instance_path: str, protected: Sequence[str] = PROTECTED_PATTERNS):
+        self.instance_path = os.path.abspath(instance_path).rstrip(os.sep)
+        self.staging_path = self.instance_path + STAGING_SUFFIX
+        self.previous_path = self.instance_path + PREVIOUS_SUFFIX
+        self.protected = list(protected)
+        self.activated = False
+
+    def stage(self) -> str:
+        """用硬链接克隆当前版本（不含受保护的数据）到暂存目录，返回暂存目录。"""
+        started = time.perf_counter()
+        if os.path.exists(self.staging_path):
+            # 上次中断留下的暂存目录
+            shutil.rmtree(self.staging_path)
+        linked, copied = clone_tree(self.instance_path, self.staging_path, self.protected)
+        logger.info("已创建暂存目录", staging=self.staging_path, linked=linked, copied=copied,
+                    seconds=round(time.perf_counter() - started, 2))
+        return self.staging_path
+
+    def discard(self):
+        """放弃暂存的新版本（尚未切换时使用）。"""
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+
+    def activate(self):
+        """
+        移入受保护的数据并切换到新版本，之前的版本保留为 .previous
+
+        Raises:
+            OSError: 切换失败（此时已恢复原状）
+        """
+        if os.path.exists(self.previous_path):
+            shutil.rmtree(self.previous_path)
+        _make_way(self.instance_path, self.staging_path, self.protected)
+        items = preserve(self.instance_path, self.protected, self.staging_path)
+        try:
+            os.rename(self.instance_path, self.previous_path)
+        except OSError:
+            # 目录被占用（例如实例仍在运行）时放回受保护的数据
+            preserve(self.staging_path, [item.relative for item in items], self.instance_path)
+            raise
+        try:
+            os.rename(self.staging_path, self.instance_path)
+        except OSError:
+            os.rename(self.previous_path, self.instance_path)
+            preserve(self.staging_path, [item.relative for item in items], self.instance_path)
+            raise
+        self.activated = True
+        logger.info("已切换到新版本", instance=self.instance_path, previous=self.previous_path)
+
+    def rollback(self):
+        """切换后发现问题时回到上一个版本，出问题的新版本被删除。"""
+        swap_previous(self.instance_path, self.protected)
+        shutil.rmtree(self.previous_path, ignore_errors=True)
+        self.activated = False
+
+
+def has_previous(instance_path: str) -> bool:
+    return os.path.isdir(os.path.abspath(instance_path).rstrip(os.sep) + PREVIOUS_SUFFIX)
+
+
+def swap_previous(instance_path: str, protected: Sequence[str] = PROTECTED_PATTERNS):
+    """
+    交换当前版本与上一个版本（受保护的数据随之移动），再次调用即可换回
+
+    Raises:
+        FileNotFoundError: 没有上一个版本
+        OSError: 改名失败（此时已恢复原状）
+    """
+    instance_path = os.path.abspath(instance_path).rstrip(os.sep)
+    previous_path = instance_path + PREVIOUS_SUFFIX
+    swap_path = instance_path + SWAP_SUFFIX
+    if not os.path.isdir(previous_path):
+        raise FileNotFoundError(f"没有可回滚的版本：{previous_path}")
+
+    _make_way(instance_path, previous_path, protected)
+    items = preserve(instance_path, protected, previous_path)
+    names = [item.relative for item in items]
+    try:
+        os.rename(instance_path, swap_path)
+    except OSError:
+        preserve(previous_path, names, instance_path)
+        raise
+    try:
+        os.rename(previous_path, instance_path)
+    except OSError:
+        os.rename(swap_path, instance_path)
+        preserve(previous_path, names, instance_path)
+        raise
+    os.rename(swap_path, previous_path)
+    logger.info("已交换当前版本与上一个版本", instance=instance_path)
@@ -0,0 +1,269 @@
+"""
+进程监管模块
+负责监视由启动器启动的组件进程，在其崩溃后自动重启：
+- 通过pidfd（Linux）或阻塞等待线程感知进程退出，无需轮询
+- 重启间隔按带抖动的指数退避增长
+- 每个组件在时间窗口内有重启预算，反复崩溃的组件标记为降级而不再重启
+"""
+import os
+import random
+import selectors
+import threading
+import time
+import structlog
+from typing import Any, Callable, Dict, List, Optional
+
+logger = structlog.get_logger(__name__)
+
+# 监管状态
+STATE_RUNNING = "running"
+STATE_RESTARTING = "restarting"
+STATE_DEGRADED = "degraded"
+STATE_EXITED = "exited"
+
+
+class RestartPolicy:
+    """重启策略。"""
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0, max_restarts: int = 5,
+                 budget_window: float = 600.0, min_uptime: float = 10.0, crash_loop_limit: int = 3):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # budget_window 秒内最多重启 max_restarts 次
+        self.max_restarts = max_restarts
+        self.budget_window = budget_window
+        # 运行不足 min_uptime 秒即退出视为启动即崩溃，连续 crash_loop_limit 次视为崩溃循环
+        self.min_uptime = min_uptime
+        self.crash_loop_limit = crash_loop_limit
+
+    @classmethod
+    def from_config(cls, spec: Optional[Dict[str, Any]]) -> "RestartPolicy":
+        """从配置字典创建策略，未配置的项使用默认值。"""
+        policy = cls()
+        for name, value in (spec or {}).items():
+            if hasattr(policy, name):
+                setattr(policy, name, type(getattr(policy, name))(value))
+            else:
+                logger.warning("未知的重启策略配置项", name=name)
+        return policy
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次（从0开始）连续重启前的等待秒数。"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+
+class _ExitWatcher:
+    """
+    进程退出监视器。
+    支持pidfd时所有进程共用一个selector线程，否则每个进程一个阻塞等待线程。
+    """
+
+    def __init__(self, callback: Callable[[Any], None]):
+        self._callback = callback
+        self._use_pidfd = hasattr(os, "pidfd_open")
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        if self._use_pidfd:
+            self._selector = selectors.DefaultSelector()
+            self._wakeup_r, self._wakeup_w = os.pipe()
+            os.set_blocking(self._wakeup_r, False)
+            self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+
+    def add(self, process):
+        """开始监视一个进程。"""
+        if self._use_pidfd:
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except ProcessLookupError:
+                # 进程已被回收
+                self._notify(process)
+                return
+            except OSError:
+                # 内核不支持pidfd，改用等待线程
+                self._use_pidfd = False
+            else:
+                with self._lock:
+                    self._selector.register(pidfd, selectors.EVENT_READ, process)
+                    if self._thread is None or not self._thread.is_alive():
+                        self._thread = threading.Thread(target=self._run, name="exit-watcher", daemon=True)
+                        self._thread.start()
+                os.write(self._wakeup_w, b"\0")
+                return
+        threading.Thread(target=self._wait, args=(process,), name=f"exit-wait-{process.pid}", daemon=True).start()
+
+    def _wait(self, process):
+        process.wait()
+        self._notify(process)
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    try:
+                        os.read(self._wakeup_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                with self._lock:
+                    self._selector.unregister(key.fd)
+                os.close(key.fd)
+                key.data.wait()  # 回收已退出的进程
+                self._notify(key.data)
+
+    def _notify(self, process):
+        try:
+            self._callback(process)
+        except Exception as e:
+            logger.error("处理进程退出失败", pid=process.pid, error=str(e))
+
+
+class _SupervisedProcess:
+    """单个被监管的组件。"""
+
+    def __init__(self, key: str, process, respawn: Callable[[], Any],
+                 stop: Optional[Callable[[Any], None]] = None):
+        self.key = key
+        self.process = process
+        self.respawn = respawn
+        self.stop = stop
+        self.state = STATE_RUNNING
+        self.started_at = time.time()
+        self.restart_times: List[float] = []
+        self.consecutive_crashes = 0
+        self.last_exit_code: Optional[int] = None
+        self.timer: Optional[threading.Timer] = None
+
+
+class Supervisor:
+    """
+    进程监管器。
+    组件异常退出后按策略重启，超出预算或陷入崩溃循环时标记为降级。
+    """
+
+    def __init__(self, policy: Optional[RestartPolicy] = None):
+        self.policy = policy or RestartPolicy()
+        self._entries: Dict[str, _SupervisedProcess] = {}
+        self._lock = threading.Lock()
+        self._watcher = _ExitWatcher(self._on_exit)
+
+    def watch(self, key: str, process, respawn: Callable[[], Any],
+              stop: Optional[Callable[[Any], None]] = None):
+        """
+        开始监管一个进程
+
+        Args:
+            key: 进程键（同一实例的同一组件唯一）
+            process: Popen对象
+            respawn: 重新启动组件的函数，返回新的Popen对象，失败时返回None
+            stop: 停止重启出的进程（连同其进程组）的函数，为空时只结束该进程本身
+        """
+        with self._lock:
+            self._entries[key] = _SupervisedProcess(key, process, respawn, stop)
+        self._watcher.add(process)
+
+    def forget(self, key: str):
+        """停止监管一个组件（主动停止前调用）。"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry and entry.timer:
+            entry.timer.cancel()
+
+    def stop(self):
+        """停止监管所有组件。"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            if entry.timer:
+                entry.timer.cancel()
+
+    def get_status(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取组件的监管状态。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            return {
+                "state": entry.state,
+                "restarts": len(entry.restart_times),
+                "last_exit_code": entry.last_exit_code,
+            }
+
+    def _on_exit(self, process):
+        with self._lock:
+            entry = next((e for e in self._entries.values() if e.process is process), None)
+            if not entry:
+                return
+            # 重新接管的进程不是子进程，无法得知退出码，不能当作崩溃处理
+            known = getattr(process, "exit_status_known", True)
+            entry.last_exit_code = process.returncode if known else None
+            uptime = time.time() - entry.started_at
+
+            if not known:
+                entry.state = STATE_EXITED
+                logger.info("组件已退出（退出状态未知），不再重启", title=entry.key)
+                return
+            if process.returncode == 0:
+                entry.state = STATE_EXITED
+                logger.info("组件正常退出，不再重启", title=entry.key)
+                return
+            self._schedule_restart(entry, uptime)
+
+    def _schedule_restart(self, entry: _SupervisedProcess, uptime: float):
+        """根据策略安排重启或标记降级，调用方需持有锁。"""
+        policy = self.policy
+        now = time.time()
+        entry.consecutive_crashes = entry.consecutive_crashes + 1 if uptime < policy.min_uptime else 1
+        entry.restart_times = [t for t in entry.restart_times if now - t < policy.budget_window]
+
+        if entry.consecutive_crashes >= policy.crash_loop_limit:
+            entry.state = STATE_DEGRADED
+            logger.error("组件陷入崩溃循环，已标记为降级", title=entry.key,
+                         crashes=entry.consecutive_crashes, exit_code=entry.last_exit_code)
+            return
+        if len(entry.restart_times) >= policy.max_restarts:
+            entry.state = STATE_DEGRADED
+            logger.error("组件重启次数超出预算，已标记为降级", title=entry.key,
+                         restarts=len(entry.restart_times), window=policy.budget_window)
+            return
+
+        delay = policy.backoff(entry.consecutive_crashes - 1)
+        entry.state = STATE_RESTARTING
+        entry.restart_times.append(now)
+        logger.warning("组件异常退出，准备重启", title=entry.key, exit_code=entry.last_exit_code,
+                       uptime=round(uptime, 1), delay=round(delay, 1))
+        entry.timer = threading.Timer(delay, self._restart, args=(entry,))
+        entry.timer.daemon = True
+        entry.timer.start()
+
+    def _restart(self, entry: _SupervisedProcess):
+        with self._lock:
+            if self._entries.get(entry.key) is not entry:
+                return
+        try:
+            process = entry.respawn()
+        except Exception as e:
+            logger.error("重启组件失败", title=entry.key, error=str(e))
+            process = None
+
+        with self._lock:
+            stopped = self._entries.get(entry.key) is not entry
+            if not stopped:
+                if process is None:
+                    self._schedule_restart(entry, 0.0)
+                    return
+                entry.process = process
+                entry.started_at = time.time()
+                entry.state = STATE_RUNNING
+        if stopped:
+            # 重启期间组件被主动停止：结束新进程及其进程组（可能需要等待，在锁外进行）
+            if process is not None:
+                if entry.stop is not None:
+                    entry.stop(process)
+                elif process.poll() is None:
+                    process.terminate()
+            return
+        logger.info("组件已重启", title=entry.key, pid=process.pid)
+        self._watcher.add(process)
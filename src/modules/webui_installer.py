@@ -9,18 +9,17 @@ import tempfile
 import shutil
 import platform
 import requests
-import zipfile
 import time
-import warnings
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import structlog
-from tqdm import tqdm
+from ..core.task_engine import create_progress_bar
 from ..ui.interface import ui
 from ..utils.common import validate_path
-
-# 忽略SSL警告（用于GitHub API访问）
-warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+from .archive_stream import extract_zip
+from .artifact_cache import artifact_cache
+from .github_metadata import github_metadata
+from .http_client import http_client
 
 logger = structlog.get_logger(__name__)
 
@@ -121,12 +120,8 @@ class WebUIInstaller:
             with tempfile.TemporaryDirectory() as temp_dir:
                 installer_path = os.path.join(temp_dir, "nodejs_installer.msi")
                 
-                response = requests.get(nodejs_url, stream=True, timeout=60, verify=False)
-                response.raise_for_status()
-                
-                with open(installer_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                if not artifact_cache.fetch(nodejs_url, installer_path, self._download_file):
+                    return False
                 
                 ui.print_info("正在安装Node.js...")
                 ui.print_warning("请在弹出的安装程序中完成Node.js安装")
@@ -213,16 +208,13 @@ class WebUIInstaller:
             ui.print_error(f"Node.js验证失败：{str(e)}")
             return False
     
-    def get_webui_branches(self) -> List[Dict]:
-        """获取WebUI分支列表"""
+    def get_webui_branches(self, force_refresh: bool = False) -> List[Dict]:
+        """获取WebUI分支列表（经过本地元数据缓存）"""
         try:
-            ui.print_info("正在获取WebUI分支列表...")
-            
             url = f"https://api.github.com/repos/{self.webui_repo}/branches"
-            response = requests.get(url, timeout=30, verify=False)  # 跳过SSL验证
-            response.raise_for_status()
-            
-            branches_data = response.json()
+            if force_refresh or not github_metadata.has_cached(url):
+                ui.print_info("正在获取WebUI分支列表...")
+            branches_data = github_metadata.get_json(url, force_refresh=force_refresh)
             branches = []
             
             for branch in branches_data:
@@ -296,6 +288,31 @@ class WebUIInstaller:
             logger.error("显示WebUI分支菜单失败", error=str(e))
             return None
     
+    def _download_file(self, url: str, path: str) -> bool:
+        """下载文件并显示进度条"""
+        try:
+            response = http_client.get(url, stream=True)
+            response.raise_for_status()
+            
+            total_size = int(response.headers.get('content-length', 0))
+            
+            with open(path, 'wb') as f, create_progress_bar(
+                desc=os.path.basename(path),
+                total=total_size,
+                unit='iB',
+                unit_scale=True,
+                unit_divisor=1024,
+            ) as progress_bar:
+                for chunk in response.iter_content(chunk_size=8192):
+                    if chunk:
+                        f.write(chunk)
+                        progress_bar.update(len(chunk))
+            return True
+        except requests.RequestException as e:
+            ui.print_error(f"下载失败：{str(e)}")
+            logger.error("文件下载失败", url=url, error=str(e))
+            return False
+    
     def download_webui(self, branch_info: Dict, install_dir: str) -> Optional[str]:
         """下载WebUI"""
         try:
@@ -306,29 +323,15 @@ class WebUIInstaller:
                 download_url = branch_info["download_url"]
                 archive_path = os.path.join(temp_dir, f"webui_{branch_info['name']}.zip")
                 
-                response = requests.get(download_url, stream=True, timeout=60, verify=False)
-                response.raise_for_status()
-                
-                total_size = int(response.headers.get('content-length', 0))
-                
-                with open(archive_path, 'wb') as f, tqdm(
-                    desc=f"webui_{branch_info['name']}.zip",
-                    total=total_size,
-                    unit='iB',
-                    unit_scale=True,
-                    unit_divisor=1024,
-                ) as progress_bar:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            progress_bar.update(len(chunk))
+                if not artifact_cache.fetch(download_url, archive_path, self._download_file):
+                    ui.print_error("WebUI下载失败")
+                    return None
                 
                 # 解压WebUI
                 ui.print_info("正在解压WebUI...")
                 extract_dir = os.path.join(temp_dir, "webui_extract")
                 
-                with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_dir)
+                extract_zip(archive_path, extract_dir)
                 
                 # 查找解压后的目录
                 extracted_dirs = [d for d in os.listdir(extract_dir) 
@@ -516,8 +519,9 @@ class WebUIInstaller:
             logger.error("WebUI安装失败", error=str(e))
             return False, ""
     
-    def install_webui_directly(self, install_dir: str, venv_path: str = "") -> Tuple[bool, str]:
-        """直接安装WebUI，不询问用户"""
+    def install_webui_directly(self, install_dir: str, venv_path: str = "",
+                               branch_info: Optional[Dict] = None) -> Tuple[bool, str]:
+        """直接安装WebUI，不询问用户（未指定分支时显示分支选择菜单）"""
         try:
             ui.console.print("\n[🌐 WebUI安装]", style=ui.colors["primary"])
             
@@ -542,7 +546,7 @@ class WebUIInstaller:
                 ui.print_success(f"npm环境检测通过: {npm_version}")
             
             # 选择WebUI分支
-            branch_info = self.show_webui_branch_menu()
+            branch_info = branch_info or self.show_webui_branch_menu()
             if not branch_info:
                 ui.print_info("已跳过WebUI安装")
                 return False, ""
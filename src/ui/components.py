@@ -63,6 +63,37 @@ class Components:
         
         self.console.print(table)
 
+    def show_task_list(self, tasks: List[Any]):
+        """显示后台任务列表"""
+        state_labels = {
+            "pending": ("等待中", self.colors["white"]),
+            "running": ("运行中", self.colors["info"]),
+            "waiting_input": ("等待输入", self.colors["warning"]),
+            "succeeded": ("已完成", self.colors["success"]),
+            "failed": ("失败", self.colors["error"]),
+        }
+        table = Table(show_header=True, header_style=self.colors["table_header"])
+        table.add_column("编号", style=self.colors["cyan"])
+        table.add_column("任务", style=self.colors["blue"])
+        table.add_column("状态")
+        table.add_column("进度", style=self.colors["white"])
+        table.add_column("耗时", style=self.colors["white"])
+        table.add_column("最新消息", style=self.colors["white"], overflow="ellipsis", max_width=60)
+
+        for task in tasks:
+            label, style = state_labels.get(task.state, (task.state, self.colors["white"]))
+            percent = f"{task.percent:.0f}%" if task.percent is not None else "-"
+            table.add_row(
+                str(task.id),
+                task.name,
+                f"[{style}]{label}[/{style}]",
+                percent,
+                f"{task.elapsed:.0f}s",
+                task.last_message,
+            )
+
+        self.console.print(table)
+
     def show_config_details(self, config_name: str, config: Dict[str, Any]):
         """显示配置详情"""
         table = Table(title=f"配置详情: {config_name}")
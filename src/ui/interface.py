@@ -3,6 +3,7 @@
 用户界面模块
 负责界面显示和用户交互
 """
+import io
 import time
 import os
 import structlog
@@ -15,15 +16,31 @@ from typing import Dict, Any
 from .theme import COLORS, SYMBOLS
 from .menus import Menus
 from .components import Components
+from ..core.task_engine import current_task
 
 logger = structlog.get_logger(__name__)
 
 
+class _TaskAwareConsole(Console):
+    """在后台任务中调用时，将输出转为任务消息而不是打印到终端。"""
+
+    def print(self, *objects, **kwargs):
+        task = current_task.get()
+        if task is None:
+            return super().print(*objects, **kwargs)
+        buffer = io.StringIO()
+        kwargs.pop("end", None)
+        Console(file=buffer, width=self.width, color_system=None).print(*objects, **kwargs)
+        for line in buffer.getvalue().splitlines():
+            if line.strip():
+                task.emit("info", line.rstrip())
+
+
 class UI:
     """用户界面类，作为UI的主控制器"""
 
     def __init__(self):
-        self.console = Console()
+        self.console = _TaskAwareConsole()
         self.colors = COLORS
         self.symbols = SYMBOLS
         self.menus = Menus(self.console)
@@ -31,6 +48,8 @@ class UI:
 
     def clear_screen(self):
         """清屏"""
+        if current_task.get() is not None:
+            return
         os.system('cls' if os.name == 'nt' else 'clear')
 
     def show_main_menu(self):
@@ -120,37 +139,61 @@ class UI:
         """显示配置详情"""
         self.components.show_config_details(config_name, config)
 
+    def show_task_list(self, tasks):
+        """显示后台任务列表"""
+        self.components.show_task_list(tasks)
+
+    def _print_status(self, level: str, message: str):
+        task = current_task.get()
+        if task is not None:
+            task.emit(level, message)
+            return
+        self.console.print(f"{self.symbols[level]} {message}", style=self.colors[level])
+
     def print_success(self, message: str):
-        self.console.print(f"{self.symbols['success']} {message}", style=self.colors["success"])
+        self._print_status("success", message)
     
     def print_error(self, message: str):
-        self.console.print(f"{self.symbols['error']} {message}", style=self.colors["error"])
+        self._print_status("error", message)
     
     def print_warning(self, message: str):
-        self.console.print(f"{self.symbols['warning']} {message}", style=self.colors["warning"])
+        self._print_status("warning", message)
     
     def print_info(self, message: str):
-        self.console.print(f"{self.symbols['info']} {message}", style=self.colors["info"])
+        self._print_status("info", message)
     
     def get_input(self, prompt_text: str, default: str = "") -> str:
+        task = current_task.get()
+        if task is not None:
+            return str(task.ask("input", prompt_text, default)).strip().strip('"')
         return Prompt.ask(prompt_text, default=default, console=self.console).strip().strip('"')
     
     def get_choice(self, prompt_text: str, choices: list) -> str:
         return self.get_input(prompt_text).upper()
     
     def confirm(self, prompt_text: str) -> bool:
+        task = current_task.get()
+        if task is not None:
+            return bool(task.ask("confirm", prompt_text))
         return Confirm.ask(prompt_text, console=self.console)
     
     def get_confirmation(self, prompt_text: str) -> bool:
         return self.confirm(prompt_text)
     
     def countdown(self, seconds: int, message: str = "返回主菜单倒计时"):
+        if current_task.get() is not None:
+            time.sleep(seconds)
+            return
         for i in range(seconds, 0, -1):
             self.console.print(f"\r{message}: {i}秒...", style=self.colors["warning"], end="")
             time.sleep(1)
         self.console.print()
     
     def pause(self, message: str = "按回车键继续..."):
+        task = current_task.get()
+        if task is not None:
+            task.ask("pause", message)
+            return
         input(message)
 
 # 全局UI实例
@@ -55,6 +55,7 @@ class Menus:
         
         self.console.print("====>>进程管理<<====")
         self.console.print(f" [G] {self.symbols['status']} 查看运行状态", style=self.colors["info"])
+        self.console.print(f" [T] {self.symbols['task']} 后台任务", style=self.colors["info"])
         
         self.console.print("====>>关于类<<====")
         self.console.print(f" [H] {self.symbols['about']} 关于本程序", style=self.colors["info"])
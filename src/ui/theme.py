@@ -46,4 +46,5 @@ SYMBOLS = {
     "validate": "🔍",
     "new": "✨",
     "plugin": "🧩",
+    "task": "⏳",
 }
@@ -5,11 +5,12 @@
 import os
 import sys
 import ctypes
-import subprocess
 import re
 import structlog
 from typing import Optional, Tuple
 
+from .process_table import process_table
+
 logger = structlog.get_logger(__name__)
 
 
@@ -106,27 +107,19 @@ def validate_exe_path(path: str) -> Tuple[bool, str]:
     return True, ""
 
 
-def check_process(process_name: str) -> bool:
+def check_process(process_name: str, exe_path: Optional[str] = None, cwd: Optional[str] = None) -> bool:
     """
     检查进程是否正在运行
     
     Args:
         process_name: 进程名称
+        exe_path: 可执行文件完整路径（可选，用于区分不同实例的同名进程）
+        cwd: 进程工作目录（可选）
         
     Returns:
         进程是否正在运行
     """
-    try:
-        result = subprocess.run(
-            ["tasklist", "/FI", f"IMAGENAME eq {process_name}"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return process_name.lower() in result.stdout.lower()
-    except Exception as e:
-        logger.warning("检查进程失败", process=process_name, error=str(e))
-        return False
+    return process_table.is_running(process_name, exe_path, cwd)
 
 
 def get_input_with_validation(prompt: str, validator=None, allow_empty: bool = False, is_exe: bool = False) -> str:
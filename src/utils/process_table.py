@@ -0,0 +1,174 @@
+"""
+进程表快照模块
+一次性枚举系统中的所有进程，并按进程名、可执行文件路径和工作目录建立索引，
+在TTL内的所有查询都由同一份快照提供，避免每次检查都启动tasklist。
+"""
+import csv
+import io
+import os
+import subprocess
+import threading
+import time
+import structlog
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = structlog.get_logger(__name__)
+
+# 快照默认有效期（秒）
+DEFAULT_TTL = 2.0
+
+
+class ProcessEntry(NamedTuple):
+    """进程表中的一项，无法获取的字段为空字符串。"""
+    pid: int
+    name: str
+    exe: str
+    cwd: str
+
+
+def _norm_path(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path)) if path else ""
+
+
+def _scan_proc() -> List[ProcessEntry]:
+    """通过/proc枚举进程（Linux）。"""
+    entries = []
+    for pid_dir in os.listdir("/proc"):
+        if not pid_dir.isdigit():
+            continue
+        base = f"/proc/{pid_dir}"
+        try:
+            with open(f"{base}/comm") as f:
+                name = f.read().strip()
+        except OSError:
+            continue  # 进程已退出
+        try:
+            exe = os.readlink(f"{base}/exe")
+        except OSError:
+            exe = ""
+        try:
+            cwd = os.readlink(f"{base}/cwd")
+        except OSError:
+            cwd = ""
+        # comm最多15个字符，可读取exe时以其文件名为准
+        if exe:
+            suffix = " (deleted)"
+            name = os.path.basename(exe[:-len(suffix)] if exe.endswith(suffix) else exe)
+        entries.append(ProcessEntry(int(pid_dir), name, exe, cwd))
+    return entries
+
+
+def _scan_psutil() -> List[ProcessEntry]:
+    """通过psutil枚举进程。"""
+    entries = []
+    for process in psutil.process_iter(["pid", "name", "exe", "cwd"]):
+        info = process.info
+        entries.append(ProcessEntry(info["pid"], info["name"] or "", info["exe"] or "", info["cwd"] or ""))
+    return entries
+
+
+def _scan_tasklist() -> List[ProcessEntry]:
+    """通过一次tasklist调用枚举进程（Windows，无法获取路径信息）。"""
+    result = subprocess.run(
+        ["tasklist", "/FO", "CSV", "/NH"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    entries = []
+    for row in csv.reader(io.StringIO(result.stdout)):
+        if len(row) >= 2 and row[1].isdigit():
+            entries.append(ProcessEntry(int(row[1]), row[0], "", ""))
+    return entries
+
+
+class ProcessTable:
+    """
+    进程表快照服务。
+    快照过期后在下一次查询时重新枚举，同一时刻最多只有一个线程在枚举。
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._taken_at = 0.0
+        self._entries: List[ProcessEntry] = []
+        self._by_name: Dict[str, List[ProcessEntry]] = {}
+        self._by_exe: Dict[str, List[ProcessEntry]] = {}
+        self._by_cwd: Dict[str, List[ProcessEntry]] = {}
+
+    def invalidate(self):
+        """使当前快照失效（例如刚启动或停止了进程）。"""
+        with self._lock:
+            self._taken_at = 0.0
+
+    def snapshot(self) -> List[ProcessEntry]:
+        """获取当前快照，过期时重新枚举。"""
+        with self._lock:
+            if time.monotonic() - self._taken_at >= self.ttl:
+                self._refresh()
+            return self._entries
+
+    def _refresh(self):
+        try:
+            if os.path.isdir("/proc/self"):
+                entries = _scan_proc()
+            elif psutil is not None:
+                entries = _scan_psutil()
+            else:
+                entries = _scan_tasklist()
+        except Exception as e:
+            logger.warning("枚举进程失败", error=str(e))
+            entries = []
+
+        by_name: Dict[str, List[ProcessEntry]] = {}
+        by_exe: Dict[str, List[ProcessEntry]] = {}
+        by_cwd: Dict[str, List[ProcessEntry]] = {}
+        for entry in entries:
+            by_name.setdefault(entry.name.lower(), []).append(entry)
+            if entry.exe:
+                by_exe.setdefault(_norm_path(entry.exe), []).append(entry)
+            if entry.cwd:
+                by_cwd.setdefault(_norm_path(entry.cwd), []).append(entry)
+        self._entries, self._by_name, self._by_exe, self._by_cwd = entries, by_name, by_exe, by_cwd
+        self._taken_at = time.monotonic()
+
+    def find(self, name: Optional[str] = None, exe: Optional[str] = None,
+             cwd: Optional[str] = None) -> List[ProcessEntry]:
+        """
+        查找同时满足所有给定条件的进程
+
+        Args:
+            name: 进程名（不区分大小写）
+            exe: 可执行文件完整路径
+            cwd: 工作目录
+
+        Returns:
+            匹配的进程列表
+        """
+        self.snapshot()
+        with self._lock:
+            candidates = None
+            # /proc中的路径已解析符号链接，查询路径同样解析后再比较
+            for index, key in ((self._by_exe, _norm_path(os.path.realpath(exe) if exe else "")),
+                               (self._by_cwd, _norm_path(os.path.realpath(cwd) if cwd else "")),
+                               (self._by_name, (name or "").lower())):
+                if not key:
+                    continue
+                matches = index.get(key, [])
+                candidates = matches if candidates is None else [e for e in candidates if e in matches]
+            return list(candidates) if candidates is not None else list(self._entries)
+
+    def is_running(self, name: Optional[str] = None, exe: Optional[str] = None,
+                   cwd: Optional[str] = None) -> bool:
+        """是否存在满足条件的进程。"""
+        return bool(self.find(name, exe, cwd))
+
+
+# 全局进程表实例
+process_table = ProcessTable()